@@ -0,0 +1,469 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from capture import IMAGE_EXTS
+
+# ==========================
+# CONFIG
+# ==========================
+BACKENDS = ("torch", "onnx", "openvino")
+BACKEND = "torch"      # "torch" = best.pt lewat PyTorch (baseline)
+DEVICE = "auto"        # "auto" = GPU 0 jika CUDA ada, selain itu CPU
+THREADS = None         # thread CPU inference; None = default runtime (semua core fisik)
+
+DATASET_YAML = "data jajan.yaml"
+CALIB_SPLIT = "train"  # kalibrasi INT8 dari train, akurasi diukur di val/test
+CALIB_IMAGES = 300
+
+FACE_MODEL = "buffalo_l"
+FACE_ROOT = "~/.insightface"
+INT8_SUFFIX = "_int8"
+
+
+# ==========================
+# DEVICE / PROVIDER
+# ==========================
+def cuda_available():
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def resolve_device(device=DEVICE):
+    """'auto' / index GPU / 'cpu' -> device yang benar-benar bisa dipakai"""
+    if device in (None, "auto"):
+        return 0 if cuda_available() else "cpu"
+    if str(device) == "cpu":
+        return "cpu"
+    if not cuda_available():
+        print(f"[WARN] CUDA tidak tersedia, device {device} -> cpu")
+        return "cpu"
+    return int(device) if str(device).isdigit() else device
+
+
+def ort_providers(device, backend=BACKEND):
+    """Execution provider onnxruntime sesuai device/backend, selalu diakhiri CPU"""
+    import onnxruntime as ort
+
+    wanted = []
+    if str(device) != "cpu":
+        wanted.append("CUDAExecutionProvider")
+    if backend == "openvino":
+        wanted.append("OpenVINOExecutionProvider")
+    wanted.append("CPUExecutionProvider")
+    available = set(ort.get_available_providers())
+    missing = [p for p in wanted if p not in available]
+    if missing:
+        print(f"[WARN] Provider tidak tersedia: {', '.join(missing)}")
+    return [p for p in wanted if p in available]
+
+
+def session_options(threads=THREADS):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = int(threads)
+        options.inter_op_num_threads = 1
+    return options
+
+
+def set_threads(threads=THREADS):
+    """Batasi thread PyTorch + OpenCV (sesi onnxruntime lewat session_options)"""
+    if not threads:
+        return
+    cv2.setNumThreads(int(threads))
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(int(threads))
+
+
+def preload(backend=BACKEND):
+    """Import library berat sekali di depan (di thread startup, bukan saat import modul)"""
+    import torch
+    import ultralytics
+    import insightface.app
+    import onnxruntime
+
+    if backend == "openvino":
+        import openvino
+
+
+# ==========================
+# CALIBRATION DATA
+# ==========================
+def calibration_images(data=DATASET_YAML, split=CALIB_SPLIT, limit=CALIB_IMAGES, seed=0):
+    """Sampel acak gambar split dataset untuk kalibrasi INT8"""
+    from replay import dataset_split
+
+    folder = dataset_split(data, split)
+    paths = sorted(
+        os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS)
+    )
+    random.Random(seed).shuffle(paths)
+    return paths[:limit]
+
+
+def face_photos(photo_dir, limit=CALIB_IMAGES):
+    """Foto enroll (photo_dir/<nama>/*.jpg) untuk kalibrasi / perbandingan model wajah"""
+    from enroll_faces import collect_people
+
+    return [p for _, paths in collect_people(photo_dir) for p in paths][:limit]
+
+
+def letterbox_blob(img, imgsz):
+    """Preprocess YOLO (letterbox 114, RGB, /255, NCHW) untuk kalibrasi"""
+    h, w = img.shape[:2]
+    r = imgsz / max(h, w)
+    nh, nw = round(h * r), round(w * r)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return cv2.dnn.blobFromImage(canvas, 1.0 / 255, swapRB=True)
+
+
+def _reader(input_name, images, preprocess):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._images = iter(images)
+
+        def get_next(self):
+            for item in self._images:
+                # Path file gambar atau gambar BGR yang sudah di memori (crop wajah)
+                img = cv2.imread(item) if isinstance(item, str) else item
+                if img is not None:
+                    return {input_name: preprocess(img)}
+            return None
+
+    return ImageReader()
+
+
+def quantize_onnx(src, dst, paths, preprocess):
+    """INT8 static (QDQ, per-channel) dari model ONNX fp32, dikalibrasi di `paths` (path / gambar)"""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    if not paths:
+        raise RuntimeError("Tidak ada gambar kalibrasi INT8")
+    input_name = onnx.load(src, load_external_data=False).graph.input[0].name
+    quantize_static(
+        src, dst, _reader(input_name, paths, preprocess),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        # Hanya Conv/MatMul: head (concat/DFL/sigmoid) tetap fp32 supaya box tidak bergeser
+        op_types_to_quantize=["Conv", "MatMul"],
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    return dst
+
+
+# ==========================
+# YOLO
+# ==========================
+def yolo_path(weights, backend=BACKEND, int8=False):
+    """Lokasi hasil export (nama sama dengan yang dipakai ultralytics)"""
+    stem = os.path.splitext(weights)[0] + (INT8_SUFFIX if int8 else "")
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    return weights
+
+
+def export_yolo(weights, backend=BACKEND, imgsz=640, int8=False, data=DATASET_YAML, force=False):
+    """Export best.pt ke ONNX / OpenVINO (opsional INT8). Hasil lama dipakai ulang jika masih baru"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {backend} (pilih {', '.join(BACKENDS)})")
+    if backend == "torch":
+        if int8:
+            print("[WARN] INT8 tidak didukung backend torch, pakai fp32")
+        return weights
+    path = yolo_path(weights, backend, int8)
+    if not force and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights):
+        return path
+
+    from ultralytics import YOLO
+
+    model = YOLO(weights, task="detect")
+    started = time.perf_counter()
+    if backend == "openvino":
+        # INT8 OpenVINO: ultralytics kalibrasi lewat NNCF dari dataset yaml
+        out = model.export(format="openvino", imgsz=imgsz, int8=int8, data=data, dynamic=True)
+    else:
+        out = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            import onnx
+
+            quantize_onnx(out, path, calibration_images(data), lambda img: letterbox_blob(img, imgsz))
+            # Metadata (names, stride, imgsz) dibaca AutoBackend ultralytics
+            fp32, quantized = onnx.load(out, load_external_data=False), onnx.load(path)
+            del quantized.metadata_props[:]
+            quantized.metadata_props.extend(fp32.metadata_props)
+            onnx.save(quantized, path)
+            out = path
+    print(f"[OK] Export YOLO {backend}{' int8' if int8 else ''}: {out} ({time.perf_counter() - started:.0f}s)")
+    return str(out)
+
+
+def load_yolo(weights, backend=BACKEND, imgsz=640, int8=False, data=DATASET_YAML):
+    from ultralytics import YOLO
+
+    return YOLO(export_yolo(weights, backend, imgsz, int8, data), task="detect")
+
+
+def yolo_device(device, backend=BACKEND):
+    """Device untuk predict(): OpenVINO selalu lewat 'cpu' (plugin Intel), ONNX ikut CUDA jika ada"""
+    return "cpu" if backend == "openvino" else device
+
+
+# ==========================
+# FACE (InsightFace, selalu onnxruntime)
+# ==========================
+def face_model_dir(name=FACE_MODEL, root=FACE_ROOT):
+    return os.path.join(os.path.expanduser(root), "models", name)
+
+
+def face_models(model_dir):
+    """{taskname: path onnx} untuk detection + recognition di folder model insightface"""
+    from insightface.model_zoo import get_model
+
+    found = {}
+    for filename in sorted(os.listdir(model_dir)):
+        if not filename.endswith(".onnx"):
+            continue
+        path = os.path.join(model_dir, filename)
+        model = get_model(path, providers=["CPUExecutionProvider"])
+        if model is not None and model.taskname in ("detection", "recognition"):
+            found[model.taskname] = path
+    return found
+
+
+def aligned_faces(photo_dir, name=FACE_MODEL, root=FACE_ROOT, det_size=(640, 640), size=112):
+    """Wajah terbesar tiap foto enroll, dideteksi detector fp32 lalu di-align norm_crop.
+
+    Sama dengan input ArcFace saat runtime (FaceTracker.crops) dan saat
+    enroll, bukan foto utuh yang di-resize.
+    """
+    from insightface.model_zoo import get_model
+    from insightface.utils import face_align
+
+    detector = get_model(face_models(face_model_dir(name, root))["detection"],
+                         providers=["CPUExecutionProvider"])
+    detector.prepare(ctx_id=-1, input_size=tuple(det_size))
+    crops = []
+    for path in face_photos(photo_dir):
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        bboxes, kpss = detector.detect(img, max_num=1, metric="max")
+        if len(bboxes) == 0 or kpss is None:
+            continue
+        crops.append(face_align.norm_crop(img, landmark=kpss[0], image_size=size))
+    return crops
+
+
+def _face_blob(model, size):
+    def preprocess(img):
+        img = cv2.resize(img, size)
+        mean, std = model.input_mean, model.input_std
+        return cv2.dnn.blobFromImage(img, 1.0 / std, size, (mean, mean, mean), swapRB=True)
+    return preprocess
+
+
+def quantize_face_models(photo_dir, name=FACE_MODEL, root=FACE_ROOT, det_size=(640, 640), force=False):
+    """buffalo_l -> buffalo_l_int8 (detection + recognition), kalibrasi dari foto enroll"""
+    from insightface.model_zoo import get_model
+
+    dst_dir = face_model_dir(name + INT8_SUFFIX, root)
+    if not force and os.path.isdir(dst_dir) and len(os.listdir(dst_dir)) >= 2:
+        return dst_dir
+    paths = face_photos(photo_dir)
+    os.makedirs(dst_dir, exist_ok=True)
+    for task, src in face_models(face_model_dir(name, root)).items():
+        model = get_model(src, providers=["CPUExecutionProvider"])
+        if task == "detection":
+            size, images = tuple(det_size), paths
+        else:
+            size = tuple(model.input_size)
+            images = aligned_faces(photo_dir, name, root, det_size, size[0])
+        dst = os.path.join(dst_dir, os.path.basename(src))
+        quantize_onnx(src, dst, images, _face_blob(model, size))
+        print(f"[OK] Face {task} int8: {dst}")
+    return dst_dir
+
+
+def load_face_app(face_resolution, device="cpu", backend=BACKEND, int8=False, threads=THREADS,
+                  name=FACE_MODEL):
+    """FaceAnalysis dengan provider + thread dari config, fallback ke CPU dan ke fp32"""
+    from insightface.app import FaceAnalysis
+    from face_tracker import det_size_for
+
+    if int8:
+        if os.path.isdir(face_model_dir(name + INT8_SUFFIX)):
+            name += INT8_SUFFIX
+        else:
+            print(f"[WARN] {name}{INT8_SUFFIX} belum ada (backends.py export --face-photos), pakai fp32")
+    providers = ort_providers(device, backend)
+    face_app = FaceAnalysis(
+        name=name,
+        allowed_modules=["detection", "recognition"],
+        providers=providers,
+        sess_options=session_options(threads)
+    )
+    ctx_id = 0 if "CUDAExecutionProvider" in providers else -1
+    face_app.prepare(ctx_id=ctx_id, det_size=det_size_for(face_resolution))
+    return face_app
+
+
+# ==========================
+# ACCURACY VS LATENCY REPORT
+# ==========================
+def parse_variant(variant):
+    """'onnx-int8' -> ('onnx', True)"""
+    backend, _, suffix = variant.partition("-")
+    return backend, suffix == "int8"
+
+
+def evaluate_yolo(weights, variants, data=DATASET_YAML, split="val", imgsz=640, device="cpu"):
+    """mAP + latency per image untuk tiap variant backend di split dataset"""
+    from ultralytics import YOLO
+
+    rows = []
+    for variant in variants:
+        backend, int8 = parse_variant(variant)
+        path = export_yolo(weights, backend, imgsz, int8, data)
+        metrics = YOLO(path, task="detect").val(
+            data=data, split=split, imgsz=imgsz, batch=1, device=yolo_device(device, backend),
+            plots=False, verbose=False
+        )
+        rows.append({
+            "variant": variant,
+            "path": path,
+            "map50": float(metrics.box.map50),
+            "map50_95": float(metrics.box.map),
+            "ap50_per_class": {metrics.names[int(cls)]: float(ap)
+                               for cls, ap in zip(metrics.box.ap_class_index, metrics.box.ap50)},
+            "preprocess_ms": metrics.speed["preprocess"],
+            "inference_ms": metrics.speed["inference"],
+            "postprocess_ms": metrics.speed["postprocess"],
+        })
+    return rows
+
+
+def compare_face_models(photo_dir, name=FACE_MODEL, threads=THREADS):
+    """Embedding ArcFace fp32 vs int8 di foto enroll: cosine similarity + latency per crop.
+
+    Kedua model menerima crop ter-align yang sama (detector fp32 + norm_crop).
+    """
+    from insightface.model_zoo import get_model
+
+    crops = aligned_faces(photo_dir, name)
+    if not crops:
+        return []
+    rows, reference = [], None
+    for variant in (name, name + INT8_SUFFIX):
+        path = face_models(face_model_dir(variant)).get("recognition")
+        if path is None:
+            continue
+        rec = get_model(path, providers=["CPUExecutionProvider"], sess_options=session_options(threads))
+        rec.prepare(ctx_id=-1)
+        size = tuple(rec.input_size)
+        batch = [img if img.shape[1::-1] == size else cv2.resize(img, size) for img in crops]
+        rec.get_feat(batch[:1])  # warm-up
+        started = time.perf_counter()
+        feats = np.concatenate([rec.get_feat([crop]) for crop in batch])
+        elapsed = time.perf_counter() - started
+        feats /= np.linalg.norm(feats, axis=1, keepdims=True)
+        if reference is None:
+            reference = feats
+        cosine = np.sum(feats * reference, axis=1)
+        rows.append({
+            "variant": variant,
+            "crops": len(batch),
+            "embed_ms": elapsed / len(batch) * 1000,
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min()),
+        })
+    return rows
+
+
+def print_report(yolo_rows, face_rows):
+    base = next((r for r in yolo_rows if r["variant"] == "torch"), yolo_rows[0] if yolo_rows else None)
+    if yolo_rows:
+        print(f"\n{'yolo':<16}{'mAP50':>8}{'d mAP50':>9}{'mAP50-95':>10}{'infer ms':>10}{'speedup':>9}")
+        for r in yolo_rows:
+            print(f"{r['variant']:<16}{r['map50']:>8.3f}{r['map50'] - base['map50']:>+9.3f}"
+                  f"{r['map50_95']:>10.3f}{r['inference_ms']:>10.1f}"
+                  f"{base['inference_ms'] / max(r['inference_ms'], 1e-6):>8.1f}x")
+    if face_rows:
+        print(f"\n{'arcface':<16}{'cos mean':>9}{'cos min':>9}{'ms/crop':>9}")
+        for r in face_rows:
+            print(f"{r['variant']:<16}{r['cosine_mean']:>9.4f}{r['cosine_min']:>9.4f}{r['embed_ms']:>9.1f}")
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export / INT8 / benchmark backend inference")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--data", default=DATASET_YAML)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--face-photos", default=None, help="Folder foto enroll untuk INT8 model wajah")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="Export YOLO (dan model wajah) ke backend")
+    p.add_argument("--backend", choices=BACKENDS[1:], required=True)
+    p.add_argument("--int8", action="store_true")
+    p.add_argument("--force", action="store_true")
+
+    p = sub.add_parser("report", help="Akurasi vs latency tiap backend dibanding PyTorch")
+    p.add_argument("--variants", nargs="+",
+                   default=["torch", "onnx", "onnx-int8", "openvino", "openvino-int8"])
+    p.add_argument("--split", default="val", choices=["val", "test"])
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--json", default=None, help="Tulis report JSON ke file")
+
+    args = parser.parse_args(argv)
+    set_threads(args.threads)
+
+    if args.command == "export":
+        export_yolo(args.weights, args.backend, args.imgsz, args.int8, args.data, force=args.force)
+        if args.int8 and args.face_photos:
+            quantize_face_models(args.face_photos, force=args.force)
+        return 0
+
+    device = resolve_device(args.device)
+    yolo_rows = evaluate_yolo(args.weights, args.variants, args.data, args.split, args.imgsz, device)
+    face_rows = []
+    if args.face_photos:
+        quantize_face_models(args.face_photos)
+        face_rows = compare_face_models(args.face_photos, threads=args.threads)
+    print_report(yolo_rows, face_rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"split": args.split, "device": str(device), "threads": args.threads,
+                       "yolo": yolo_rows, "face": face_rows}, f, indent=2)
+        print(f"[OK] Report ditulis ke {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,435 @@
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import kasir_db
+import metrics
+import migrations
+import rollups
+
+# ==========================
+# CONFIG
+# ==========================
+SOURCE_DB = "kasir.db"     # katalog produk diambil dari sini
+BENCH_DB = "bench_kasir.db"
+CUSTOMERS = 500
+DAYS = 365
+ITEMS_PER_TRANSACTION = (1, 6)
+QUANTITY = (1, 4)
+CHUNK = 50_000
+LANES = 4
+LANE_RATE = 2.0            # transaksi/detik per lane (rata-rata, kedatangan Poisson)
+DURATION = 60.0            # detik
+HISTORY_INTERVAL = 1.0     # detik, sama dengan auto refresh HistoryViewer
+HISTORY_RELOAD_EVERY = 10  # tiap N refresh: reload penuh (rollup + halaman pertama)
+
+
+# ==========================
+# SYNTHETIC DATABASE
+# ==========================
+def load_products(source=SOURCE_DB):
+    conn = sqlite3.connect(source)
+    rows = conn.execute("SELECT class_name, product_name, price FROM products").fetchall()
+    conn.close()
+    if not rows:
+        raise SystemExit(f"Tabel products di {source} kosong, jalankan init_db.py dulu")
+    return rows
+
+
+def generate(path, transactions, products, schema=migrations.LATEST,
+             customers=CUSTOMERS, days=DAYS, seed=0):
+    """DB sintetis: transaksi tersebar DAYS hari terakhir, 1-6 item per transaksi.
+
+    Data ditulis di schema v1 (seperti kasir.db lama di toko) lalu
+    dimigrasi ke `schema`, jadi waktu upgrade di tempat ikut terukur.
+    Return detik yang dipakai migrasi.
+    """
+    # -wal/-shm lama ikut dihapus: WAL basi bisa di-replay ke DB baru
+    for stale in (path, path + "-wal", path + "-shm", path + "-journal"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    migrations.migrate(conn, target=1, verbose=False)
+    conn.executemany(
+        "INSERT INTO products (class_name, product_name, price) VALUES (?, ?, ?)", products
+    )
+
+    names = ["Unknown"] + [f"customer{i:04d}" for i in range(customers)]
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / max(transactions, 1)
+    tid = 0
+    while tid < transactions:
+        headers, items = [], []
+        for _ in range(min(CHUNK, transactions - tid)):
+            tid += 1
+            lines = rng.sample(products, rng.randint(*ITEMS_PER_TRANSACTION))
+            total = 0
+            for class_name, product_name, price in lines:
+                qty = rng.randint(*QUANTITY)
+                total += qty * price
+                items.append((tid, class_name, product_name, qty, price))
+            # Customer dikenal lebih jarang dari Unknown, seperti di toko
+            customer = names[0] if rng.random() < 0.6 else rng.choice(names)
+            date = start + timedelta(seconds=tid * step)
+            headers.append((tid, customer, total, date.strftime("%Y-%m-%d %H:%M:%S")))
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO transactions (id, customer_name, total, transaction_date) VALUES (?, ?, ?, ?)",
+            headers
+        )
+        conn.executemany(
+            "INSERT INTO transaction_items (transaction_id, class_name, product_name, quantity, price) "
+            "VALUES (?, ?, ?, ?, ?)",
+            items
+        )
+        conn.execute("COMMIT")
+        print(f"\r[..] {tid:,}/{transactions:,} transaksi", end="", flush=True)
+    print()
+
+    started = time.perf_counter()
+    migrations.migrate(conn, target=schema, verbose=False)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+# ==========================
+# SCHEMA BENCHMARK
+# ==========================
+# nama -> (SQL schema v1, SQL schema terbaru atau None jika sama). Parameter dari _params()
+QUERIES = {
+    "detail_transaksi": (
+        "SELECT product_name, quantity, price FROM transaction_items WHERE transaction_id = ?",
+        None,
+    ),
+    "halaman_history": (
+        '''SELECT t.id, t.customer_name, t.total, t.transaction_date, COUNT(i.id)
+           FROM transactions t LEFT JOIN transaction_items i ON i.transaction_id = t.id
+           WHERE t.id < ? GROUP BY t.id ORDER BY t.id DESC LIMIT 200''',
+        None,
+    ),
+    "filter_customer": (
+        '''SELECT id, customer_name, total, transaction_date FROM transactions
+           WHERE customer_name = ? ORDER BY id DESC LIMIT 200''',
+        None,
+    ),
+    "stats_customer": (
+        "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM transactions WHERE customer_name = ?",
+        "SELECT COALESCE(SUM(tx_count), 0), COALESCE(SUM(revenue), 0) FROM sales_customer_daily "
+        "WHERE customer_name = ?",
+    ),
+    "stats_toko": (
+        "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM transactions",
+        "SELECT COALESCE(SUM(tx_count), 0), COALESCE(SUM(revenue), 0) FROM sales_daily",
+    ),
+    "laporan_tanggal": (
+        "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM transactions WHERE transaction_date BETWEEN ? AND ?",
+        "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM transactions WHERE created_at BETWEEN ? AND ?",
+    ),
+}
+
+
+def _params(name, rng, max_id, new_schema):
+    if name in ("detail_transaksi", "halaman_history"):
+        return (rng.randint(1, max_id),)
+    if name in ("filter_customer", "stats_customer"):
+        return (f"customer{rng.randrange(CUSTOMERS):04d}",)
+    if name == "stats_toko":
+        return ()
+    # Rentang satu minggu acak
+    start = datetime.now() - timedelta(days=rng.randint(7, DAYS))
+    end = start + timedelta(days=7)
+    if new_schema:
+        return (int(start.timestamp()), int(end.timestamp()))
+    return (start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def time_queries(path, reps=20, seed=1):
+    """Median/maks ms per query di schema DB saat ini"""
+    conn = kasir_db.connect(path)
+    new_schema = migrations.schema_version(conn) == migrations.LATEST
+    max_id = conn.execute("SELECT MAX(id) FROM transactions").fetchone()[0]
+    rng = random.Random(seed)
+    result = {}
+    for name, (old_sql, new_sql) in QUERIES.items():
+        sql = new_sql if new_schema and new_sql else old_sql
+        samples = []
+        for _ in range(reps):
+            params = _params(name, rng, max_id, new_schema)
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        result[name] = {"median_ms": statistics.median(samples), "max_ms": max(samples)}
+    conn.close()
+    return result
+
+
+def bench_schema(args):
+    products = load_products(args.source)
+    print(f"[..] Membuat {args.transactions:,} transaksi di {args.db} (schema v1)")
+    generate(args.db, args.transactions, products, schema=1)
+    before = time_queries(args.db, args.reps)
+
+    conn = kasir_db.connect(args.db)
+    started = time.perf_counter()
+    migrations.migrate(conn)
+    migrate_s = time.perf_counter() - started
+    conn.close()
+    after = time_queries(args.db, args.reps)
+
+    print(f"\nMigrasi v1 -> v{migrations.LATEST}: {migrate_s:.1f}s "
+          f"({os.path.getsize(args.db) / 1e6:.0f} MB)")
+    print(f"{'query':<18}{'sebelum (ms)':>14}{'sesudah (ms)':>14}{'speedup':>10}")
+    for name in QUERIES:
+        b, a = before[name]["median_ms"], after[name]["median_ms"]
+        print(f"{name:<18}{b:>14.3f}{a:>14.3f}{b / max(a, 1e-6):>9.0f}x")
+
+
+# ==========================
+# LANE LOAD TEST
+# ==========================
+# Satu proses per lane, masing-masing TransactionWriter sendiri (journal +
+# group commit) ke satu file DB, seperti lane_server dengan worker per
+# lane. Satu proses lagi meniru HistoryViewer yang auto refresh selama
+# lane membayar. Lookup produk tidak diukur: Catalog melayaninya dari
+# memori tanpa query DB.
+HISTORY_QUERIES = {
+    "data_version": "PRAGMA data_version",
+    "newer": '''SELECT t.id, t.customer_name, t.total, t.transaction_date, COUNT(i.id)
+                FROM transactions t LEFT JOIN transaction_items i ON i.transaction_id = t.id
+                WHERE t.id > ? GROUP BY t.id ORDER BY t.id DESC LIMIT 101''',
+    "halaman_history": QUERIES["halaman_history"][0],
+    "detail_transaksi": QUERIES["detail_transaksi"][0],
+}
+
+
+def _percentile(samples, q):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _lane(index, path, products, rate, duration, seed, start, results):
+    """Submit cart dengan jeda eksponensial (open loop: lane yang telat tidak mengurangi beban)"""
+    rng = random.Random(seed + index)
+    name = f"bench{index}"
+    journal_dir = tempfile.mkdtemp(prefix=f"{name}_journal_")
+    submitted, committed, batches = {}, {}, []
+
+    def on_commit(batch):
+        now = time.perf_counter()
+        batches.append(len(batch))
+        for record in batch:
+            committed[record["seq"]] = now
+
+    writer = kasir_db.TransactionWriter(name, path, journal_dir, on_commit=on_commit)
+    pay_ms = []
+    start.wait()
+    began = time.perf_counter()
+    deadline = began + duration
+    next_at = began
+    while True:
+        next_at += rng.expovariate(rate)
+        if next_at >= deadline:
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lines = [(class_name, product_name, rng.randint(*QUANTITY), price)
+                 for class_name, product_name, price
+                 in rng.sample(products, rng.randint(*ITEMS_PER_TRANSACTION))]
+        total = sum(qty * price for _, _, qty, price in lines)
+        sent = time.perf_counter()
+        seq = writer.submit("Unknown", lines, total)
+        submitted[seq] = sent
+        pay_ms.append((time.perf_counter() - sent) * 1000)
+
+    ended = time.perf_counter()
+    in_window = sum(1 for t in list(committed.values()) if t <= ended)
+    writer.flush(timeout=60.0)
+    writer.close()
+    shutil.rmtree(journal_dir, ignore_errors=True)
+
+    results.put({
+        "lane": name,
+        "elapsed": ended - began,
+        "submitted": len(submitted),
+        "committed": in_window,
+        "backlog": len(submitted) - in_window,
+        "pay_ms": pay_ms,
+        "commit_ms": [(committed[seq] - sent) * 1000 for seq, sent in submitted.items() if seq in committed],
+        "batches": batches,
+        "lock_retries": metrics.REGISTRY.counters.get(("db_lock_retries", (("writer", name),)), 0),
+    })
+
+
+def _history(path, interval, duration, seed, start, results):
+    """Auto refresh HistoryViewer: data_version -> transaksi baru; berkala reload, scroll, detail"""
+    rng = random.Random(seed)
+    conn = kasir_db.connect(path)
+    samples = {name: [] for name in HISTORY_QUERIES}
+    samples["totals"] = []
+
+    def timed(name, fn):
+        began = time.perf_counter()
+        result = fn()
+        samples[name].append((time.perf_counter() - began) * 1000)
+        return result
+
+    def run(name, *params):
+        return timed(name, lambda: conn.execute(HISTORY_QUERIES[name], params).fetchall())
+
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+    version = None
+    refresh = 0
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        refresh += 1
+        current = run("data_version")[0][0]
+        if current != version:
+            version = current
+            rows = run("newer", last_id)
+            if rows:
+                last_id = rows[0][0]
+        if refresh % HISTORY_RELOAD_EVERY == 0 and last_id:
+            timed("totals", lambda: rollups.totals(conn))
+            run("halaman_history", last_id + 1)
+            run("halaman_history", rng.randint(1, last_id))
+            run("detail_transaksi", rng.randint(1, last_id))
+        time.sleep(interval)
+    conn.close()
+    results.put({"history": samples})
+
+
+def bench_lanes(args):
+    if args.generate:
+        products = load_products(args.source)
+        print(f"[..] Membuat {args.generate:,} transaksi di {args.db}")
+        generate(args.db, args.generate, products)
+    elif not os.path.exists(args.db):
+        raise SystemExit(f"{args.db} belum ada, jalankan 'generate' atau pakai --generate N")
+
+    conn = kasir_db.connect(args.db)
+    kasir_db.ensure_schema(conn)
+    products = conn.execute("SELECT class_name, product_name, price FROM products").fetchall()
+    rows_before = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    conn.close()
+    if not products:
+        raise SystemExit(f"Tabel products di {args.db} kosong")
+
+    print(f"[..] {args.lanes} lane x {args.rate:g} tx/s selama {args.duration:g}s "
+          f"ke {args.db} ({rows_before:,} transaksi)")
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    procs = [
+        ctx.Process(target=_lane, args=(i, args.db, products, args.rate, args.duration,
+                                        args.seed, start, results))
+        for i in range(args.lanes)
+    ]
+    if args.history_interval > 0:
+        procs.append(ctx.Process(target=_history, args=(args.db, args.history_interval,
+                                                        args.duration, args.seed, start, results)))
+    for proc in procs:
+        proc.start()
+    start.set()
+    reports = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    lanes = [r for r in reports if "lane" in r]
+    history = next((r["history"] for r in reports if "history" in r), {})
+    pay_ms = [v for r in lanes for v in r["pay_ms"]]
+    commit_ms = [v for r in lanes for v in r["commit_ms"]]
+    batches = [v for r in lanes for v in r["batches"]]
+    elapsed = max(r["elapsed"] for r in lanes)
+    committed = sum(r["committed"] for r in lanes)
+
+    print(f"\n{'lane':<10}{'submit':>8}{'commit':>8}{'backlog':>9}{'tx/s':>8}"
+          f"{'p99 commit':>12}{'lock retry':>12}")
+    for r in sorted(lanes, key=lambda r: r["lane"]):
+        print(f"{r['lane']:<10}{r['submitted']:>8}{r['committed']:>8}{r['backlog']:>9}"
+              f"{r['committed'] / r['elapsed']:>8.1f}{_percentile(r['commit_ms'], 0.99):>10.1f}ms"
+              f"{r['lock_retries']:>12}")
+
+    print(f"\nThroughput tulis : {committed / elapsed:.1f} tx/s "
+          f"(target {args.lanes * args.rate:g} tx/s)")
+    print(f"Latency pay()    : p50 {_percentile(pay_ms, 0.5):.2f} ms, "
+          f"p99 {_percentile(pay_ms, 0.99):.2f} ms (journal + fsync)")
+    print(f"Latency commit   : p50 {_percentile(commit_ms, 0.5):.1f} ms, "
+          f"p99 {_percentile(commit_ms, 0.99):.1f} ms, maks {max(commit_ms, default=0):.1f} ms")
+    if batches:
+        print(f"Group commit     : {len(batches):,} commit, rata-rata {statistics.mean(batches):.2f} "
+              f"transaksi, maks {max(batches)}")
+    print(f"Lock contention  : {sum(r['lock_retries'] for r in lanes)} retry "
+          f"(busy_timeout {kasir_db.BUSY_TIMEOUT_MS} ms terlewati)")
+
+    if history:
+        print(f"\n{'query history':<18}{'n':>6}{'p50 (ms)':>10}{'p99 (ms)':>10}{'maks (ms)':>11}")
+        for name, values in history.items():
+            if values:
+                print(f"{name:<18}{len(values):>6}{_percentile(values, 0.5):>10.3f}"
+                      f"{_percentile(values, 0.99):>10.3f}{max(values):>11.3f}")
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark database kasir di volume toko")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="DB sintetis dari katalog produk, satu file per ukuran")
+    p.add_argument("--db", default=BENCH_DB, help="Lebih dari satu ukuran -> nama file + _<jumlah>")
+    p.add_argument("--source", default=SOURCE_DB)
+    p.add_argument("--transactions", type=int, nargs="+", default=[1_000_000])
+    p.add_argument("--customers", type=int, default=CUSTOMERS)
+    p.add_argument("--days", type=int, default=DAYS)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("lanes", help="Banyak lane bayar bersamaan ke satu DB + HistoryViewer")
+    p.add_argument("--db", default=BENCH_DB)
+    p.add_argument("--source", default=SOURCE_DB)
+    p.add_argument("--generate", type=int, metavar="N", help="Buat ulang DB dengan N transaksi dulu")
+    p.add_argument("--lanes", type=int, default=LANES)
+    p.add_argument("--rate", type=float, default=LANE_RATE, help="Transaksi/detik per lane")
+    p.add_argument("--duration", type=float, default=DURATION)
+    p.add_argument("--history-interval", type=float, default=HISTORY_INTERVAL,
+                   help="Detik antar refresh history (0 = tanpa reader)")
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("schema", help="Waktu query hot path sebelum/sesudah migrasi")
+    p.add_argument("--db", default=BENCH_DB)
+    p.add_argument("--source", default=SOURCE_DB)
+    p.add_argument("--transactions", type=int, default=1_000_000)
+    p.add_argument("--reps", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        products = load_products(args.source)
+        root, ext = os.path.splitext(args.db)
+        for n in args.transactions:
+            path = args.db if len(args.transactions) == 1 else f"{root}_{n}{ext}"
+            print(f"[..] Membuat {n:,} transaksi di {path}")
+            migrate_s = generate(path, n, products, customers=args.customers,
+                                 days=args.days, seed=args.seed)
+            print(f"[OK] {path}: {os.path.getsize(path) / 1e6:.0f} MB, migrasi {migrate_s:.1f}s")
+    elif args.command == "lanes":
+        bench_lanes(args)
+    elif args.command == "schema":
+        bench_schema(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+
+import backends
+from capture import IMAGE_EXTS
+from replay import dataset_split, peak_memory_mb, percentiles
+
+# ==========================
+# CONFIG
+# ==========================
+WEIGHTS = "best.pt"
+VARIANTS = ["torch", "onnx", "onnx-int8", "openvino", "openvino-int8"]
+IMGSZ = [480, 640, 800]
+CONF = [0.25, 0.4, 0.5, 0.6]
+BATCH = [1, 2, 4]
+# Skala frame sebelum inference, pengganti capture resolusi lebih rendah
+# (mis. 0.5 = 2560x1440 -> 1280x720)
+SOURCE_SCALE = [1.0, 0.5]
+WARMUP_BATCHES = 3
+TARGET_METRIC = "count_acc"   # atau "map50" / "map50_95"
+
+# ==========================
+# BENCHMARK DETECTOR
+# ==========================
+# Satu proses per (variant, imgsz) supaya peak memory dan warm-up tidak
+# saling mempengaruhi (seperti bench_pipeline.py). Di dalam proses:
+# - mAP per kelas lewat backends.evaluate_yolo() (val() di resolusi asli,
+#   tidak tergantung conf/batch/skala)
+# - throughput + latency per skala sumber x batch size, gambar sudah di
+#   memori (tanpa I/O disk). Skala < 1 = frame kamera lebih kecil: YOLO tetap
+#   letterbox ke imgsz, yang berubah biaya preprocess dan detail objek kecil
+# - akurasi hitungan per skala x conf: jumlah box per kelas vs label, per
+#   gambar, dari prediksi conf terendah yang difilter ulang (NMS sama, jadi
+#   conf tidak perlu inference ulang)
+BENCH_SCRIPT = os.path.abspath(__file__)
+
+
+def label_path(image_path):
+    """Konvensi YOLO: .../images/x.jpg -> .../labels/x.txt"""
+    folder, name = os.path.split(image_path)
+    return os.path.join(os.path.dirname(folder), "labels", os.path.splitext(name)[0] + ".txt")
+
+
+def load_split(data, split, max_images=None):
+    """[(path, gambar BGR, {class id: jumlah} dari label)]"""
+    folder = dataset_split(data, split)
+    paths = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    samples = []
+    for path in paths[:max_images]:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        counts = {}
+        if os.path.exists(label_path(path)):
+            with open(label_path(path), encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        cls = int(line.split()[0])
+                        counts[cls] = counts.get(cls, 0) + 1
+        samples.append((path, img, counts))
+    return samples
+
+
+def count_accuracy(predictions, truths, conf, names):
+    """Cart exact match (semua kelas pas) + MAE jumlah per kelas pada threshold conf"""
+    exact = 0
+    errors = {cls: 0 for cls in names}
+    for (classes, scores), truth in zip(predictions, truths):
+        counts = {}
+        for cls, score in zip(classes, scores):
+            if score >= conf:
+                counts[cls] = counts.get(cls, 0) + 1
+        if counts == truth:
+            exact += 1
+        for cls in names:
+            errors[cls] += abs(counts.get(cls, 0) - truth.get(cls, 0))
+    n = max(len(truths), 1)
+    return {
+        "count_acc": exact / n,
+        "count_mae": sum(errors.values()) / n,
+        "count_mae_per_class": {names[cls]: err / n for cls, err in errors.items()},
+    }
+
+
+def scaled(img, scale):
+    if scale == 1.0:
+        return img
+    return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def run_model(args):
+    """Satu (variant, imgsz): semua skala x batch x conf. Return list baris hasil"""
+    backend, int8 = backends.parse_variant(args.variant)
+    resolved = backends.resolve_device(args.device)
+    device = backends.yolo_device(resolved, backend)
+    model = backends.load_yolo(args.weights, backend, args.imgsz, int8, args.data)
+    samples = load_split(args.data, args.split, args.max_images)
+    if not samples:
+        raise SystemExit(f"Tidak ada gambar di split {args.split}")
+    truths = [counts for _, _, counts in samples]
+    low_conf = min(args.conf)
+
+    speed = []
+    # Peak RSS monoton: skala dan batch diurutkan naik, jadi ini peak sampai setting ini
+    for scale in sorted(args.source_scale):
+        images = [scaled(img, scale) for _, img, _ in samples]
+        predictions = None
+        for batch in sorted(args.batch):
+            chunks = [images[i:i + batch] for i in range(0, len(images), batch)]
+            for chunk in chunks[:WARMUP_BATCHES]:
+                model.predict(chunk, imgsz=args.imgsz, conf=low_conf, device=device, verbose=False)
+            timings, results = [], []
+            started = time.perf_counter()
+            for chunk in chunks:
+                begin = time.perf_counter()
+                out = model.predict(chunk, imgsz=args.imgsz, conf=low_conf, device=device, verbose=False)
+                timings.append(time.perf_counter() - begin)
+                results.extend(out)
+            elapsed = time.perf_counter() - started
+            if predictions is None:
+                predictions = [(r.boxes.cls.int().tolist(), r.boxes.conf.tolist()) for r in results]
+            speed.append((scale, batch, len(images) / elapsed, percentiles(timings),
+                          peak_memory_mb(), predictions))
+
+    names = {int(k): v for k, v in model.names.items()}
+    val = backends.evaluate_yolo(args.weights, [args.variant], args.data, args.split,
+                                 args.imgsz, resolved)[0]
+
+    rows = []
+    for scale, batch, img_s, latency, memory, predictions in speed:
+        for conf in sorted(args.conf):
+            rows.append({
+                "variant": args.variant,
+                "imgsz": args.imgsz,
+                "source_scale": scale,
+                "batch": batch,
+                "conf": conf,
+                "images": len(samples),
+                "img_s": img_s,
+                "latency": latency,
+                "memory": memory,
+                "map50": val["map50"],
+                "map50_95": val["map50_95"],
+                "ap50_per_class": val["ap50_per_class"],
+                **count_accuracy(predictions, truths, conf, names),
+            })
+    return rows
+
+
+# ==========================
+# SWEEP + PARETO
+# ==========================
+def run_variant(args, variant, imgsz):
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "rows.json")
+        cmd = [sys.executable, BENCH_SCRIPT, "--weights", args.weights, "--data", args.data,
+               "--split", args.split, "--device", args.device, "--out", out,
+               "--conf", *map(str, args.conf), "--batch", *map(str, args.batch),
+               "--source-scale", *map(str, args.source_scale)]
+        if args.max_images:
+            cmd += ["--max-images", str(args.max_images)]
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        cmd += ["run", "--variant", variant, "--imgsz", str(imgsz)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0 or not os.path.exists(out):
+            return None, proc.stderr.strip().splitlines()[-5:]
+        with open(out, encoding="utf-8") as f:
+            return json.load(f), None
+
+
+def pareto(rows, metric):
+    """Tandai baris yang tidak kalah cepat sekaligus kalah akurat dari baris lain"""
+    for row in rows:
+        row["pareto"] = not any(
+            other["img_s"] >= row["img_s"] and other[metric] >= row[metric]
+            and (other["img_s"] > row["img_s"] or other[metric] > row[metric])
+            for other in rows
+        )
+    return rows
+
+
+def print_table(rows, metric, target):
+    print(f"\n{'':2}{'variant':<15}{'imgsz':>6}{'skala':>6}{'batch':>6}{'conf':>6}{'img/s':>8}{'p50 ms':>8}"
+          f"{'p99 ms':>8}{'RSS MB':>8}{'mAP50':>7}{'mAP':>7}{'count':>7}{'MAE':>6}")
+    for r in sorted(rows, key=lambda r: -r["img_s"]):
+        mark = "*" if r["pareto"] else " "
+        rss = r["memory"].get("peak_rss_mb") or 0
+        print(f"{mark:<2}{r['variant']:<15}{r['imgsz']:>6}{r['source_scale']:>6.2f}"
+              f"{r['batch']:>6}{r['conf']:>6.2f}"
+              f"{r['img_s']:>8.1f}{r['latency']['p50_ms']:>8.1f}{r['latency']['p99_ms']:>8.1f}"
+              f"{rss:>8.0f}{r['map50']:>7.3f}{r['map50_95']:>7.3f}{r['count_acc']:>7.3f}"
+              f"{r['count_mae']:>6.2f}")
+    print(f"\n* = Pareto (img/s vs {metric}); latency per panggilan predict (satu batch)")
+
+    ok = [r for r in rows if r[metric] >= target]
+    if not ok:
+        print(f"[WARN] Tidak ada setting dengan {metric} >= {target}")
+        return None
+    best = max(ok, key=lambda r: r["img_s"])
+    print(f"[OK] Tercepat dengan {metric} >= {target}: {best['variant']} imgsz={best['imgsz']} "
+          f"skala={best['source_scale']} batch={best['batch']} conf={best['conf']} "
+          f"({best['img_s']:.1f} img/s)")
+    print(f"\n{'kelas':<20}{'AP50':>7}{'count MAE':>11}")
+    for name, mae in best["count_mae_per_class"].items():
+        print(f"{name:<20}{best['ap50_per_class'].get(name, float('nan')):>7.3f}{mae:>11.3f}")
+    return best
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep imgsz/conf/batch/backend detector di dataset")
+    parser.add_argument("--weights", default=WEIGHTS)
+    parser.add_argument("--data", default=backends.DATASET_YAML)
+    parser.add_argument("--split", default="val", choices=["val", "test"])
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--threads", type=int, default=backends.THREADS)
+    parser.add_argument("--conf", nargs="+", type=float, default=CONF)
+    parser.add_argument("--batch", nargs="+", type=int, default=BATCH)
+    parser.add_argument("--source-scale", nargs="+", type=float, default=SOURCE_SCALE,
+                        help="Skala frame sebelum inference (resolusi capture lebih rendah)")
+    parser.add_argument("--max-images", type=int, default=None)
+    parser.add_argument("--out", default=None, help="Tulis semua baris ke file JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sweep", help="Grid variant x imgsz, tiap kombinasi di proses sendiri")
+    p.add_argument("--variants", nargs="+", default=VARIANTS)
+    p.add_argument("--imgsz", nargs="+", type=int, default=IMGSZ)
+    p.add_argument("--metric", default=TARGET_METRIC, choices=["count_acc", "map50", "map50_95"])
+    p.add_argument("--target", type=float, default=0.9, help="Akurasi minimum untuk rekomendasi")
+
+    p = sub.add_parser("run", help="Satu variant + imgsz (dipanggil oleh sweep)")
+    p.add_argument("--variant", default="torch")
+    p.add_argument("--imgsz", type=int, default=640)
+
+    args = parser.parse_args(argv)
+    backends.set_threads(args.threads)
+
+    if args.command == "run":
+        rows = run_model(args)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(rows, f, indent=2)
+        else:
+            print(json.dumps(rows, indent=2))
+        return 0
+
+    rows = []
+    for variant, imgsz in itertools.product(args.variants, args.imgsz):
+        result, error = run_variant(args, variant, imgsz)
+        if error is not None:
+            print(f"[WARN] {variant} imgsz={imgsz}: gagal {error}", file=sys.stderr)
+            continue
+        rows.extend(result)
+        print(f"[OK] {variant} imgsz={imgsz}: "
+              f"{max(r['img_s'] for r in result):.1f} img/s maks", file=sys.stderr)
+    if not rows:
+        return 1
+
+    print_table(pareto(rows, args.metric), args.metric, args.target)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "split": args.split,
+                       "device": args.device, "metric": args.metric, "rows": rows}, f, indent=2)
+        print(f"[OK] Hasil ditulis ke {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
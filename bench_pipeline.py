@@ -0,0 +1,95 @@
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# ==========================
+# BENCHMARK PIPELINE
+# ==========================
+# Setiap kombinasi setting dijalankan lewat replay.py di proses sendiri,
+# supaya peak memory dan warm-up tiap varian tidak saling mempengaruhi.
+REPLAY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay.py")
+
+
+def run_variant(source_args, variant, extra_args):
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "report.json")
+        cmd = [sys.executable, REPLAY_SCRIPT, *source_args, "--json", report_path, *extra_args]
+        for key, value in variant.items():
+            if key == "gate":
+                if value == "off":
+                    cmd.append("--no-gate")
+                continue
+            cmd += [f"--{key}", str(value)]
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0 or not os.path.exists(report_path):
+            return {"variant": variant, "error": proc.stderr.strip().splitlines()[-5:]}
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+        report["variant"] = variant
+        report["wall_s"] = time.perf_counter() - start
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan model / resolusi / setting pipeline")
+    parser.add_argument("--product", default=None)
+    parser.add_argument("--face", default=None)
+    parser.add_argument("--dataset", default=None)
+    parser.add_argument("--split", default="val")
+    parser.add_argument("--weights", nargs="+", default=[None])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[None])
+    parser.add_argument("--conf", nargs="+", type=float, default=[None])
+    parser.add_argument("--device", nargs="+", default=["cpu"])
+    parser.add_argument("--gate", nargs="+", default=["on"], choices=["on", "off"],
+                        help="Motion gate; 'on off' untuk membandingkan")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--plot", action="store_true")
+    parser.add_argument("--out", default="-", help="File JSON output ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    source_args = []
+    if args.product:
+        source_args += ["--product", args.product]
+    elif args.dataset:
+        source_args += ["--dataset", args.dataset, "--split", args.split]
+    else:
+        parser.error("Isi --product atau --dataset")
+    if args.face:
+        source_args += ["--face", args.face]
+
+    extra = ["--max-frames", str(args.max_frames)]
+    if args.plot:
+        extra.append("--plot")
+
+    results = []
+    grid = itertools.product(args.weights, args.imgsz, args.conf, args.device, args.gate)
+    for weights, imgsz, conf, device, gate in grid:
+        variant = {k: v for k, v in
+                   {"weights": weights, "imgsz": imgsz, "conf": conf, "device": device,
+                    "gate": gate}.items()
+                   if v is not None}
+        report = run_variant(source_args, variant, extra)
+        results.append(report)
+        if "error" in report:
+            print(f"[WARN] {variant}: gagal", file=sys.stderr)
+        else:
+            print(f"[OK] {variant}: {report['fps']:.1f} FPS, "
+                  f"{report['gate']['gated_ratio']:.0%} frame di-gate", file=sys.stderr)
+
+    text = json.dumps({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
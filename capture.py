@@ -0,0 +1,256 @@
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+# ==========================
+# CONFIG
+# ==========================
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+RETRY_DELAY = 0.5  # detik, jeda sebelum buka ulang source yang putus
+
+
+def default_backend():
+    """Backend OpenCV sesuai OS (DirectShow di Windows, V4L2 di Linux)"""
+    if sys.platform.startswith("win"):
+        return cv2.CAP_DSHOW
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+# ==========================
+# SOURCES
+# ==========================
+class CameraSource:
+    """Webcam / device V4L2 / DirectShow lewat cv2.VideoCapture"""
+
+    live = True
+
+    def __init__(self, index, resolution=None, fps=None, backend=None):
+        self.index = index
+        self.resolution = resolution
+        self.fps = fps
+        self.backend = default_backend() if backend is None else backend
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.index, self.backend)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Kamera index {self.index} gagal")
+        if self.resolution:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        if self.fps:
+            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Jangan biarkan driver menumpuk frame basi
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def __repr__(self):
+        return f"CameraSource({self.index})"
+
+
+class VideoFileSource:
+    """File video rekaman. realtime=True -> diputar sesuai FPS aslinya"""
+
+    live = False
+
+    def __init__(self, path, loop=False, realtime=True, fps=None):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.fps = fps
+        self.cap = None
+        self._next_at = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Video {self.path} gagal dibuka")
+        if not self.fps:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._next_at = time.monotonic()
+
+    def read(self):
+        if self.realtime:
+            _pace(self)
+        ok, frame = self.cap.read()
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        return ok, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def __repr__(self):
+        return f"VideoFileSource({self.path!r})"
+
+
+class ImageFolderSource:
+    """Folder gambar (mis. split dataset di data jajan.yaml) sebagai stream frame"""
+
+    live = False
+
+    def __init__(self, path, fps=30.0, loop=False, realtime=True):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self.files = []
+        self._pos = 0
+        self._next_at = None
+
+    def open(self):
+        if not os.path.isdir(self.path):
+            raise RuntimeError(f"Folder {self.path} tidak ada")
+        self.files = sorted(
+            os.path.join(self.path, f) for f in os.listdir(self.path)
+            if f.lower().endswith(IMAGE_EXTS)
+        )
+        if not self.files:
+            raise RuntimeError(f"Folder {self.path} tidak berisi gambar")
+        self._pos = 0
+        self._next_at = time.monotonic()
+
+    def read(self):
+        if self._pos >= len(self.files):
+            if not self.loop:
+                return False, None
+            self._pos = 0
+        if self.realtime:
+            _pace(self)
+        frame = cv2.imread(self.files[self._pos])
+        self._pos += 1
+        return frame is not None, frame
+
+    def release(self):
+        pass
+
+    def __repr__(self):
+        return f"ImageFolderSource({self.path!r})"
+
+
+def _pace(source):
+    """Tahan read() supaya file diputar sesuai FPS, seperti kamera sungguhan"""
+    now = time.monotonic()
+    if source._next_at > now:
+        time.sleep(source._next_at - now)
+    source._next_at = max(source._next_at, now) + 1.0 / source.fps
+
+
+def open_source(spec, resolution=None, fps=None, loop=False, realtime=True):
+    """int -> kamera, folder -> ImageFolderSource, file lain -> VideoFileSource"""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec), resolution, fps)
+    if os.path.isdir(spec):
+        return ImageFolderSource(spec, fps=fps or 30.0, loop=loop, realtime=realtime)
+    return VideoFileSource(spec, loop=loop, realtime=realtime, fps=fps)
+
+
+# ==========================
+# FRAME GRABBER
+# ==========================
+class Frame:
+    __slots__ = ("image", "timestamp", "seq")
+
+    def __init__(self, image, timestamp, seq):
+        self.image = image
+        self.timestamp = timestamp
+        self.seq = seq
+
+
+class FrameGrabber:
+    """Satu thread per kamera, hanya menyimpan frame terbaru.
+
+    Inference mengambil latest() tanpa menunggu kamera lain; frame yang
+    tertimpa sebelum sempat diambil dihitung sebagai dropped.
+    """
+
+    def __init__(self, source, name=None):
+        self.source = source
+        self.name = name or repr(source)
+        self.dropped = 0
+        self.captured = 0
+        self.finished = False
+
+        self._frame = None
+        self._taken = True
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.source.open()
+        self._thread = threading.Thread(target=self._run, name=f"grab-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            ok, image = self.source.read()
+            if not ok:
+                if not self.source.live:
+                    # File habis -> selesai
+                    break
+                # Kamera putus sesaat -> buka ulang
+                self.source.release()
+                if self._stop.wait(RETRY_DELAY):
+                    break
+                try:
+                    self.source.open()
+                except RuntimeError as e:
+                    print(f"[WARN] {self.name}: {e}")
+                continue
+
+            with self._cond:
+                self._seq += 1
+                if not self._taken:
+                    self.dropped += 1
+                self._frame = Frame(image, time.monotonic(), self._seq)
+                self._taken = False
+                self.captured += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self.finished = True
+            self._cond.notify_all()
+
+    def latest(self):
+        """Frame terbaru (atau None jika belum ada), tidak pernah menunggu"""
+        with self._cond:
+            self._taken = True
+            return self._frame
+
+    def wait_newer(self, seq, timeout=None):
+        """Tunggu frame dengan seq > seq. Return None jika timeout / source habis"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: (self._frame is not None and self._frame.seq > seq) or self.finished,
+                timeout
+            )
+            if self._frame is None or self._frame.seq <= seq:
+                return None
+            self._taken = True
+            return self._frame
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.source.release()
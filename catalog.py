@@ -0,0 +1,155 @@
+import threading
+
+import kasir_db
+import migrations
+
+# ==========================
+# CONFIG
+# ==========================
+CHECK_INTERVAL = 1.0  # detik, cek PRAGMA data_version + catalog_version
+
+
+class Product:
+    __slots__ = ("class_name", "name", "price")
+
+    def __init__(self, class_name, name, price):
+        self.class_name = class_name
+        self.name = name
+        self.price = price
+
+
+# ==========================
+# CATALOG
+# ==========================
+class Catalog:
+    """Seluruh tabel products di memori, diindeks label dan class id YOLO.
+
+    Dimuat sekali saat start; thread watcher membaca PRAGMA data_version
+    di koneksinya sendiri (naik tiap ada commit dari koneksi lain, termasuk
+    tiap pembayaran), lalu baris catalog_version yang hanya naik lewat
+    trigger di products. Tabel products dibaca ulang hanya jika versi itu
+    berubah. State diganti atomik, jadi lookup dari thread vision / UI
+    tidak pernah menyentuh DB.
+    """
+
+    def __init__(self, path=kasir_db.DB_PATH, class_names=None,
+                 check_interval=CHECK_INTERVAL, watch=True):
+        self.path = path
+        self.check_interval = check_interval
+        self.listeners = []    # fn() dipanggil (dari thread watcher) setelah reload
+        self.version = 0
+        self._class_names = {}
+        self._state = ({}, ())  # (label -> Product, class id -> Product | None)
+        self._data_version = None
+        self._catalog_version = None
+        self._rows = None
+        self._conn = kasir_db.connect(path)
+        migrations.migrate(self._conn, verbose=False)
+        self._reload_lock = threading.Lock()
+
+        if class_names is not None:
+            self._class_names = dict(class_names)
+        self.reload(force=True)
+        if watch:
+            self._start_watch()
+
+    def _start_watch(self):
+        self._stop = threading.Event()
+        threading.Thread(target=self._watch_loop, name="catalog-watch", daemon=True).start()
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                if self.reload():
+                    for fn in list(self.listeners):
+                        fn()
+            except Exception as e:
+                print(f"[WARN] Reload catalog gagal: {e}")
+
+    def stop(self):
+        if hasattr(self, '_stop'):
+            self._stop.set()
+
+    def __len__(self):
+        return len(self._state[0])
+
+    # ==========================
+    # LOAD / RELOAD
+    # ==========================
+    def reload(self, force=False):
+        """Muat ulang jika catalog_version berubah. Return True jika ada perubahan"""
+        with self._reload_lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if not force and data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            catalog_version = self._conn.execute(
+                "SELECT version FROM catalog_version WHERE id = 1"
+            ).fetchone()[0]
+            if not force and catalog_version == self._catalog_version:
+                return False  # commit di tabel lain (transaksi), katalog tetap
+            self._catalog_version = catalog_version
+            rows = self._conn.execute(
+                "SELECT class_name, product_name, price FROM products"
+            ).fetchall()
+            if rows == self._rows:
+                return False  # upsert dengan nilai yang sama
+
+            self._rows = rows
+            by_label = {row[0]: Product(*row) for row in rows}
+            self._state = (by_label, self._index(by_label))
+            self.version += 1
+            print(f"[OK] Catalog: {len(by_label)} produk (versi {self.version})")
+            return True
+
+    def _index(self, by_label):
+        if not self._class_names:
+            return ()
+        table = [None] * (max(self._class_names) + 1)
+        for cls, label in self._class_names.items():
+            table[cls] = by_label.get(label)
+        return tuple(table)
+
+    def bind(self, class_names):
+        """Pasang mapping class id -> label dari model YOLO (model.names)"""
+        with self._reload_lock:
+            self._class_names = dict(class_names)
+            by_label = self._state[0]
+            self._state = (by_label, self._index(by_label))
+            missing = [l for l in self._class_names.values() if l not in by_label]
+        if missing:
+            print(f"[WARN] Kelas YOLO tanpa produk di DB: {', '.join(missing)}")
+        return self
+
+    # ==========================
+    # LOOKUP (tanpa DB)
+    # ==========================
+    def get(self, class_name):
+        return self._state[0].get(class_name)
+
+    def by_class(self, class_id):
+        table = self._state[1]
+        return table[class_id] if 0 <= class_id < len(table) else None
+
+    def total(self, counts_by_class):
+        """Nilai cart {class_id: qty}; kelas tanpa produk dihitung 0"""
+        table = self._state[1]
+        total = 0
+        for cls, qty in counts_by_class.items():
+            product = table[cls] if 0 <= cls < len(table) else None
+            if product is not None:
+                total += product.price * qty
+        return total
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def default_catalog():
+    """Catalog bersama satu proses (UI dan vision)"""
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = Catalog()
+        return _default_catalog
@@ -0,0 +1,83 @@
+from collections import Counter, deque
+
+# ==========================
+# CONFIG
+# ==========================
+COUNT_WINDOW = 15   # frame, jendela voting kelas per track
+COUNT_ENTER = 3     # frame terdeteksi sebelum item dianggap ada di tray
+COUNT_EXIT = 10     # frame tidak terlihat sebelum item dianggap diambil
+
+
+class _TrackVotes:
+    __slots__ = ("votes", "hits", "last_seen", "present")
+
+    def __init__(self, window):
+        self.votes = deque(maxlen=window)
+        self.hits = 0
+        self.last_seen = 0
+        self.present = False
+
+    def label(self):
+        """Kelas mayoritas di jendela (seri -> vote terbaru menang)"""
+        tally = Counter(self.votes)
+        best = max(tally.values())
+        for cls in reversed(self.votes):
+            if tally[cls] == best:
+                return cls
+
+
+# ==========================
+# COUNT STABILIZER
+# ==========================
+class CountStabilizer:
+    """Isi cart yang stabil dari ID ByteTrack.
+
+    Tiap track id mengumpulkan vote kelas di jendela geser. Item baru
+    masuk hitungan setelah terlihat COUNT_ENTER frame, dan baru keluar
+    setelah hilang COUNT_EXIT frame, jadi deteksi yang berkedip tidak
+    membuat cart berubah-ubah. update() hanya mengembalikan counts saat
+    hasil stabilnya berubah.
+    """
+
+    def __init__(self, window=COUNT_WINDOW, enter=COUNT_ENTER, exit=COUNT_EXIT):
+        self.window = window
+        self.enter = enter
+        self.exit = exit
+        self.tracks = {}
+        self.frame = 0
+        self.counts = {}
+        self._dirty = True
+
+    def update(self, track_ids, classes):
+        """Satu frame deteksi. Return {class_id: qty} jika berubah, selain itu None"""
+        self.frame += 1
+        for tid, cls in zip(track_ids, classes):
+            track = self.tracks.get(tid)
+            if track is None:
+                track = self.tracks[tid] = _TrackVotes(self.window)
+            track.votes.append(int(cls))
+            track.hits += 1
+            track.last_seen = self.frame
+            if not track.present and track.hits >= self.enter:
+                track.present = True
+
+        # Buang track yang sudah lama hilang (hysteresis keluar)
+        for tid in [t for t, tr in self.tracks.items() if self.frame - tr.last_seen >= self.exit]:
+            del self.tracks[tid]
+
+        counts = Counter(tr.label() for tr in self.tracks.values() if tr.present)
+        counts = dict(counts)
+        if counts == self.counts and not self._dirty:
+            return None
+        self.counts = counts
+        self._dirty = False
+        return counts
+
+    def resync(self):
+        """Paksa update() berikutnya mengirim counts walau tidak berubah (mis. cart di-reset)"""
+        self._dirty = True
+
+    def reset(self):
+        self.tracks.clear()
+        self.counts = {}
+        self._dirty = True
@@ -0,0 +1,165 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from face_gallery import FACE_DIR, GALLERY_DIR, read_gallery, write_gallery
+
+# ==========================
+# CONFIG
+# ==========================
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+ENROLL_DET_SIZE = (640, 640)  # foto enroll resolusinya bebas, pakai det_size penuh
+
+# ==========================
+# WORKER (satu FaceAnalysis per proses)
+# ==========================
+_face_app = None
+
+
+def _init_worker(providers):
+    global _face_app
+    from insightface.app import FaceAnalysis
+
+    ctx_id = 0 if "CUDAExecutionProvider" in providers else -1
+    _face_app = FaceAnalysis(
+        name="buffalo_l",
+        allowed_modules=["detection", "recognition"],
+        providers=providers
+    )
+    _face_app.prepare(ctx_id=ctx_id, det_size=ENROLL_DET_SIZE)
+
+
+def _embed_person(job):
+    """Rata-rata embedding (ter-normalisasi) dari semua foto satu orang"""
+    name, paths = job
+    embeddings = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        faces = _face_app.get(img)
+        if not faces:
+            continue
+        # Ambil wajah terbesar di foto
+        face = max(faces, key=lambda f: (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1]))
+        embeddings.append(face.normed_embedding)
+    if not embeddings:
+        return name, None, len(paths)
+    mean = np.mean(embeddings, axis=0)
+    return name, mean / np.linalg.norm(mean), len(embeddings)
+
+
+# ==========================
+# ENROLL
+# ==========================
+def collect_people(photo_dir):
+    """photo_dir/<nama>/*.jpg -> [(nama, [path, ...])]"""
+    people = []
+    for entry in sorted(os.scandir(photo_dir), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        paths = [
+            os.path.join(entry.path, f) for f in sorted(os.listdir(entry.path))
+            if f.lower().endswith(IMAGE_EXTS)
+        ]
+        if paths:
+            people.append((entry.name, paths))
+    return people
+
+
+def load_npy_faces(face_dir):
+    """Import embedding lama faces/<nama>.npy"""
+    result = {}
+    if os.path.isdir(face_dir):
+        for filename in sorted(os.listdir(face_dir)):
+            if filename.endswith('.npy'):
+                result[filename[:-len('.npy')]] = np.load(os.path.join(face_dir, filename)).ravel()
+    return result
+
+
+def enroll(photo_dir, out_dir=GALLERY_DIR, dtype="float16", workers=None,
+           providers=("CPUExecutionProvider",), include_npy=None, nlist=None, replace=False):
+    """Enroll foto (dan .npy lama) ke gallery.
+
+    Default digabung dengan member gallery yang sudah ada (nama sama ->
+    embedding baru menang). Gallery pertama kali dibuat: faces/*.npy ikut
+    masuk, karena setelah ada gallery file .npy tidak dibaca lagi.
+    replace=True menulis ulang gallery hanya dari input ini.
+    """
+    people = collect_people(photo_dir) if photo_dir else []
+    existing = read_gallery(out_dir)
+    embeddings = {}
+    if not replace:
+        embeddings.update(existing)
+        if existing:
+            print(f"[OK] Gabung dengan gallery {out_dir}/: {len(existing)} member")
+        elif include_npy is None:
+            include_npy = os.path.dirname(os.path.normpath(out_dir))
+    if include_npy:
+        legacy = load_npy_faces(include_npy)
+        embeddings.update(legacy)
+        if legacy:
+            print(f"[OK] Import {len(legacy)} embedding dari {include_npy}/")
+
+    start = time.time()
+    if people:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(list(providers),)
+        ) as pool:
+            for i, (name, emb, used) in enumerate(pool.map(_embed_person, people, chunksize=4), 1):
+                if emb is None:
+                    print(f"[WARN] {name}: tidak ada wajah terdeteksi")
+                    continue
+                embeddings[name] = emb
+                if i % 100 == 0 or i == len(people):
+                    print(f"[..] {i}/{len(people)} orang ({time.time() - start:.1f}s)")
+
+    if not embeddings:
+        raise RuntimeError("Tidak ada embedding untuk ditulis")
+    dropped = sorted(set(existing) - set(embeddings))
+    if dropped:
+        print(f"[WARN] --replace: {len(dropped)} member lama dihapus dari gallery: "
+              f"{', '.join(dropped[:20])}{', ...' if len(dropped) > 20 else ''}")
+
+    names = sorted(embeddings)
+    meta = write_gallery(out_dir, names, np.stack([embeddings[n] for n in names]),
+                         dtype=dtype, nlist=nlist)
+    print(f"[OK] Gallery {out_dir}/ v{meta['version']}: {meta['count']} member, "
+          f"{meta['dtype']}, {meta['nlist']} lists ({time.time() - start:.1f}s)")
+    return meta
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch enroll member ke gallery wajah gabungan")
+    parser.add_argument("photo_dir", nargs="?", help="Folder berisi <nama>/*.jpg per member")
+    parser.add_argument("--out", default=GALLERY_DIR, help="Folder output gallery")
+    parser.add_argument("--dtype", choices=["float16", "int8"], default="float16")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses (default: jumlah CPU)")
+    parser.add_argument("--gpu", action="store_true", help="Pakai CUDAExecutionProvider")
+    parser.add_argument("--nlist", type=int, default=None, help="Jumlah inverted list IVF")
+    parser.add_argument("--include-npy", nargs="?", const=FACE_DIR, default=None,
+                        help="Ikutkan embedding lama <dir>/*.npy (default: faces/)")
+    parser.add_argument("--replace", action="store_true",
+                        help="Tulis ulang gallery hanya dari input ini (member lama yang tidak ada dihapus)")
+    args = parser.parse_args(argv)
+
+    if not args.photo_dir and not args.include_npy:
+        parser.error("Isi photo_dir dan/atau --include-npy")
+
+    providers = ["CUDAExecutionProvider", "CPUExecutionProvider"] if args.gpu else ["CPUExecutionProvider"]
+    enroll(args.photo_dir, args.out, args.dtype, args.workers, providers, args.include_npy, args.nlist,
+           replace=args.replace)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
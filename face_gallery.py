@@ -0,0 +1,443 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# ==========================
+# CONFIG
+# ==========================
+FACE_DIR = "faces"
+GALLERY_DIR = os.path.join(FACE_DIR, "gallery")  # hasil enroll_faces.py
+FACE_THRESH = 0.5
+RELOAD_INTERVAL = 2.0  # detik, interval cek perubahan folder faces/
+
+SEARCH_MODES = ("ann", "exact")
+NPROBE = 8                # jumlah inverted list yang dicek per query (mode ann)
+EXACT_CHUNK = 65536       # baris per chunk saat brute-force di memmap
+
+
+def _normalize(mat):
+    """Normalisasi L2 per baris (aman untuk vektor nol)"""
+    mat = np.asarray(mat, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat[None, :]
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def _top_k(sims, k):
+    """Index + skor top-k per baris, urut menurun"""
+    k = min(k, sims.shape[1])
+    if k < sims.shape[1]:
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(sims.shape[1]), sims.shape)
+    top = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class _BaseGallery:
+    """Bagian bersama: thread watcher + identify() di atas search()"""
+
+    thresh = FACE_THRESH
+    reload_interval = RELOAD_INTERVAL
+
+    def _start_watch(self):
+        self._stop = threading.Event()
+        threading.Thread(target=self._watch_loop, daemon=True).start()
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"[WARN] Reload face gallery gagal: {e}")
+
+    def stop(self):
+        if hasattr(self, '_stop'):
+            self._stop.set()
+
+    def identify(self, embeddings):
+        """Nama terbaik per embedding, "Unknown" jika di bawah threshold"""
+        result = []
+        for hits in self.search(embeddings, top_k=1):
+            if hits and hits[0][1] > self.thresh:
+                result.append(hits[0][0])
+            else:
+                result.append("Unknown")
+        return result
+
+
+# ==========================
+# FACE GALLERY (faces/*.npy)
+# ==========================
+class FaceGallery(_BaseGallery):
+    """Semua embedding member dalam satu matriks ter-normalisasi.
+
+    Matching seluruh wajah dalam satu frame cukup satu perkalian matriks.
+    Folder dicek berkala (mtime) oleh thread background, jadi file .npy
+    yang ditambah/dihapus langsung terpakai tanpa restart dan tanpa
+    memblokir camera loop.
+    """
+
+    def __init__(self, face_dir=FACE_DIR, thresh=FACE_THRESH,
+                 reload_interval=RELOAD_INTERVAL, watch=True):
+        self.face_dir = face_dir
+        self.thresh = thresh
+        self.reload_interval = reload_interval
+
+        # (names, matrix) di-swap sekaligus -> reader tidak perlu lock
+        self._state = ([], np.zeros((0, 0), dtype=np.float32))
+        self._files = {}  # filename -> (mtime, size, embedding)
+        self._reload_lock = threading.Lock()
+
+        self.reload()
+        if watch:
+            self._start_watch()
+
+    def __len__(self):
+        return len(self._state[0])
+
+    @property
+    def names(self):
+        return list(self._state[0])
+
+    # ==========================
+    # LOAD / RELOAD
+    # ==========================
+    def _scan(self):
+        """Snapshot isi folder: filename -> (mtime, size)"""
+        entries = {}
+        if not os.path.isdir(self.face_dir):
+            return entries
+        for entry in os.scandir(self.face_dir):
+            if entry.is_file() and entry.name.endswith('.npy'):
+                st = entry.stat()
+                entries[entry.name] = (st.st_mtime_ns, st.st_size)
+        return entries
+
+    def reload(self):
+        """Load ulang hanya file yang berubah, lalu swap matriks. Return True jika ada perubahan"""
+        with self._reload_lock:
+            snapshot = self._scan()
+            changed = set(snapshot) != set(self._files)
+
+            files = {}
+            for filename, stamp in snapshot.items():
+                cached = self._files.get(filename)
+                if cached and cached[:2] == stamp:
+                    files[filename] = cached
+                    continue
+                try:
+                    emb = np.load(os.path.join(self.face_dir, filename)).astype(np.float32).ravel()
+                except (OSError, ValueError) as e:
+                    # File mungkin masih ditulis, coba lagi di siklus berikutnya
+                    print(f"[WARN] Gagal load {filename}: {e}")
+                    continue
+                files[filename] = (stamp[0], stamp[1], emb)
+                changed = True
+
+            if not changed:
+                return False
+
+            names = sorted(files)
+            if names:
+                matrix = _normalize(np.stack([files[n][2] for n in names]))
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            self._files = files
+            self._state = ([n[:-len('.npy')] for n in names], matrix)
+            print(f"[OK] Loaded {len(names)} faces from {self.face_dir}/")
+            return True
+
+    # ==========================
+    # MATCHING
+    # ==========================
+    def search(self, embeddings, top_k=1):
+        """Top-k (name, score) untuk setiap embedding, satu matmul untuk semua wajah"""
+        names, matrix = self._state
+        emb = np.asarray(embeddings, dtype=np.float32)
+        if emb.size == 0:
+            return []
+        query = _normalize(emb)
+        if not names:
+            return [[] for _ in range(len(query))]
+
+        idx, top = _top_k(query @ matrix.T, top_k)
+        return [
+            [(names[j], float(s)) for j, s in zip(row_idx, row_sim)]
+            for row_idx, row_sim in zip(idx, top)
+        ]
+
+
+# ==========================
+# CONSOLIDATED GALLERY (memmap + IVF)
+# ==========================
+META_FILE = "meta.json"
+
+
+def quantize(matrix, dtype="float16"):
+    """Embedding ter-normalisasi -> (array float16/int8, scale)"""
+    matrix = _normalize(matrix)
+    if dtype == "float16":
+        return matrix.astype(np.float16), 1.0
+    if dtype == "int8":
+        scale = 127.0
+        return np.clip(np.rint(matrix * scale), -127, 127).astype(np.int8), scale
+    raise ValueError("dtype harus 'float16' atau 'int8'")
+
+
+def default_nlist(count):
+    """Jumlah inverted list: 1 (brute-force) untuk gallery kecil, ~4*sqrt(N) untuk besar"""
+    if count < 2048:
+        return 1
+    return int(4 * np.sqrt(count))
+
+
+def build_ivf(matrix, nlist, iters=10, seed=0):
+    """Spherical k-means sederhana -> (centroids, assignment per baris)"""
+    matrix = _normalize(matrix)
+    if nlist <= 1:
+        return _normalize(matrix.mean(axis=0)), np.zeros(len(matrix), dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), nlist * 256)
+    sample = matrix[rng.choice(len(matrix), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = np.bincount(assign, minlength=nlist) > 0
+        centroids[filled] = _normalize(sums[filled])
+
+    assign = np.empty(len(matrix), dtype=np.int64)
+    for lo in range(0, len(matrix), EXACT_CHUNK):
+        assign[lo:lo + EXACT_CHUNK] = np.argmax(matrix[lo:lo + EXACT_CHUNK] @ centroids.T, axis=1)
+    return centroids, assign
+
+
+def write_gallery(gallery_dir, names, embeddings, dtype="float16", nlist=None):
+    """Tulis gallery gabungan: embeddings (urut per inverted list), names sidecar, IVF, meta.
+
+    File diberi nomor versi dan meta.json ditulis paling akhir, jadi reader
+    yang sedang memmap versi lama tidak terganggu (aman juga di Windows).
+    """
+    os.makedirs(gallery_dir, exist_ok=True)
+    matrix = _normalize(embeddings)
+    if len(names) != len(matrix):
+        raise ValueError("Jumlah names dan embeddings tidak sama")
+
+    nlist = default_nlist(len(matrix)) if nlist is None else max(1, int(nlist))
+    centroids, assign = build_ivf(matrix, nlist)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(assign, minlength=len(centroids)))
+    data, scale = quantize(matrix[order], dtype)
+
+    old_meta = _read_meta(gallery_dir)
+    version = (old_meta or {}).get("version", 0) + 1
+    files = {
+        "embeddings": f"embeddings.{version}.npy",
+        "names": f"names.{version}.txt",
+        "ivf": f"ivf.{version}.npz",
+    }
+    np.save(os.path.join(gallery_dir, files["embeddings"]), data)
+    with open(os.path.join(gallery_dir, files["names"]), "w", encoding="utf-8") as f:
+        for i in order:
+            f.write(f"{names[i]}\n")
+    np.savez(os.path.join(gallery_dir, files["ivf"]), centroids=centroids, offsets=offsets)
+
+    meta = {
+        "version": version,
+        "count": int(len(matrix)),
+        "dim": int(matrix.shape[1]),
+        "dtype": dtype,
+        "scale": scale,
+        "nlist": int(len(centroids)),
+        "files": files,
+    }
+    tmp = os.path.join(gallery_dir, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(gallery_dir, META_FILE))
+
+    # Bersihkan versi lama (boleh gagal jika masih di-memmap proses lain)
+    if old_meta:
+        for name in old_meta.get("files", {}).values():
+            try:
+                os.remove(os.path.join(gallery_dir, name))
+            except OSError:
+                pass
+    return meta
+
+
+def _read_meta(gallery_dir):
+    path = os.path.join(gallery_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_gallery(gallery_dir=GALLERY_DIR):
+    """{nama: embedding float32} dari gallery gabungan ({} jika belum ada), untuk merge saat enroll"""
+    meta = _read_meta(gallery_dir)
+    if meta is None:
+        return {}
+    files = meta["files"]
+    data = np.load(os.path.join(gallery_dir, files["embeddings"]), mmap_mode="r")
+    with open(os.path.join(gallery_dir, files["names"]), encoding="utf-8") as f:
+        names = [line.rstrip("\n") for line in f]
+    matrix = np.asarray(data, dtype=np.float32) / float(meta["scale"])
+    return dict(zip(names, matrix))
+
+
+def npy_names(face_dir=FACE_DIR):
+    """Nama member dari embedding lama faces/<nama>.npy"""
+    if not os.path.isdir(face_dir):
+        return []
+    return sorted(f[:-len('.npy')] for f in os.listdir(face_dir) if f.endswith('.npy'))
+
+
+class MemmapGallery(_BaseGallery):
+    """Gallery gabungan hasil enroll_faces.py, di-memmap dari disk.
+
+    Mode "ann" hanya membaca inverted list terdekat (nprobe), jadi latency
+    dan RSS relatif datar walau member bertambah. Mode "exact" scan semua
+    baris per chunk, dipakai sebagai pembanding recall.
+    """
+
+    def __init__(self, gallery_dir=GALLERY_DIR, thresh=FACE_THRESH, mode="ann",
+                 nprobe=NPROBE, reload_interval=RELOAD_INTERVAL, watch=True):
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode harus salah satu dari {SEARCH_MODES}")
+        self.gallery_dir = gallery_dir
+        self.thresh = thresh
+        self.mode = mode
+        self.nprobe = nprobe
+        self.reload_interval = reload_interval
+
+        self._state = None
+        self._meta_stamp = None
+        self._reload_lock = threading.Lock()
+
+        self.reload()
+        if watch:
+            self._start_watch()
+
+    def __len__(self):
+        return 0 if self._state is None else len(self._state["names"])
+
+    @property
+    def names(self):
+        return [] if self._state is None else list(self._state["names"])
+
+    def reload(self):
+        """Buka ulang memmap jika meta.json berubah. Return True jika ada perubahan"""
+        with self._reload_lock:
+            path = os.path.join(self.gallery_dir, META_FILE)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return False
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._meta_stamp:
+                return False
+
+            meta = _read_meta(self.gallery_dir)
+            files = meta["files"]
+            data = np.load(os.path.join(self.gallery_dir, files["embeddings"]), mmap_mode="r")
+            with open(os.path.join(self.gallery_dir, files["names"]), encoding="utf-8") as f:
+                names = [line.rstrip("\n") for line in f]
+            with np.load(os.path.join(self.gallery_dir, files["ivf"])) as ivf:
+                centroids = ivf["centroids"].astype(np.float32)
+                offsets = ivf["offsets"]
+            if not (len(names) == len(data) == offsets[-1]):
+                print(f"[WARN] Gallery {self.gallery_dir} tidak konsisten, coba lagi nanti")
+                return False
+
+            self._state = {
+                "names": names,
+                "data": data,
+                "inv_scale": 1.0 / float(meta["scale"]),
+                "centroids": centroids,
+                "offsets": offsets,
+            }
+            self._meta_stamp = stamp
+            print(f"[OK] Loaded {len(names)} faces from {self.gallery_dir}/ "
+                  f"({meta['dtype']}, {meta['nlist']} lists)")
+            return True
+
+    # ==========================
+    # MATCHING
+    # ==========================
+    def search(self, embeddings, top_k=1, mode=None, nprobe=None):
+        """Top-k (name, score) per embedding. mode: "ann" (default) atau "exact" """
+        state = self._state
+        emb = np.asarray(embeddings, dtype=np.float32)
+        if emb.size == 0:
+            return []
+        query = _normalize(emb)
+        if state is None or not state["names"]:
+            return [[] for _ in range(len(query))]
+
+        mode = mode or self.mode
+        if mode == "exact":
+            idx, top = self._search_exact(state, query, top_k)
+        else:
+            idx, top = self._search_ann(state, query, top_k, nprobe or self.nprobe)
+        names = state["names"]
+        return [
+            [(names[j], float(s)) for j, s in zip(row_idx, row_sim)]
+            for row_idx, row_sim in zip(idx, top)
+        ]
+
+    def _search_ann(self, state, query, top_k, nprobe):
+        offsets = state["offsets"]
+        probe = _top_k(query @ state["centroids"].T, nprobe)[0]
+
+        # Gabungan list yang di-probe semua query -> satu matmul
+        rows = [
+            np.arange(offsets[c], offsets[c + 1])
+            for c in np.unique(probe)
+            if offsets[c + 1] > offsets[c]
+        ]
+        if not rows:
+            return np.zeros((len(query), 0), dtype=np.int64), np.zeros((len(query), 0))
+        rows = np.concatenate(rows)
+        block = np.asarray(state["data"][rows], dtype=np.float32)
+        sims = (query @ block.T) * state["inv_scale"]
+        idx, top = _top_k(sims, top_k)
+        return rows[idx], top
+
+    def _search_exact(self, state, query, top_k):
+        data = state["data"]
+        best_idx = np.zeros((len(query), 0), dtype=np.int64)
+        best_sim = np.zeros((len(query), 0), dtype=np.float32)
+        for lo in range(0, len(data), EXACT_CHUNK):
+            block = np.asarray(data[lo:lo + EXACT_CHUNK], dtype=np.float32)
+            pick, sims = _top_k((query @ block.T) * state["inv_scale"], top_k)
+            idx = np.concatenate([best_idx, pick + lo], axis=1)
+            sims = np.concatenate([best_sim, sims], axis=1)
+            pick, best_sim = _top_k(sims, top_k)
+            best_idx = np.take_along_axis(idx, pick, axis=1)
+        return best_idx, best_sim
+
+
+def load_gallery(face_dir=FACE_DIR, thresh=FACE_THRESH, mode="ann", nprobe=NPROBE, watch=True):
+    """Pakai gallery gabungan (faces/gallery/) jika ada, selain itu faces/*.npy"""
+    gallery_dir = os.path.join(face_dir, "gallery")
+    if os.path.exists(os.path.join(gallery_dir, META_FILE)):
+        gallery = MemmapGallery(gallery_dir, thresh, mode=mode, nprobe=nprobe, watch=watch)
+        # .npy lama tidak dibaca lagi setelah ada gallery: jangan sampai hilang diam-diam
+        missing = sorted(set(npy_names(face_dir)) - set(gallery.names))
+        if missing:
+            print(f"[WARN] {len(missing)} member di {face_dir}/*.npy tidak ada di gallery dan diabaikan "
+                  f"({', '.join(missing[:10])}{', ...' if len(missing) > 10 else ''}); "
+                  f"jalankan: python enroll_faces.py --include-npy")
+        return gallery
+    return FaceGallery(face_dir, thresh, watch=watch)
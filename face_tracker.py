@@ -0,0 +1,214 @@
+import time
+
+import numpy as np
+
+# ==========================
+# CONFIG
+# ==========================
+REVERIFY_INTERVAL = 2.0   # detik, cek ulang identitas track
+REVERIFY_IOU = 0.5        # bbox berubah jauh (IoU < ini) -> cek ulang
+MATCH_IOU = 0.3           # minimal IoU untuk menyambung track
+MAX_MISSES = 5            # frame tanpa deteksi sebelum track dibuang
+FACE_MODES = ("all", "largest", "central")
+
+
+def det_size_for(resolution, stride=32):
+    """Ukuran input detektor mengikuti resolusi kamera wajah (kelipatan stride)"""
+    w, h = resolution
+    return (
+        max(stride, -(-int(w) // stride) * stride),
+        max(stride, -(-int(h) // stride) * stride),
+    )
+
+
+def bbox_iou(a, b):
+    """IoU antar array bbox (N,4) dan (M,4) -> (N,M)"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def embed_crops(face_app, crops):
+    """Satu batch ArcFace untuk semua crop -> array (N, 512)"""
+    if not crops:
+        return np.zeros((0, 512), dtype=np.float32)
+    return face_app.models['recognition'].get_feat(crops)
+
+
+class FaceTrack:
+    def __init__(self, track_id, bbox, now):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.name = "Unknown"
+        self.verified_bbox = None
+        self.verified_at = None
+        self.last_seen = now
+        self.misses = 0
+
+    def needs_verify(self, now, interval, iou_thresh):
+        if self.verified_at is None:
+            return True
+        if interval and now - self.verified_at >= interval:
+            return True
+        return bbox_iou(self.bbox, self.verified_bbox)[0, 0] < iou_thresh
+
+
+# ==========================
+# FACE TRACKER
+# ==========================
+class FaceTracker:
+    """Track wajah antar frame supaya embedding + matching hanya jalan saat perlu.
+
+    Deteksi tetap tiap frame (murah), tapi ArcFace + gallery hanya dipanggil
+    saat track baru muncul, saat interval re-verify habis, atau saat bbox
+    bergeser jauh dari posisi waktu terakhir diverifikasi.
+    """
+
+    def __init__(self, face_app, gallery, mode="all",
+                 reverify_interval=REVERIFY_INTERVAL, reverify_iou=REVERIFY_IOU,
+                 match_iou=MATCH_IOU, max_misses=MAX_MISSES):
+        if mode not in FACE_MODES:
+            raise ValueError(f"mode harus salah satu dari {FACE_MODES}")
+        self.face_app = face_app
+        self.gallery = gallery
+        self.mode = mode
+        self.reverify_interval = reverify_interval
+        self.reverify_iou = reverify_iou
+        self.match_iou = match_iou
+        self.max_misses = max_misses
+
+        self.tracks = []
+        self._next_id = 1
+        self.current_customer = None
+
+    # ==========================
+    # DETECTION
+    # ==========================
+    def _detect(self, frame):
+        bboxes, kpss = self.face_app.det_model.detect(frame, max_num=0, metric='default')
+        if bboxes is None or len(bboxes) == 0:
+            return np.zeros((0, 5), dtype=np.float32), None
+        return bboxes, kpss
+
+    def _select(self, bboxes, frame_shape):
+        """Filter deteksi sesuai mode (all / largest / central)"""
+        if self.mode == "all" or len(bboxes) <= 1:
+            return np.arange(len(bboxes))
+        if self.mode == "largest":
+            areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+            return np.array([int(np.argmax(areas))])
+        h, w = frame_shape[:2]
+        cx = (bboxes[:, 0] + bboxes[:, 2]) / 2 - w / 2
+        cy = (bboxes[:, 1] + bboxes[:, 3]) / 2 - h / 2
+        return np.array([int(np.argmin(cx * cx + cy * cy))])
+
+    # ==========================
+    # UPDATE
+    # ==========================
+    def update(self, frame, now=None):
+        """Proses satu frame wajah, return daftar FaceTrack yang aktif"""
+        now = time.monotonic() if now is None else now
+        active, pending = self.observe(frame, now)
+        if pending:
+            embeddings = embed_crops(self.face_app, self.crops(frame, pending))
+            self.assign(pending, self.gallery.identify(embeddings), now)
+        return active
+
+    def observe(self, frame, now=None):
+        """Deteksi + asosiasi saja. Return (track aktif, pending yang perlu embedding)
+
+        Dipisah dari embedding supaya crop dari banyak lane bisa di-embed
+        dalam satu batch (lihat vision_pipeline.LaneServer).
+        """
+        now = time.monotonic() if now is None else now
+        bboxes, kpss = self._detect(frame)
+        keep = self._select(bboxes, frame.shape)
+
+        # ---- Asosiasi deteksi -> track (greedy IoU) ----
+        dets = bboxes[keep, :4] if len(keep) else np.zeros((0, 4), dtype=np.float32)
+        assigned = {}
+        if len(self.tracks) and len(dets):
+            iou = bbox_iou([t.bbox for t in self.tracks], dets)
+            for flat in np.argsort(-iou, axis=None):
+                ti, di = np.unravel_index(flat, iou.shape)
+                if iou[ti, di] < self.match_iou:
+                    break
+                if ti in assigned.values() or di in assigned:
+                    continue
+                assigned[di] = ti
+
+        active = []
+        for di, det_idx in enumerate(keep):
+            if di in assigned:
+                track = self.tracks[assigned[di]]
+                track.bbox = dets[di]
+                track.last_seen = now
+                track.misses = 0
+            else:
+                track = FaceTrack(self._next_id, dets[di], now)
+                self._next_id += 1
+            active.append((track, det_idx))
+
+        # ---- Embedding hanya untuk track yang perlu verifikasi ----
+        pending = [
+            (track, kpss[i] if kpss is not None else None)
+            for track, i in active
+            if track.needs_verify(now, self.reverify_interval, self.reverify_iou)
+        ]
+
+        # ---- Track yang hilang dipertahankan beberapa frame ----
+        seen = {id(t) for t, _ in active}
+        survivors = [t for t, _ in active]
+        for track in self.tracks:
+            if id(track) not in seen:
+                track.misses += 1
+                if track.misses <= self.max_misses:
+                    survivors.append(track)
+        self.tracks = survivors
+        return [t for t, _ in active], pending
+
+    def crops(self, frame, pending):
+        """Crop wajah ter-align (input ArcFace) untuk setiap pending"""
+        from insightface.utils import face_align
+
+        size = self.face_app.models['recognition'].input_size[0]
+        return [face_align.norm_crop(frame, landmark=kps, image_size=size) for _, kps in pending]
+
+    def assign(self, pending, names, now=None):
+        """Simpan hasil identify ke track yang diverifikasi"""
+        now = time.monotonic() if now is None else now
+        for (track, _), name in zip(pending, names):
+            track.name = name
+            track.verified_bbox = track.bbox.copy()
+            track.verified_at = now
+
+    def resolve_customer(self, active):
+        """Customer utama dari track aktif (wajah terbesar). None jika tidak ada wajah"""
+        if not active:
+            return None
+        areas = [(t.bbox[2] - t.bbox[0]) * (t.bbox[3] - t.bbox[1]) for t in active]
+        return active[int(np.argmax(areas))].name
+
+    def customer_changed(self, active):
+        """Return nama customer baru jika berubah sejak frame terakhir, selain itu None"""
+        name = self.resolve_customer(active)
+        if name is None or name == self.current_customer:
+            return None
+        self.current_customer = name
+        return name
+
+    def forget_customer(self):
+        """Paksa customer berikutnya dikirim ulang (mis. setelah cart di-reset)"""
+        self.current_customer = None
+
+    def reset(self):
+        self.tracks = []
+        self.current_customer = None
@@ -1,13 +1,180 @@
 import sys
-import sqlite3
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton,
     QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
-    QHeaderView, QComboBox, QMessageBox
+    QTableView, QHeaderView, QComboBox
 )
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtCore import Qt as QtCore
-from datetime import datetime
+from PyQt5.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex
+
+import kasir_db
+import migrations
+import rollups
+
+# ==========================
+# CONFIG
+# ==========================
+PAGE_SIZE = 200         # baris per query (keyset pada id)
+MAX_CACHED_PAGES = 20   # halaman di memori, sisanya di-query ulang saat di-scroll
+REFRESH_INTERVAL = 5000  # ms, cek transaksi baru
+MAX_PREPEND = 5000      # transaksi baru lebih banyak dari ini -> muat ulang penuh
+ALL_CUSTOMERS = "-- Semua Customer --"
+
+# ==========================
+# TRANSACTION MODEL (LAZY)
+# ==========================
+class TransactionTableModel(QAbstractTableModel):
+    """Riwayat transaksi yang dimuat per halaman saat di-scroll.
+
+    fetchMore() mengambil PAGE_SIZE baris berikutnya dengan keyset
+    (id < id terakhir), jumlah item ikut dihitung di query yang sama
+    (LEFT JOIN + GROUP BY). Yang disimpan permanen hanya id awal tiap
+    halaman; isi halaman di-cache LRU dan di-query ulang jika sudah
+    dibuang, jadi memori tidak tumbuh dengan panjang scroll.
+    """
+
+    HEADERS = ["ID", "Customer", "Total", "Tanggal", "Items"]
+
+    def __init__(self, conn, page_size=PAGE_SIZE, max_pages=MAX_CACHED_PAGES, parent=None):
+        super().__init__(parent)
+        self.conn = conn
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.customer = None
+        self.top_id = None  # id terbesar yang boleh masuk halaman (sisanya lewat prepend)
+        self._reset_pages()
+
+    def _reset_pages(self):
+        self._head = []             # transaksi baru dari auto refresh, di atas halaman
+        self._bounds = []           # id pertama (terbesar) tiap halaman
+        self._pages = OrderedDict()  # index halaman -> list row
+        self._rows = 0
+        self._exhausted = False
+
+    def _query(self, max_id=None, inclusive=False, min_id=None, customer=None, limit=None):
+        where, params = [], []
+        if max_id is not None:
+            where.append("t.id <= ?" if inclusive else "t.id < ?")
+            params.append(max_id)
+        if min_id is not None:
+            where.append("t.id > ?")
+            params.append(min_id)
+        if customer is not None:
+            where.append("t.customer_name = ?")
+            params.append(customer)
+        sql = f'''
+            SELECT t.id, t.customer_name, t.total, t.transaction_date, COUNT(i.id)
+            FROM transactions t
+            LEFT JOIN transaction_items i ON i.transaction_id = t.id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            GROUP BY t.id
+            ORDER BY t.id DESC
+            LIMIT ?
+        '''
+        return self.conn.execute(sql, params + [limit or self.page_size]).fetchall()
+
+    def newer(self, after_id, limit=MAX_PREPEND):
+        """Transaksi semua customer dengan id > after_id, terbaru dulu"""
+        return self._query(min_id=after_id, limit=limit)
+
+    def prepend(self, rows):
+        """Sisipkan transaksi baru (urut id DESC) di atas, hanya yang lolos filter"""
+        if self.customer is not None:
+            rows = [r for r in rows if r[1] == self.customer]
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+        self._head[:0] = rows
+        self._rows += len(rows)
+        self.endInsertRows()
+
+    def _store(self, page, rows):
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def _page(self, page):
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self._query(self._bounds[page], inclusive=True, customer=self.customer)
+            self._store(page, rows)
+        else:
+            self._pages.move_to_end(page)
+        return rows
+
+    def set_customer(self, customer, top_id=None):
+        """None = semua customer"""
+        self.beginResetModel()
+        self.customer = customer
+        self.top_id = top_id
+        self._reset_pages()
+        self.endResetModel()
+
+    def row(self, row):
+        """(id, customer, total, tanggal, jumlah item) atau None"""
+        if not 0 <= row < self._rows:
+            return None
+        if row < len(self._head):
+            return self._head[row]
+        row -= len(self._head)
+        rows = self._page(row // self.page_size)
+        offset = row % self.page_size
+        return rows[offset] if offset < len(rows) else None
+
+    # ---- Lazy loading ----
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        if self._bounds:
+            last = self._page(len(self._bounds) - 1)
+            rows = self._query(last[-1][0], customer=self.customer)
+        elif self._head:
+            rows = self._query(self._head[-1][0], customer=self.customer)
+        else:
+            rows = self._query(self.top_id, inclusive=True, customer=self.customer)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), self._rows, self._rows + len(rows) - 1)
+        self._bounds.append(rows[0][0])
+        self._store(len(self._bounds) - 1, rows)
+        self._rows += len(rows)
+        self.endInsertRows()
+
+    # ---- QAbstractTableModel ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = self.row(index.row())
+        if row is None:
+            return None
+        trans_id, customer, total, date, item_count = row
+        col = index.column()
+        if col == 0:
+            return str(trans_id)
+        if col == 1:
+            return customer
+        if col == 2:
+            return f"Rp {total:,}"
+        if col == 3:
+            return date
+        return f"{item_count} items"
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
 
 # ==========================
 # HISTORY VIEWER APP
@@ -29,21 +196,23 @@ class HistoryViewer(QMainWindow):
         # Filter customer
         self.lblFilter = QLabel("Filter Customer:")
         self.cmbCustomer = QComboBox()
-        self.cmbCustomer.addItem("-- Semua Customer --")
-        self.cmbCustomer.currentIndexChanged.connect(self.load_transactions)
+        self.cmbCustomer.addItem(ALL_CUSTOMERS)
+        self.cmbCustomer.currentIndexChanged.connect(lambda _: self.load_transactions())
         
         self.btnRefresh = QPushButton("🔄 Refresh")
-        self.btnRefresh.clicked.connect(self.load_transactions)
+        self.btnRefresh.clicked.connect(self.reload)
         
-        # Tabel transaksi
-        self.tableTransactions = QTableWidget(0, 5)
-        self.tableTransactions.setHorizontalHeaderLabels(
-            ["ID", "Customer", "Total", "Tanggal", "Items"]
-        )
+        # Tabel transaksi (model lazy, satu koneksi WAL untuk viewer). Migrasi
+        # dulu: rollup dan kolom keyset belum ada di kasir.db versi lama
+        self.conn = kasir_db.get_connection()
+        migrations.migrate(self.conn, verbose=False)
+        self.model = TransactionTableModel(self.conn, parent=self)
+        self.tableTransactions = QTableView()
+        self.tableTransactions.setModel(self.model)
         header = self.tableTransactions.horizontalHeader()
         if header:
             header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.tableTransactions.setSelectionBehavior(QTableWidget.SelectRows)
+        self.tableTransactions.setSelectionBehavior(QTableView.SelectRows)
         self.tableTransactions.clicked.connect(self.show_transaction_detail)
         
         # Tabel detail items
@@ -78,36 +247,59 @@ class HistoryViewer(QMainWindow):
         self.setCentralWidget(container)
         
         # ---- Load Data ----
-        self.load_customers()
-        self.load_transactions()
+        self.customers = set()
+        self.last_id = 0
+        self.stats = (0, 0)
+        self.data_version = None
+        self.reload()
         
         # ---- Auto Refresh Timer (setiap 5 detik) ----
         self.timer = QTimer()
         self.timer.timeout.connect(self.auto_refresh)
-        self.timer.start(5000)
+        self.timer.start(REFRESH_INTERVAL)
+    
+    def reload(self):
+        """Muat ulang penuh: customer, tabel, statistik"""
+        self.load_transactions(full=True)
     
     def auto_refresh(self):
-        """Auto refresh dengan load customers dulu"""
-        self.load_customers()
-        self.load_transactions()
+        """Hanya transaksi baru sejak refresh terakhir; tidak ada query jika DB tidak berubah"""
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.data_version:
+            return
+        self.data_version = data_version
+        
+        rows = self.model.newer(self.last_id, MAX_PREPEND + 1)
+        if not rows:
+            return
+        if len(rows) > MAX_PREPEND:
+            self.reload()
+            return
+        self.last_id = rows[0][0]
+        
+        # Customer baru saja yang ditambahkan ke filter
+        for name in sorted({r[1] for r in rows} - self.customers):
+            self.add_customer(name)
+        
+        customer = self.selected_customer()
+        matched = [r for r in rows if customer is None or r[1] == customer]
+        count, total = self.stats
+        self.set_stats(count + len(matched), total + sum(r[2] for r in matched))
+        self.model.prepend(matched)
     
     # ==========================
     # LOAD DATA
     # ==========================
-    def load_customers(self):
-        """Load daftar customer yang pernah transaksi"""
-        conn = sqlite3.connect('kasir.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT customer_name FROM transactions ORDER BY customer_name')
-        customers = cursor.fetchall()
-        conn.close()
+    def load_customers(self, customers):
+        """Isi ulang filter dengan daftar customer yang pernah transaksi"""
+        self.customers = set(customers)
         
         # Clear dan isi ulang combo box (BLOCK SIGNAL untuk hindari recursion)
         current_text = self.cmbCustomer.currentText()
         self.cmbCustomer.blockSignals(True)
         self.cmbCustomer.clear()
-        self.cmbCustomer.addItem("-- Semua Customer --")
-        for (customer,) in customers:
+        self.cmbCustomer.addItem(ALL_CUSTOMERS)
+        for customer in customers:
             self.cmbCustomer.addItem(customer)
         
         # Restore selection
@@ -116,75 +308,70 @@ class HistoryViewer(QMainWindow):
             self.cmbCustomer.setCurrentIndex(index)
         self.cmbCustomer.blockSignals(False)
     
-    def load_transactions(self):
-        """Load semua transaksi dari database"""
-        conn = sqlite3.connect('kasir.db')
-        cursor = conn.cursor()
-        
-        # Filter berdasarkan customer
-        customer_filter = self.cmbCustomer.currentText()
-        if customer_filter == "-- Semua Customer --":
-            cursor.execute('''
-                SELECT id, customer_name, total, transaction_date 
-                FROM transactions 
-                ORDER BY id DESC
-            ''')
+    def add_customer(self, name):
+        """Sisipkan satu customer ke combo box sesuai urutan nama"""
+        self.customers.add(name)
+        index = 1
+        while index < self.cmbCustomer.count() and self.cmbCustomer.itemText(index) < name:
+            index += 1
+        self.cmbCustomer.blockSignals(True)
+        self.cmbCustomer.insertItem(index, name)
+        self.cmbCustomer.blockSignals(False)
+    
+    def selected_customer(self):
+        text = self.cmbCustomer.currentText()
+        return None if text in ("", ALL_CUSTOMERS) else text
+    
+    def load_transactions(self, full=False):
+        """Reset tabel ke halaman pertama (sisanya dimuat saat di-scroll).
+        
+        last_id, customer baru dan statistik rollup dibaca dalam satu
+        snapshot, jadi auto_refresh berikutnya tidak menghitung dua kali.
+        """
+        customer = self.selected_customer()
+        self.conn.execute("BEGIN")
+        try:
+            self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+            if full:
+                names = rollups.customers(self.conn)
+            else:
+                names = [c for (c,) in self.conn.execute(
+                    'SELECT DISTINCT customer_name FROM transactions WHERE id > ?', (self.last_id,)
+                )]
+            stats = rollups.totals(self.conn, customer)
+        finally:
+            self.conn.execute("COMMIT")
+        
+        self.last_id = last_id
+        if full:
+            self.load_customers(names)
         else:
-            cursor.execute('''
-                SELECT id, customer_name, total, transaction_date 
-                FROM transactions 
-                WHERE customer_name = ?
-                ORDER BY id DESC
-            ''', (customer_filter,))
-        
-        transactions = cursor.fetchall()
-        
-        # Update tabel
-        self.tableTransactions.setRowCount(0)
-        total_pendapatan = 0
-        
-        for trans_id, customer, total, date in transactions:
-            # Hitung jumlah items
-            cursor.execute('SELECT COUNT(*) FROM transaction_items WHERE transaction_id = ?', (trans_id,))
-            item_count = cursor.fetchone()[0]
-            
-            r = self.tableTransactions.rowCount()
-            self.tableTransactions.insertRow(r)
-            self.tableTransactions.setItem(r, 0, QTableWidgetItem(str(trans_id)))
-            self.tableTransactions.setItem(r, 1, QTableWidgetItem(customer))
-            self.tableTransactions.setItem(r, 2, QTableWidgetItem(f"Rp {total:,}"))
-            self.tableTransactions.setItem(r, 3, QTableWidgetItem(date))
-            self.tableTransactions.setItem(r, 4, QTableWidgetItem(f"{item_count} items"))
-            
-            total_pendapatan += total
-        
-        conn.close()
-        
-        # Update statistik
+            for name in sorted(set(names) - self.customers):
+                self.add_customer(name)
+        self.set_stats(*stats)
+        self.model.set_customer(customer, last_id)
+        self.model.fetchMore()
+    
+    def set_stats(self, count, total_pendapatan):
+        self.stats = (count, total_pendapatan)
         self.lblStats.setText(
-            f"Total Transaksi: {len(transactions)} | Total Pendapatan: Rp {total_pendapatan:,}"
+            f"Total Transaksi: {count:,} | Total Pendapatan: Rp {total_pendapatan:,}"
         )
     
     def show_transaction_detail(self):
         """Tampilkan detail items dari transaksi yang dipilih"""
-        selected = self.tableTransactions.currentRow()
-        if selected < 0:
-            return
-        
-        item = self.tableTransactions.item(selected, 0)
-        if not item:
+        row = self.model.row(self.tableTransactions.currentIndex().row())
+        if row is None:
             return
-        trans_id = int(item.text())
+        trans_id = row[0]
         
-        conn = sqlite3.connect('kasir.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        cursor = self.conn.execute('''
             SELECT product_name, quantity, price
             FROM transaction_items
             WHERE transaction_id = ?
         ''', (trans_id,))
         items = cursor.fetchall()
-        conn.close()
         
         # Update tabel items
         self.tableItems.setRowCount(0)
@@ -1,5 +1,7 @@
 import sqlite3
 
+from migrations import migrate
+
 # ==========================
 # INIT DATABASE
 # ==========================
@@ -7,38 +9,8 @@ def init_database():
     conn = sqlite3.connect('kasir.db')
     cursor = conn.cursor()
     
-    # Buat tabel products
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            class_name TEXT UNIQUE NOT NULL,
-            product_name TEXT NOT NULL,
-            price INTEGER NOT NULL
-        )
-    ''')
-    
-    # Buat tabel transactions
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_name TEXT NOT NULL,
-            total INTEGER NOT NULL,
-            transaction_date TEXT NOT NULL
-        )
-    ''')
-    
-    # Buat tabel transaction_items
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transaction_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            transaction_id INTEGER NOT NULL,
-            class_name TEXT NOT NULL,
-            product_name TEXT NOT NULL,
-            quantity INTEGER NOT NULL,
-            price INTEGER NOT NULL,
-            FOREIGN KEY (transaction_id) REFERENCES transactions(id)
-        )
-    ''')
+    # Tabel + index lewat migrasi (PRAGMA user_version), aman untuk DB lama
+    version = migrate(conn)
     
     # Data produk dengan harga real (2025)
     products = [
@@ -55,18 +27,17 @@ def init_database():
         ('garuda', 'Kacang Garuda', 3000),
     ]
     
-    # Insert data (ignore jika sudah ada)
-    for class_name, product_name, price in products:
-        cursor.execute('''
-            INSERT OR IGNORE INTO products (class_name, product_name, price)
-            VALUES (?, ?, ?)
-        ''', (class_name, product_name, price))
+    # Insert data (ignore jika sudah ada). Catalog besar: kasir_io.py import-catalog
+    cursor.executemany('''
+        INSERT OR IGNORE INTO products (class_name, product_name, price)
+        VALUES (?, ?, ?)
+    ''', products)
     
     conn.commit()
     conn.close()
     print("[OK] Database kasir.db berhasil dibuat!")
     print("[OK] 11 produk jajan berhasil ditambahkan")
-    print("[OK] Tabel transactions dan transaction_items siap")
+    print(f"[OK] Tabel transactions dan transaction_items siap (schema v{version})")
 
 if __name__ == '__main__':
     init_database()
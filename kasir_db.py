@@ -0,0 +1,343 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import metrics
+import migrations
+
+# ==========================
+# CONFIG
+# ==========================
+DB_PATH = "kasir.db"
+JOURNAL_DIR = "journal"
+BUSY_TIMEOUT_MS = 5000
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # NORMAL aman di WAL (tidak korup); commit terakhir yang hilang saat
+    # mati listrik tetap ada di journal transaksi dan di-replay saat start.
+    # Journal baru dikosongkan setelah checkpoint FULL (DB sudah di-fsync)
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # ~16 MB
+    "PRAGMA mmap_size=67108864",    # 64 MB
+)
+BATCH_MAX = 64                  # transaksi per commit (group commit)
+JOURNAL_FSYNC = True            # fsync journal sebelum pay() dianggap sukses
+JOURNAL_COMPACT_BYTES = 256 * 1024
+RETRY_BACKOFF = (0.05, 5.0)     # detik, jeda retry commit yang gagal karena DB sibuk
+RETRY_ERRORCODES = (5, 6)       # SQLITE_BUSY, SQLITE_LOCKED; error lain tidak di-retry
+
+
+# ==========================
+# CONNECTIONS
+# ==========================
+def connect(path=DB_PATH):
+    """Koneksi baru dengan pragma WAL; autocommit, transaksi pakai BEGIN eksplisit"""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                           check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_local = threading.local()
+
+
+def get_connection(path=DB_PATH):
+    """Satu koneksi long-lived per thread (per path)"""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = connect(path)
+    return conn
+
+
+def ensure_schema(conn):
+    """Migrasi schema ke versi terbaru + tabel seq journal yang sudah masuk DB, per writer"""
+    migrations.migrate(conn)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS journal_applied (
+            writer TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+    ''')
+
+
+def _retryable(error):
+    """Hanya lock/busy yang pasti selesai sendiri; sisanya (constraint, schema) tidak"""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code in RETRY_ERRORCODES
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _epoch(record):
+    # Record journal lama belum punya epoch
+    if "epoch" in record:
+        return record["epoch"]
+    return int(datetime.strptime(record["date"], "%Y-%m-%d %H:%M:%S").timestamp())
+
+
+# ==========================
+# TRANSACTION WRITER
+# ==========================
+class TransactionWriter:
+    """Write-behind untuk transaksi kasir.
+
+    submit() menulis cart ke journal JSONL (fsync) lalu langsung kembali;
+    thread writer mengambil cart dari queue, meng-commit semua yang
+    menumpuk dalam satu transaksi (group commit) dengan satu executemany
+    untuk line item, dan mencatat seq terakhir di journal_applied dalam
+    transaksi yang sama. Saat start, entri journal dengan seq lebih besar
+    dari journal_applied di-replay, jadi pembayaran yang sudah di-ack
+    tidak hilang walau proses crash. Nama writer harus unik per lane.
+    Record yang ditolak DB (bukan karena lock) dipindah ke
+    <nama>.rejected.jsonl supaya tidak menahan pembayaran berikutnya.
+    on_commit(batch) dipanggil dari thread writer setelah batch ter-commit.
+    """
+
+    def __init__(self, name="kasir", path=DB_PATH, journal_dir=JOURNAL_DIR, batch_max=BATCH_MAX,
+                 on_commit=None):
+        self.name = name
+        self.path = path
+        self.batch_max = batch_max
+        self.on_commit = on_commit
+        os.makedirs(journal_dir, exist_ok=True)
+        self.journal_path = os.path.join(journal_dir, f"{name}.jsonl")
+        self.rejected_path = os.path.join(journal_dir, f"{name}.rejected.jsonl")
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._applied_cond = threading.Condition()
+        self._seq = 0
+        self._applied = 0
+
+        conn = connect(path)
+        ensure_schema(conn)
+        row = conn.execute("SELECT seq FROM journal_applied WHERE writer = ?", (name,)).fetchone()
+        conn.close()
+        self._applied = row[0] if row else 0
+        self._seq = self._applied
+
+        pending = self._recover()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        for record in pending:
+            self._queue.put(record)
+        if pending:
+            print(f"[OK] Journal {self.name}: {len(pending)} transaksi di-replay")
+
+        self._thread = threading.Thread(target=self._run, name=f"db-writer-{name}", daemon=True)
+        self._thread.start()
+
+    def _recover(self):
+        """Baca journal, potong baris terakhir yang sobek, return record yang belum di-commit"""
+        pending = []
+        if not os.path.exists(self.journal_path):
+            return pending
+        good = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                good += len(line)
+                self._seq = max(self._seq, record["seq"])
+                if record["seq"] > self._applied:
+                    pending.append(record)
+        if good != os.path.getsize(self.journal_path):
+            print(f"[WARN] Journal {self.name}: baris terakhir tidak lengkap, dibuang")
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+        return pending
+
+    # ==========================
+    # API (thread UI)
+    # ==========================
+    def submit(self, customer_name, lines, total, timestamp=None):
+        """lines: [(class_name, product_name, qty, price)], timestamp: datetime (default sekarang).
+
+        Return seq setelah journal aman di disk.
+        """
+        now = datetime.now() if timestamp is None else timestamp
+        with self._lock:
+            self._seq += 1
+            record = {
+                "seq": self._seq,
+                "customer": customer_name,
+                "total": total,
+                "date": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "epoch": int(now.timestamp()),
+                "items": [list(line) for line in lines],
+            }
+            self._journal.write(json.dumps(record) + "\n")
+            self._journal.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(self._journal.fileno())
+        self._queue.put(record)
+        return record["seq"]
+
+    def flush(self, timeout=None):
+        """Tunggu semua transaksi yang sudah di-submit ter-commit"""
+        target = self._seq
+        with self._applied_cond:
+            return self._applied_cond.wait_for(lambda: self._applied >= target, timeout)
+
+    def close(self, timeout=10.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        with self._lock:
+            self._journal.close()
+
+    @property
+    def pending(self):
+        return self._seq - self._applied
+
+    # ==========================
+    # WRITER THREAD
+    # ==========================
+    def _run(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Group commit: ambil semua yang sudah menumpuk selama commit sebelumnya
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [r for r in batch if r is not None]
+            if batch:
+                self._commit_with_retry(conn, batch)
+        conn.close()
+
+    def _commit_with_retry(self, conn, batch):
+        last_seq = batch[-1]["seq"]
+        try:
+            self._retry(conn, batch, self._commit)
+        except sqlite3.Error as e:
+            # Bukan lock: commit satu per satu supaya hanya record yang rusak yang tersisih
+            print(f"[ERROR] Commit {self.name} gagal ({e}), dicoba per transaksi")
+            committed = []
+            for record in batch:
+                try:
+                    self._retry(conn, [record], self._commit)
+                    committed.append(record)
+                except sqlite3.Error as record_error:
+                    self._reject(conn, record, record_error)
+            batch = committed
+
+        with self._applied_cond:
+            self._applied = last_seq
+            self._applied_cond.notify_all()
+        metrics.inc("db_transactions", len(batch), writer=self.name)
+        if self.on_commit and batch:
+            self.on_commit(batch)
+        self._compact(conn)
+
+    def _retry(self, conn, batch, fn):
+        """fn(conn, batch) sampai berhasil selama error-nya lock/busy; error lain dilempar"""
+        backoff = RETRY_BACKOFF[0]
+        while True:
+            try:
+                fn(conn, batch)
+                return
+            except sqlite3.OperationalError as e:
+                if not _retryable(e):
+                    raise
+                metrics.inc("db_lock_retries", writer=self.name)
+                print(f"[WARN] Commit {self.name} gagal ({e}), retry dalam {backoff:.2f}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RETRY_BACKOFF[1])
+
+    def _reject(self, conn, record, error):
+        """Record ditolak DB: simpan ke file rejected (fsync), tandai applied, lanjut"""
+        print(f"[ERROR] Transaksi {self.name} seq {record['seq']} ditolak ({error}), "
+              f"disimpan di {self.rejected_path}")
+        with open(self.rejected_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"error": str(error), "record": record}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.inc("db_rejected", writer=self.name)
+        self._retry(conn, [record], self._mark_applied)
+
+    def _mark_applied(self, conn, batch):
+        conn.execute("INSERT OR REPLACE INTO journal_applied (writer, seq) VALUES (?, ?)",
+                     (self.name, batch[-1]["seq"]))
+
+    def _commit(self, conn, batch):
+        with metrics.timed("db_write", table="transactions"):
+            # IMMEDIATE: ambil write lock di awal supaya tidak deadlock upgrade antar lane
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                item_rows = []
+                for record in batch:
+                    cur = conn.execute('''
+                        INSERT INTO transactions (customer_name, total, transaction_date, created_at)
+                        VALUES (?, ?, ?, ?)
+                    ''', (record["customer"], record["total"], record["date"], _epoch(record)))
+                    tid = cur.lastrowid
+                    item_rows.extend((tid, c, n, q, p, c) for c, n, q, p in record["items"])
+                conn.executemany('''
+                    INSERT INTO transaction_items
+                        (transaction_id, class_name, product_name, quantity, price, product_id)
+                    VALUES (?, ?, ?, ?, ?, (SELECT id FROM products WHERE class_name = ?))
+                ''', item_rows)
+                conn.execute("INSERT OR REPLACE INTO journal_applied (writer, seq) VALUES (?, ?)",
+                             (self.name, batch[-1]["seq"]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _compact(self, conn):
+        """Kosongkan journal jika semua isinya sudah di-commit dan aman di disk.
+
+        Commit dengan synchronous=NORMAL belum di-fsync, jadi sebelum journal
+        dibuang WAL di-checkpoint FULL (WAL + file DB di-fsync). Jika ada
+        reader yang menahan checkpoint, compact ditunda ke commit berikutnya.
+        """
+        with self._lock:
+            if self._applied != self._seq or self._journal.tell() < JOURNAL_COMPACT_BYTES:
+                return
+        try:
+            busy, log, checkpointed = conn.execute("PRAGMA wal_checkpoint(FULL)").fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"[WARN] Checkpoint {self.name} gagal ({e}), journal belum dikosongkan")
+            return
+        if busy or checkpointed < log:
+            return
+        with self._lock:
+            # submit() baru selama checkpoint: record itu belum tentu di-commit
+            if self._applied != self._seq:
+                return
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            os.fsync(self._journal.fileno())
+
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def default_writer():
+    """Writer proses ini untuk lane tunggal (kasir_vision.py)"""
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = TransactionWriter()
+        return _default_writer
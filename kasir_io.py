@@ -0,0 +1,325 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from itertools import groupby
+
+import kasir_db
+import migrations
+
+# ==========================
+# CONFIG
+# ==========================
+CHUNK = 5000  # baris per fetchmany / executemany
+
+FIELDS = [
+    "transaction_id", "transaction_date", "created_at", "customer_name", "total",
+    "class_name", "product_name", "quantity", "price",
+]
+TX_FIELDS = FIELDS[:5]
+ITEM_FIELDS = FIELDS[5:]
+INT_FIELDS = {"transaction_id", "created_at", "total", "quantity", "price"}
+
+
+def _open_out(path):
+    if path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _open_in(path):
+    if path == "-":
+        return sys.stdin
+    return open(path, encoding="utf-8", newline="")
+
+
+def _format_of(path, fmt):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".yaml": "yaml", ".yml": "yaml"}.get(ext, "jsonl")
+
+
+def _close_in(inp):
+    if inp is not sys.stdin:
+        inp.close()
+
+
+def _day_epoch(day, days=0):
+    return int((datetime.strptime(day, "%Y-%m-%d") + timedelta(days=days)).timestamp())
+
+
+# ==========================
+# EXPORT
+# ==========================
+# created_at NULL (baris lama / import tanpa epoch) -> dari transaction_date lokal
+_CREATED_SQL = "COALESCE(t.created_at, CAST(strftime('%s', t.transaction_date, 'utc') AS INTEGER))"
+
+
+def iter_rows(conn, start_day=None, end_day=None, customer=None, after_id=None):
+    """Satu tuple FIELDS per line item (transaksi tanpa item -> kolom item None).
+
+    Dibaca per halaman CHUNK transaksi (keyset pada id): filter jadi
+    predikat di scan urut id (rowid / index customer), jadi yang di-sort di
+    memori hanya item satu halaman, berapa pun jumlah transaksinya.
+    """
+    where, params = ["t.id > ?"], []
+    if start_day:
+        where.append(f"{_CREATED_SQL} >= ?")
+        params.append(_day_epoch(start_day))
+    if end_day:
+        where.append(f"{_CREATED_SQL} < ?")
+        params.append(_day_epoch(end_day, days=1))
+    if customer:
+        where.append("t.customer_name = ?")
+        params.append(customer)
+    sql = f'''
+        SELECT t.id, t.transaction_date, t.created_at, t.customer_name, t.total,
+               i.class_name, i.product_name, i.quantity, i.price
+        FROM (
+            SELECT t.* FROM transactions t
+            WHERE {" AND ".join(where)}
+            ORDER BY t.id LIMIT {CHUNK}
+        ) t
+        LEFT JOIN transaction_items i ON i.transaction_id = t.id
+        ORDER BY t.id, i.id
+    '''
+    last_id = after_id or 0
+    while True:
+        rows = conn.execute(sql, [last_id, *params]).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def export_transactions(conn, out, fmt, store=None, **filters):
+    """Tulis transaksi ke file CSV (satu baris per item) atau JSONL (satu transaksi per baris)"""
+    count = 0
+    rows = iter_rows(conn, **filters)
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow((["store"] if store else []) + FIELDS)
+        prefix = [store] if store else []
+        last_id = None
+        for row in rows:
+            writer.writerow(prefix + list(row))
+            if row[0] != last_id:
+                count += 1
+                last_id = row[0]
+        return count
+
+    for _, group in groupby(rows, key=lambda r: r[0]):
+        group = list(group)  # item satu transaksi saja
+        record = dict(zip(TX_FIELDS, group[0][:5]))
+        if store:
+            record["store"] = store
+        record["items"] = [dict(zip(ITEM_FIELDS, r[5:])) for r in group if r[5] is not None]
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+# ==========================
+# IMPORT TRANSACTIONS
+# ==========================
+def _read_transactions(inp, fmt):
+    """Yield record transaksi (dict + items) dari CSV / JSONL hasil export"""
+    if fmt == "jsonl":
+        for line in inp:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    def parsed(reader):
+        for row in reader:
+            yield {k: (int(v) if k in INT_FIELDS and v not in ("", None) else (v or None))
+                   for k, v in row.items()}
+
+    # File gabungan beberapa toko: id yang sama bisa berurutan dari toko berbeda
+    rows = parsed(csv.DictReader(inp))
+    for _, group in groupby(rows, key=lambda r: (r.get("store"), r["transaction_id"])):
+        group = list(group)
+        record = {k: group[0][k] for k in TX_FIELDS}
+        record["store"] = group[0].get("store")
+        record["items"] = [{k: r[k] for k in ITEM_FIELDS} for r in group if r["class_name"]]
+        yield record
+
+
+def import_transactions(conn, records, store=None):
+    """Bulk insert dalam satu transaksi; id baru dialokasikan berurutan dari MAX(id).
+
+    Tiap record wajib punya store (kolom di file, fallback argumen store);
+    disimpan dengan store + source_id = transaction_id asal, jadi import
+    ulang file yang sama dilewati. Return (jumlah di-import, jumlah dilewati).
+    """
+    count = inserted = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0] + 1
+        headers, items = [], []
+        for record in records:
+            created_at = record.get("created_at")
+            if created_at is None:
+                created_at = int(datetime.strptime(
+                    record["transaction_date"], "%Y-%m-%d %H:%M:%S").timestamp())
+            source = record.get("store") or store
+            if not source or record.get("transaction_id") is None:
+                # Tanpa (store, id asal) tidak ada kunci dedupe: import ulang = transaksi dobel
+                raise ValueError(f"Transaksi {record.get('transaction_id')} tanpa store/transaction_id, "
+                                 "isi kolom store (export --store) atau --store")
+            headers.append((next_id, record["customer_name"], record["total"],
+                            record["transaction_date"], created_at, source,
+                            record.get("transaction_id")))
+            for item in record["items"]:
+                items.append((next_id, item["class_name"], item["product_name"],
+                              item["quantity"], item["price"], item["class_name"], next_id))
+            next_id += 1
+            count += 1
+            if len(headers) >= CHUNK or len(items) >= CHUNK:
+                inserted += _flush(conn, headers, items)
+        inserted += _flush(conn, headers, items)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return inserted, count - inserted
+
+
+def _flush(conn, headers, items):
+    """Tulis satu chunk; return jumlah header yang benar-benar masuk"""
+    # Header dulu: trigger rollup item membaca tanggal dari transaksinya.
+    # (store, source_id) yang sudah ada dilewati, item-nya ikut dilewati
+    # karena id header-nya tidak pernah ada.
+    inserted = conn.executemany('''
+        INSERT INTO transactions
+            (id, customer_name, total, transaction_date, created_at, store, source_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(store, source_id) DO NOTHING
+    ''', headers).rowcount
+    conn.executemany('''
+        INSERT INTO transaction_items
+            (transaction_id, class_name, product_name, quantity, price, product_id)
+        SELECT ?, ?, ?, ?, ?, (SELECT id FROM products WHERE class_name = ?)
+        WHERE EXISTS (SELECT 1 FROM transactions WHERE id = ?)
+    ''', items)
+    headers.clear()
+    items.clear()
+    return inserted
+
+
+# ==========================
+# IMPORT CATALOG
+# ==========================
+def read_catalog(path, fmt):
+    """[(class_name, product_name atau None, price atau None)] dari CSV / YAML.
+
+    YAML boleh format dataset (data jajan.yaml: `names: [...]`, hanya
+    class name) atau `products: [{class_name, product_name, price}]`.
+    """
+    if fmt == "yaml":
+        import yaml
+
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        if "products" in data:
+            return [(p["class_name"], p.get("product_name"), p.get("price")) for p in data["products"]]
+        names = data.get("names", [])
+        if isinstance(names, dict):  # format ultralytics {id: name}
+            names = [names[k] for k in sorted(names)]
+        return [(name, None, None) for name in names]
+
+    f = _open_in(path)
+    try:
+        return [(row["class_name"], row.get("product_name") or None,
+                 int(row["price"]) if row.get("price") not in (None, "") else None)
+                for row in csv.DictReader(f)]
+    finally:
+        _close_in(f)
+
+
+def import_catalog(conn, rows):
+    """Upsert produk. Kolom kosong tidak menimpa data lama; produk baru tanpa harga -> 0"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        before = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        conn.executemany('''
+            INSERT INTO products (class_name, product_name, price)
+            VALUES (?, COALESCE(?, ?), COALESCE(?, 0))
+            ON CONFLICT(class_name) DO UPDATE SET
+                product_name = COALESCE(?, product_name),
+                price = COALESCE(?, price)
+        ''', [(c, name, c, price, name, price) for c, name, price in rows])
+        after = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        unpriced = [r[0] for r in conn.execute("SELECT class_name FROM products WHERE price = 0")]
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"[OK] Catalog: {after - before} produk baru, {len(rows) - (after - before)} di-update")
+    if unpriced:
+        print(f"[WARN] Produk tanpa harga: {', '.join(unpriced)}")
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export / import transaksi dan catalog kasir.db")
+    parser.add_argument("--db", default=kasir_db.DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="Transaksi + item ke CSV / JSONL")
+    p.add_argument("--out", default="-", help="File output ('-' = stdout)")
+    p.add_argument("--format", choices=["csv", "jsonl"])
+    p.add_argument("--from", dest="start_day", help="YYYY-MM-DD (inklusif)")
+    p.add_argument("--to", dest="end_day", help="YYYY-MM-DD (inklusif)")
+    p.add_argument("--customer")
+    p.add_argument("--after-id", type=int, help="Hanya transaksi dengan id lebih besar (sync inkremental)")
+    p.add_argument("--store", help="Tambah kolom store (gabungan data banyak toko)")
+
+    p = sub.add_parser("import-transactions", help="Transaksi dari CSV / JSONL hasil export")
+    p.add_argument("path")
+    p.add_argument("--format", choices=["csv", "jsonl"])
+    p.add_argument("--store", help="Nama toko asal untuk file tanpa kolom store (wajib jika tidak ada)")
+
+    p = sub.add_parser("import-catalog", help="Produk dari CSV (class_name,product_name,price) / YAML")
+    p.add_argument("path", help="mis. 'data jajan.yaml' atau products.csv")
+    p.add_argument("--format", choices=["csv", "yaml"])
+
+    args = parser.parse_args(argv)
+    conn = kasir_db.connect(args.db)
+    migrations.migrate(conn, verbose=False)
+
+    if args.command == "export":
+        fmt = _format_of(args.out, args.format)
+        out = _open_out(args.out)
+        try:
+            count = export_transactions(
+                conn, out, fmt, store=args.store, start_day=args.start_day,
+                end_day=args.end_day, customer=args.customer, after_id=args.after_id
+            )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"[OK] {count:,} transaksi di-export", file=sys.stderr)
+
+    elif args.command == "import-transactions":
+        fmt = _format_of(args.path, args.format)
+        inp = _open_in(args.path)
+        try:
+            count, skipped = import_transactions(conn, _read_transactions(inp, fmt), store=args.store)
+        except ValueError as e:
+            raise SystemExit(f"[ERROR] {e}")
+        finally:
+            _close_in(inp)
+        print(f"[OK] {count:,} transaksi di-import, {skipped:,} sudah ada (dilewati)")
+
+    elif args.command == "import-catalog":
+        import_catalog(conn, read_catalog(args.path, _format_of(args.path, args.format)))
+
+
+if __name__ == '__main__':
+    main()
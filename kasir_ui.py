@@ -1,88 +1,156 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QLabel, QPushButton,
-    QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QVBoxLayout, QHBoxLayout, QTableView,
     QMessageBox
 )
-from PyQt5.QtCore import QTimer, pyqtSignal
-import sqlite3
-from datetime import datetime
-
-# ==========================
-# DB HELPER - LOAD ON DEMAND
-# ==========================
-def get_product(class_name):
-    """Load produk dari database hanya saat diperlukan"""
-    conn = sqlite3.connect('kasir.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT product_name, price FROM products WHERE class_name = ?', (class_name,))
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return {"name": row[0], "price": row[1]}
-    return None
-
-def save_transaction(customer_name, items, total):
-    """Simpan transaksi ke database"""
-    conn = sqlite3.connect('kasir.db')
-    cursor = conn.cursor()
-    
-    # Simpan header transaksi
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute('''
-        INSERT INTO transactions (customer_name, total, transaction_date)
-        VALUES (?, ?, ?)
-    ''', (customer_name, total, timestamp))
-    
-    transaction_id = cursor.lastrowid
-    
-    # Simpan detail items
-    for class_name, qty in items.items():
-        product = get_product(class_name)
-        if product:
-            cursor.execute('''
-                INSERT INTO transaction_items (transaction_id, class_name, product_name, quantity, price)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (transaction_id, class_name, product['name'], qty, product['price']))
-    
-    conn.commit()
-    conn.close()
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+import kasir_db
+from catalog import default_catalog
 
 # ==========================
 # CART
 # ==========================
 class CartManager:
-    def __init__(self):
+    def __init__(self, catalog=None):
+        self.catalog = catalog or default_catalog()
         self.items = {}
-        self.products_cache = {}
+        self.products_cache = {}  # harga item di cart, diambil dari catalog (tanpa DB)
+        self._total = 0
 
-    def add(self, key):
-        # Load produk dari DB hanya jika belum di cache
+    def ensure_product(self, key):
         if key not in self.products_cache:
-            product = get_product(key)
-            if product:
+            product = self.catalog.get(key)
+            if product is None:
+                return False  # Produk tidak ditemukan
+            self.products_cache[key] = product
+        return True
+
+    def reprice(self):
+        """Ambil ulang harga item di cart setelah catalog berubah"""
+        for key in self.items:
+            product = self.catalog.get(key)
+            if product is not None:
                 self.products_cache[key] = product
-            else:
-                return  # Produk tidak ditemukan
-        
-        self.items[key] = self.items.get(key, 0) + 1
+        self._total = sum(self.products_cache[k].price * q for k, q in self.items.items())
+
+    def set_qty(self, key, qty):
+        """Ubah qty satu item (0 = hapus), total di-update dari selisihnya"""
+        old = self.items.get(key, 0)
+        if qty > 0:
+            self.items[key] = qty
+        else:
+            qty = 0
+            self.items.pop(key, None)
+        self._total += self.products_cache[key].price * (qty - old)
+
+    def add(self, key):
+        if self.ensure_product(key):
+            self.set_qty(key, self.items.get(key, 0) + 1)
 
     def set_counts(self, counts: dict):
-        # Ensure products data exists in cache
-        for key in counts.keys():
-            if key not in self.products_cache:
-                product = get_product(key)
-                if product:
-                    self.products_cache[key] = product
         # Replace current items with live counts
-        self.items = {k: int(v) for k, v in counts.items() if v > 0}
+        for key in list(self.items):
+            if counts.get(key, 0) <= 0:
+                self.set_qty(key, 0)
+        for key, qty in counts.items():
+            if qty > 0 and self.ensure_product(key):
+                self.set_qty(key, int(qty))
 
     def clear(self):
         self.items.clear()
         self.products_cache.clear()
+        self._total = 0
 
     def total(self):
-        return sum(self.products_cache[k]["price"] * v for k, v in self.items.items())
+        return self._total
+
+# ==========================
+# CART TABLE MODEL
+# ==========================
+class CartTableModel(QAbstractTableModel):
+    """Model Qt di atas CartManager, update per baris (insert/remove/dataChanged)"""
+
+    HEADERS = ["Item", "Qty", "Harga", "Subtotal"]
+    totalChanged = pyqtSignal(int)
+
+    def __init__(self, cart, parent=None):
+        super().__init__(parent)
+        self.cart = cart
+        self.keys = list(cart.items)
+
+    # ---- QAbstractTableModel ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        key = self.keys[index.row()]
+        p = self.cart.products_cache[key]
+        qty = self.cart.items[key]
+        col = index.column()
+        if col == 0:
+            return p.name
+        if col == 1:
+            return str(qty)
+        if col == 2:
+            return f"Rp {p.price:,}"
+        return f"Rp {p.price * qty:,}"
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    # ---- Mutasi cart ----
+    def set_qty(self, key, qty):
+        total = self.cart.total()
+        if key in self.cart.items:
+            row = self.keys.index(key)
+            if qty <= 0:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.cart.set_qty(key, 0)
+                self.keys.pop(row)
+                self.endRemoveRows()
+            elif qty != self.cart.items[key]:
+                self.cart.set_qty(key, qty)
+                self.dataChanged.emit(self.index(row, 1), self.index(row, 3))
+        elif qty > 0 and self.cart.ensure_product(key):
+            row = len(self.keys)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.cart.set_qty(key, qty)
+            self.keys.append(key)
+            self.endInsertRows()
+
+        if self.cart.total() != total:
+            self.totalChanged.emit(self.cart.total())
+
+    def add(self, key):
+        self.set_qty(key, self.cart.items.get(key, 0) + 1)
+
+    def set_counts(self, counts: dict):
+        # Replace current items with live counts, hanya baris yang berubah
+        for key in list(self.keys):
+            if counts.get(key, 0) <= 0:
+                self.set_qty(key, 0)
+        for key, qty in counts.items():
+            self.set_qty(key, int(qty))
+
+    def reprice(self):
+        self.cart.reprice()
+        if self.keys:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.keys) - 1, len(self.HEADERS) - 1))
+        self.totalChanged.emit(self.cart.total())
+
+    def clear(self):
+        self.beginResetModel()
+        self.cart.clear()
+        self.keys = []
+        self.endResetModel()
+        self.totalChanged.emit(0)
 
 # ==========================
 # UI
@@ -92,13 +160,19 @@ class KasirApp(QMainWindow):
     sig_set_customer = pyqtSignal(str)
     sig_add_item = pyqtSignal(str)
     sig_set_counts = pyqtSignal(object)
+    sig_reset = pyqtSignal()
+    sig_catalog_changed = pyqtSignal()
+    sig_status = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, writer=None, catalog=None):
         super().__init__()
         self.setWindowTitle("Kasirless AI")
         self.resize(800, 500)
 
-        self.cart = CartManager()
+        # Transaksi ditulis write-behind (kasir_db.TransactionWriter), pay() tidak menunggu DB
+        self.writer = writer or kasir_db.default_writer()
+        self.cart = CartManager(catalog)
+        self.cart_model = CartTableModel(self.cart, self)
         self.current_customer = "Unknown"
 
         # ---- Widgets ----
@@ -106,10 +180,8 @@ class KasirApp(QMainWindow):
         self.lblTotal = QLabel("Total: Rp 0")
         self.lblTotal.setStyleSheet("font-size:18px;font-weight:bold")
 
-        self.table = QTableWidget(0, 4)
-        self.table.setHorizontalHeaderLabels(
-            ["Item", "Qty", "Harga", "Subtotal"]
-        )
+        self.table = QTableView()
+        self.table.setModel(self.cart_model)
         header = self.table.horizontalHeader()
         if header:
             header.setStretchLastSection(True)
@@ -143,28 +215,18 @@ class KasirApp(QMainWindow):
         self.sig_set_customer.connect(self.set_customer)
         self.sig_add_item.connect(self.add_item)
         self.sig_set_counts.connect(self.set_counts)
-
-        # ---- Refresh Timer ----
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.refresh)
-        self.timer.start(500)
+        # Progres startup vision / status lane di status bar
+        self.sig_status.connect(self.statusBar().showMessage)
+        self.cart_model.totalChanged.connect(self.update_total)
+        # Harga diubah di DB -> cart di-reprice tanpa restart
+        self.sig_catalog_changed.connect(self.cart_model.reprice)
+        self.cart.catalog.listeners.append(self.sig_catalog_changed.emit)
 
     # ==========================
     # UI UPDATE
     # ==========================
-    def refresh(self):
-        self.table.setRowCount(0)
-        for key, qty in self.cart.items.items():
-            p = self.cart.products_cache.get(key)
-            if p:
-                r = self.table.rowCount()
-                self.table.insertRow(r)
-                self.table.setItem(r, 0, QTableWidgetItem(p["name"]))
-                self.table.setItem(r, 1, QTableWidgetItem(str(qty)))
-                self.table.setItem(r, 2, QTableWidgetItem(f"Rp {p['price']:,}"))
-                self.table.setItem(r, 3, QTableWidgetItem(f"Rp {p['price'] * qty:,}"))
-
-        self.lblTotal.setText(f"Total: Rp {self.cart.total():,}")
+    def update_total(self, total):
+        self.lblTotal.setText(f"Total: Rp {total:,}")
 
     # ==========================
     # SLOTS
@@ -174,25 +236,32 @@ class KasirApp(QMainWindow):
         self.current_customer = name
 
     def add_item(self, item):
-        self.cart.add(item)
+        self.cart_model.add(item)
 
     def set_counts(self, counts: dict):
-        self.cart.set_counts(counts)
+        self.cart_model.set_counts(counts)
 
     def pay(self):
         total = self.cart.total()
         if total > 0:
             customer = getattr(self, 'current_customer', 'Unknown')
-            save_transaction(customer, self.cart.items, total)
-            print(f"[PAY] {customer} - Total Rp {total:,} - Tersimpan ke database")
-            QMessageBox.information(
-                self,
+            cache = self.cart.products_cache
+            lines = [(key, cache[key].name, qty, cache[key].price) for key, qty in self.cart.items.items()]
+            self.writer.submit(customer, lines, total)
+            print(f"[PAY] {customer} - Total Rp {total:,} - Tercatat di journal, commit DB di background")
+            # Non-modal supaya pay() langsung kembali
+            box = QMessageBox(
+                QMessageBox.Information,
                 "Pembayaran Berhasil",
-                f"Terima kasih, {customer}!\nTotal: Rp {total:,}"
+                f"Terima kasih, {customer}!\nTotal: Rp {total:,}",
+                parent=self
             )
+            box.setAttribute(Qt.WA_DeleteOnClose)
+            box.open()
         self.reset()
 
     def reset(self):
-        self.cart.clear()
+        self.cart_model.clear()
         self.lblCustomer.setText("Customer: Unknown")
         self.current_customer = "Unknown"
+        self.sig_reset.emit()
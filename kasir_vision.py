@@ -1,192 +1,166 @@
-import cv2
-import time
-import json
-import os
-import numpy as np
+import argparse
 import threading
 import sys
+import traceback
 
-from ultralytics import YOLO
-from insightface.app import FaceAnalysis
 from PyQt5.QtWidgets import QApplication
 
+import metrics
+from kasir_db import TransactionWriter
 from kasir_ui import KasirApp
 
 # ==========================
 # CONFIG
 # ==========================
-FACE_PIP_SIZE = (320, 260)
-FACE_PIP_MARGIN = 10
-
-CAM_INDICES = [0, 1]
+# Index kamera, path video, atau folder gambar (lihat capture.open_source)
+CAM_SOURCES = [0, 1]
 RESOLUTIONS = [
     (2560, 1440),  # BARANG
     (352, 288)     # FACE
 ]
 FPS_SETTINGS = [60, 30]
 
-FACE_DIR = "faces"
-FACE_THRESH = 0.5
-
-# ==========================
-# LOAD FACE DB
-# ==========================
-face_db = {}
-if os.path.exists(FACE_DIR):
-    for filename in os.listdir(FACE_DIR):
-        if filename.endswith('.npy'):
-            name = filename.replace('.npy', '')
-            face_db[name] = os.path.join(FACE_DIR, filename)
-print(f"[OK] Loaded {len(face_db)} faces from {FACE_DIR}/")
-
-def cosine_sim(a, b):
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
-
-def match_face(emb):
-    best, score = "Unknown", 0
-    for name, path in face_db.items():
-        db = np.load(path)
-        s = cosine_sim(emb, db)
-        if s > score:
-            best, score = name, s
-    return best if score > FACE_THRESH else "Unknown"
-
-# ==========================
-# INIT FACE MODEL (GPU)
-# ==========================
-face_app = FaceAnalysis(
-    name="buffalo_l",
-    providers=["CUDAExecutionProvider"]
-)
-face_app.prepare(ctx_id=0, det_size=(640, 640))
-
-# ==========================
-# INIT YOLO + BYTE TRACK
-# ==========================
-yolo = YOLO("best.pt", task="detect")
-
-# ==========================
-# INIT CAMERAS
-# ==========================
-caps = []
-for idx, (w, h), fps in zip(CAM_INDICES, RESOLUTIONS, FPS_SETTINGS):
-    cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-    if not cap.isOpened():
-        raise RuntimeError(f"Kamera index {idx} gagal")
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
-    cap.set(cv2.CAP_PROP_FPS, fps)
-    caps.append(cap)
-
-print("[OK] Dua kamera aktif")
-
-# ==========================
-# INIT UI IN MAIN THREAD
-# ==========================
-app = QApplication(sys.argv)
-ui = KasirApp()
-ui.show()
-
-# ==========================
-# TRACKING STATE
-# ==========================
-seen_track_ids = set()
-
-# ==========================
-# FPS COUNTER
-# ==========================
-prev_time = time.time()
-
-# ==========================
-# CAMERA THREAD
-# ==========================
-def camera_loop():
-    global prev_time
-    while True:
-        ret0, frame_barang = caps[0].read()
-        ret1, frame_face = caps[1].read()
-        if not ret0 or not ret1:
-            continue
-
-        # ========== FACE ==========
-        faces = face_app.get(frame_face)
-        for f in faces:
-            name = match_face(f.embedding)
-            ui.sig_set_customer.emit(name)
-
-            x1, y1, x2, y2 = map(int, f.bbox)
-            cv2.rectangle(frame_face, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(
-                frame_face,
-                name,
-                (x1, y1 - 8),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                (0, 255, 0),
-                2
+# "all" | "largest" | "central" - wajah mana yang dikenali
+FACE_MODE = "largest"
+FACE_REVERIFY_INTERVAL = 2.0  # detik
+
+# Gallery gabungan (enroll_faces.py): "ann" atau "exact" (cek recall)
+FACE_SEARCH_MODE = "ann"
+
+# Area tray [x1, y1, x2, y2] di piksel kamera barang (None = seluruh frame),
+# resolusi inference (None = YOLO_IMGSZ) dan tile (kolom, baris) untuk item kecil
+TRAY_ROI = None
+INFER_SIZE = None
+TRAY_TILES = (1, 1)
+MOTION_GATE = True  # tray diam -> YOLO dilewati, paksa inference tiap MAX_SKIP_INTERVAL
+
+# Backend inference (backends.py): "torch" | "onnx" | "openvino", INT8 butuh
+# export dulu (python backends.py export --backend openvino --int8)
+DEVICE = "auto"   # "auto" = GPU jika ada, selain itu CPU
+BACKEND = "torch"
+INT8 = False
+THREADS = None  # thread CPU inference; None = default torch/ORT
+
+# Metrics per stage (metrics.py): port HTTP lokal dan/atau file teks Prometheus
+METRICS_PORT = None
+METRICS_FILE = None
+SHOW_FPS_OVERLAY = True
+
+
+def lane_config():
+    """Konfigurasi lane tunggal (format sama dengan lanes.yaml)"""
+    return {
+        "name": "kasir",
+        "product_source": CAM_SOURCES[0],
+        "face_source": CAM_SOURCES[1],
+        "product_resolution": RESOLUTIONS[0],
+        "face_resolution": RESOLUTIONS[1],
+        "product_fps": FPS_SETTINGS[0],
+        "face_fps": FPS_SETTINGS[1],
+        "face_mode": FACE_MODE,
+        "face_reverify_interval": FACE_REVERIFY_INTERVAL,
+        "face_search_mode": FACE_SEARCH_MODE,
+        "tray_roi": TRAY_ROI,
+        "infer_size": INFER_SIZE,
+        "tray_tiles": TRAY_TILES,
+        "motion_gate": MOTION_GATE,
+        "device": DEVICE,
+        "backend": BACKEND,
+        "int8": INT8,
+        "threads": THREADS,
+        "metrics_port": METRICS_PORT,
+        "metrics_file": METRICS_FILE,
+        "fps_overlay": SHOW_FPS_OVERLAY,
+    }
+
+# ==========================
+# MODE 1: THREAD (satu proses)
+# ==========================
+def start_vision_thread(app, ui, config):
+    """UI sudah tampil; import, load model + kamera (paralel) dan warm-up di background"""
+    def boot():
+        from startup import StartupReport, add_lane, load_vision
+
+        report = StartupReport(on_status=ui.sig_status.emit)
+        try:
+            models, gallery, grabbers = load_vision([config], report)
+            from vision_pipeline import LaneServer
+            from catalog import default_catalog
+
+            server = LaneServer(models, gallery, fps_overlay=config["fps_overlay"],
+                                catalog=default_catalog())
+            lane = add_lane(
+                server, config, *grabbers[config["name"]],
+                on_counts=ui.sig_set_counts.emit,
+                on_customer=ui.sig_set_customer.emit,
+                window_name="KASIRLESS"
             )
-
-        # ========== FACE → PIP ==========
-        face_small = cv2.resize(frame_face, FACE_PIP_SIZE)
-        px, py = FACE_PIP_MARGIN, FACE_PIP_MARGIN
-        ph, pw = face_small.shape[:2]
-        frame_barang[py:py+ph, px:px+pw] = face_small
-
-        # ========== YOLO + BYTE TRACK ==========
-        results = yolo.track(
-            frame_barang,
-            persist=True,
-            tracker="bytetrack.yaml",
-            conf=0.5,
-            imgsz=640,
-            device=0,
-            verbose=False
-        )[0]
-
-        # Build live counts per class for current frame
-        counts = {}
-        boxes = results.boxes
-        if boxes is not None and boxes.cls is not None:
-            for cls in boxes.cls:
-                label = yolo.names[int(cls)]
-                counts[label] = counts.get(label, 0) + 1
-
-        # Send live counts to UI (only currently detected objects shown)
-        ui.sig_set_counts.emit(counts)
-
-        # ========== DRAW ==========
-        frame_barang = results.plot(img=frame_barang)
-
-        # ========== FPS ==========
-        now = time.time()
-        fps = 1.0 / (now - prev_time)
-        prev_time = now
-
-        cv2.putText(
-            frame_barang,
-            f"FPS: {fps:.1f}",
-            (10, frame_barang.shape[0] - 15),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.7,
-            (0, 255, 0),
-            2
-        )
-
-        # ========== SHOW ==========
-        cv2.imshow("KASIRLESS", frame_barang)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            # Cleanup
-            for c in caps:
-                c.release()
-            cv2.destroyAllWindows()
-            app.quit()
-            break
-
-# Start camera thread
-threading.Thread(target=camera_loop, daemon=True).start()
-
-# ==========================
-# RUN QT APP
-# ==========================
-sys.exit(app.exec_())
+            # Setelah bayar/reset, customer + isi tray yang masih terlihat dikirim ulang
+            ui.sig_reset.connect(lane.resync)
+            with report.phase("warmup"):
+                server.warm_up()
+        except Exception as e:
+            traceback.print_exc()
+            ui.sig_status.emit(f"Vision gagal dimuat: {e}")
+            return
+        report.done()
+        server.run()
+        app.quit()
+
+    thread = threading.Thread(target=boot, name="vision", daemon=True)
+    thread.start()
+    return thread
+
+# ==========================
+# MODE 2: WORKER PROCESS (shared memory)
+# ==========================
+def start_vision_process(app, ui, config):
+    from vision_worker import VisionSupervisor
+
+    supervisor = VisionSupervisor(
+        config,
+        on_counts=ui.sig_set_counts.emit,
+        on_customer=ui.sig_set_customer.emit,
+        on_status=ui.sig_status.emit,
+        on_quit=app.quit
+    )
+    ui.sig_reset.connect(supervisor.resync)
+    app.aboutToQuit.connect(supervisor.stop)
+    return supervisor.start()
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kasirless AI")
+    parser.add_argument("--process", action="store_true",
+                        help="Capture + inference di proses terpisah (auto-restart)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Endpoint /metrics di localhost")
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help="File teks Prometheus (textfile collector)")
+    parser.add_argument("--no-fps-overlay", action="store_true")
+    args, qt_args = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    config = lane_config()
+    config["metrics_port"] = args.metrics_port
+    config["metrics_file"] = args.metrics_file
+    config["fps_overlay"] = config["fps_overlay"] and not args.no_fps_overlay
+    # Di mode --process, proses UI hanya punya metrics DB; pipeline di-export worker
+    metrics.start_exporters(config["metrics_port"], config["metrics_file"])
+    app = QApplication([sys.argv[0]] + qt_args)
+    writer = TransactionWriter(config["name"])
+    app.aboutToQuit.connect(writer.close)
+    ui = KasirApp(writer)
+    # Jendela tampil dulu, vision dimuat di background (startup.py)
+    ui.show()
+
+    if args.process:
+        start_vision_process(app, ui, config)
+    else:
+        start_vision_thread(app, ui, config)
+    return app.exec_()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
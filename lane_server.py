@@ -0,0 +1,98 @@
+import argparse
+import sys
+import threading
+import traceback
+
+import yaml
+from PyQt5.QtWidgets import QApplication
+
+import metrics
+from catalog import default_catalog
+from kasir_db import TransactionWriter
+from kasir_ui import KasirApp
+from startup import StartupReport, add_lane, load_vision
+
+# ==========================
+# CONFIG
+# ==========================
+LANES_CONFIG = "lanes.yaml"
+
+
+def load_lanes(path):
+    """Baca lanes.yaml -> list dict per lane (defaults sudah digabung)"""
+    with open(path, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    defaults = config.get("defaults", {})
+    lanes = [{**defaults, **lane} for lane in config.get("lanes", [])]
+    if not lanes:
+        raise RuntimeError(f"Tidak ada lane di {path}")
+    return lanes
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vision server multi-lane (model dimuat sekali)")
+    parser.add_argument("--config", default=LANES_CONFIG)
+    parser.add_argument("--no-preview", action="store_true", help="Tanpa jendela cv2")
+    parser.add_argument("--no-fps-overlay", action="store_true")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Endpoint /metrics di localhost")
+    parser.add_argument("--metrics-file", default=None, help="File teks Prometheus")
+    args = parser.parse_args(argv)
+
+    lanes = load_lanes(args.config)
+    metrics.start_exporters(args.metrics_port, args.metrics_file)
+
+    # ---- UI semua lane tampil dulu, vision dimuat di background ----
+    app = QApplication(sys.argv)
+    # Satu catalog untuk semua lane + UI (harga di memori, reload saat DB berubah)
+    catalog = default_catalog()
+    uis = {}
+    for cfg in lanes:
+        # Writer + journal per lane, semua lane menulis ke kasir.db yang sama (WAL)
+        writer = TransactionWriter(cfg["name"])
+        app.aboutToQuit.connect(writer.close)
+        ui = KasirApp(writer, catalog)
+        ui.setWindowTitle(f"Kasirless AI - {cfg['name']}")
+        ui.show()
+        uis[cfg["name"]] = ui
+
+    def status(text):
+        for ui in uis.values():
+            ui.sig_status.emit(text)
+
+    def vision_loop():
+        # ---- Model + gallery sekali untuk semua lane, kamera paralel ----
+        report = StartupReport(on_status=status)
+        try:
+            models, gallery, grabbers = load_vision(lanes, report)
+            from vision_pipeline import LaneServer
+
+            server = LaneServer(models, gallery, show=not args.no_preview,
+                                fps_overlay=not args.no_fps_overlay, catalog=catalog)
+            for cfg in lanes:
+                ui = uis[cfg["name"]]
+                lane = add_lane(
+                    server, cfg, *grabbers[cfg["name"]],
+                    on_counts=ui.sig_set_counts.emit,
+                    on_customer=ui.sig_set_customer.emit
+                )
+                ui.sig_reset.connect(lane.resync)
+            with report.phase("warmup"):
+                server.warm_up()
+        except Exception as e:
+            traceback.print_exc()
+            status(f"Vision gagal dimuat: {e}")
+            return
+        report.done()
+        print(f"[OK] {len(lanes)} lane aktif")
+        server.run()
+        app.quit()
+
+    threading.Thread(target=vision_loop, name="vision", daemon=True).start()
+    return app.exec_()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
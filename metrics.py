@@ -0,0 +1,218 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================
+# CONFIG
+# ==========================
+PREFIX = "kasir"
+# Bucket latency (detik): 0.5 ms .. 5 s
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1024  # sampel terakhir untuk hitung p50/p95/p99
+
+clock = time.perf_counter  # monotonic, resolusi tinggi
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# ==========================
+# METRIC TYPES
+# ==========================
+class Histogram:
+    """Bucket kumulatif ala Prometheus + jendela sampel terakhir untuk quantile"""
+
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            self.recent.append(value)
+
+    def quantiles(self, qs=QUANTILES):
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return {q: 0.0 for q in qs}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in qs}
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}   # (name, labels) -> Histogram
+        self.counters = {}     # (name, labels) -> float
+        self.gauges = {}       # (name, labels) -> float
+        self.collectors = []   # fn() -> iterable (kind, name, labels dict, value), kind counter/gauge
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def histogram(self, name, **labels):
+        key = self._key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(key, Histogram())
+        return hist
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        self.gauges[self._key(name, labels)] = value
+
+    def register_collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    @contextmanager
+    def timed(self, name, **labels):
+        start = clock()
+        try:
+            yield
+        finally:
+            self.observe(name, clock() - start, **labels)
+
+    # ==========================
+    # EXPORT
+    # ==========================
+    def render(self):
+        """Format teks Prometheus (exposition format 0.0.4)"""
+        lines = []
+        by_name = {}
+        for (name, labels), hist in list(self.histograms.items()):
+            by_name.setdefault(name, []).append((labels, hist))
+        for name, items in sorted(by_name.items()):
+            full = f"{PREFIX}_{name}_seconds"
+            lines.append(f"# TYPE {full} histogram")
+            for labels, hist in items:
+                counts, total, count = hist.snapshot()
+                cumulative = 0
+                for bound, c in zip(hist.buckets, counts):
+                    cumulative += c
+                    lines.append(f"{full}_bucket{_label_str(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{full}_bucket{_label_str(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{full}_sum{_label_str(labels)} {total:.6f}")
+                lines.append(f"{full}_count{_label_str(labels)} {count}")
+            # Quantile dari jendela terakhir (summary terpisah, supaya tipe tidak bentrok)
+            lines.append(f"# TYPE {full}_recent summary")
+            for labels, hist in items:
+                for q, v in hist.quantiles().items():
+                    lines.append(f"{full}_recent{_label_str(labels + (('quantile', q),))} {v:.6f}")
+
+        counters = dict(self.counters)
+        gauges = dict(self.gauges)
+        for collector in self.collectors:
+            try:
+                for kind, name, labels, value in collector():
+                    target = counters if kind == "counter" else gauges
+                    target[self._key(name, labels)] = value
+            except Exception as e:
+                print(f"[WARN] Metrics collector gagal: {e}")
+
+        for kind, values, suffix in (("counter", counters, "_total"), ("gauge", gauges, "")):
+            last_name = None
+            for (name, labels), value in sorted(values.items()):
+                full = f"{PREFIX}_{name}{suffix}"
+                if name != last_name:
+                    lines.append(f"# TYPE {full} {kind}")
+                    last_name = name
+                lines.append(f"{full}{_label_str(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Ringkasan p50/p95/p99 (ms) per histogram, untuk log / overlay"""
+        result = {}
+        for (name, labels), hist in list(self.histograms.items()):
+            key = name + "".join(f"[{v}]" for _, v in labels)
+            result[key] = {f"p{int(q * 100)}_ms": v * 1000 for q, v in hist.quantiles().items()}
+        return result
+
+
+REGISTRY = Registry()
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set_gauge
+timed = REGISTRY.timed
+register_collector = REGISTRY.register_collector
+
+
+# ==========================
+# EXPORTERS
+# ==========================
+def start_file_exporter(path, interval=5.0, registry=REGISTRY):
+    """Tulis file teks Prometheus berkala (untuk node_exporter textfile collector)"""
+    def loop():
+        while True:
+            # Disk penuh / folder hilang / render gagal: coba lagi interval berikutnya,
+            # jangan sampai thread mati dan file diam-diam berhenti di-update
+            try:
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(registry.render())
+                os.replace(tmp, path)
+            except Exception as e:
+                print(f"[WARN] Tulis metrics ke {path} gagal: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+    print(f"[OK] Metrics ditulis ke {path} setiap {interval:.0f}s")
+
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Endpoint GET /metrics di localhost"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[OK] Metrics di http://{host}:{port}/metrics")
+    return server
+
+
+def start_exporters(port=None, path=None):
+    """Nyalakan exporter sesuai konfigurasi (None = mati)"""
+    if port:
+        start_http_server(port)
+    if path:
+        start_file_exporter(path)
@@ -0,0 +1,179 @@
+import argparse
+
+# ==========================
+# MIGRATIONS
+# ==========================
+# Versi schema disimpan di PRAGMA user_version. Tiap migrasi jalan dalam
+# satu transaksi bersama update user_version-nya, jadi kasir.db lama di
+# toko bisa di-upgrade di tempat tanpa risiko setengah jalan.
+
+def _base_schema(conn):
+    """v1: tabel awal (sama dengan init_db.py lama)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            class_name TEXT UNIQUE NOT NULL,
+            product_name TEXT NOT NULL,
+            price INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_name TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            transaction_date TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_id INTEGER NOT NULL,
+            class_name TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            FOREIGN KEY (transaction_id) REFERENCES transactions(id)
+        )
+    ''')
+
+
+def _hot_query_indexes(conn):
+    """v2: index untuk detail transaksi dan filter customer"""
+    # Covering: detail barang + jumlah item per transaksi tanpa baca tabel
+    conn.execute("DROP INDEX IF EXISTS idx_transaction_items_transaction")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_items_transaction
+        ON transaction_items(transaction_id, product_name, quantity, price)
+    ''')
+    # Filter customer + keyset id DESC + SUM(total) dari index saja
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_customer
+        ON transactions(customer_name, id, total)
+    ''')
+
+
+def _epoch_timestamp(conn):
+    """v3: created_at INTEGER (epoch detik) untuk query rentang tanggal"""
+    conn.execute("ALTER TABLE transactions ADD COLUMN created_at INTEGER")
+    # transaction_date ditulis dalam waktu lokal -> 'utc' mengubahnya ke epoch yang benar
+    conn.execute('''
+        UPDATE transactions
+        SET created_at = CAST(strftime('%s', transaction_date, 'utc') AS INTEGER)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_created_at
+        ON transactions(created_at, total)
+    ''')
+
+
+def _item_product_id(conn):
+    """v4: transaction_items.product_id -> products(id)"""
+    conn.execute("ALTER TABLE transaction_items ADD COLUMN product_id INTEGER REFERENCES products(id)")
+    conn.execute('''
+        UPDATE transaction_items
+        SET product_id = (SELECT p.id FROM products p WHERE p.class_name = transaction_items.class_name)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_items_product
+        ON transaction_items(product_id, transaction_id)
+    ''')
+
+
+def _sales_rollups(conn):
+    """v5: kolom toko transaksi + rollup penjualan harian (toko, produk, customer) + trigger"""
+    import rollups
+
+    # store: '' = toko ini, selain itu transaksi hasil import gabungan toko;
+    # source_id = id di DB toko asal, (store, source_id) unik supaya import
+    # ulang tidak menggandakan transaksi (NULL = lokal, tidak ikut unik)
+    conn.execute("ALTER TABLE transactions ADD COLUMN store TEXT NOT NULL DEFAULT ''")
+    conn.execute("ALTER TABLE transactions ADD COLUMN source_id INTEGER")
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_source
+        ON transactions(store, source_id)
+    ''')
+    rollups.install(conn)
+    rollups.rebuild(conn)
+
+
+def _catalog_version(conn):
+    """v6: catalog_version, naik lewat trigger tiap products berubah"""
+    # Catalog (catalog.py) memuat ulang products hanya jika angka ini
+    # berubah; data_version saja ikut naik tiap commit transaksi
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_version_{event.lower()}
+            AFTER {event} ON products
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+MIGRATIONS = [
+    (1, _base_schema),
+    (2, _hot_query_indexes),
+    (3, _epoch_timestamp),
+    (4, _item_product_id),
+    (5, _sales_rollups),
+    (6, _catalog_version),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=LATEST, verbose=True):
+    """Jalankan migrasi yang belum diterapkan. Return versi akhir"""
+    version = schema_version(conn)
+    for number, fn in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Dicek ulang di dalam lock: proses lain mungkin sudah migrasi duluan
+            if schema_version(conn) >= number:
+                conn.execute("ROLLBACK")
+                continue
+            fn(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if verbose:
+            print(f"[OK] Migrasi v{number}: {fn.__doc__.split(':', 1)[1].strip()}")
+        if number == target:
+            conn.execute("ANALYZE")
+    return schema_version(conn)
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    import kasir_db
+
+    parser = argparse.ArgumentParser(description="Upgrade schema kasir.db (PRAGMA user_version)")
+    parser.add_argument("--db", default=kasir_db.DB_PATH)
+    parser.add_argument("--target", type=int, default=LATEST)
+    args = parser.parse_args(argv)
+
+    conn = kasir_db.connect(args.db)
+    before = schema_version(conn)
+    after = migrate(conn, args.target)
+    print(f"[OK] {args.db}: schema v{before} -> v{after}")
+
+
+if __name__ == '__main__':
+    main()
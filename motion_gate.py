@@ -0,0 +1,69 @@
+import time
+
+import cv2
+import numpy as np
+
+# ==========================
+# CONFIG
+# ==========================
+GATE_SIZE = (64, 36)      # px, thumbnail abu-abu yang dibandingkan
+GATE_BLOCK = 8            # px thumbnail per blok (8x8 -> blok ~40x40 px di 2560x1440)
+MOTION_THRESHOLD = 8.0    # rata-rata selisih abu-abu per blok yang dianggap gerakan
+MAX_SKIP_INTERVAL = 1.0   # detik, inference penuh paling lambat tiap interval ini
+
+
+class MotionGate:
+    """Detektor perubahan murah di depan YOLO.
+
+    Area tray diperkecil ke thumbnail abu-abu GATE_SIZE lalu dibandingkan
+    per blok dengan thumbnail frame terakhir yang di-inference (bukan
+    frame sebelumnya, jadi perubahan pelan tetap terakumulasi). Selama
+    tidak ada blok yang berubah lebih dari threshold, YOLO dilewati dan
+    hasil terakhir dipakai ulang; setelah MAX_SKIP_INTERVAL inference
+    tetap dipaksa supaya track ByteTrack tidak basi.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, max_skip=MAX_SKIP_INTERVAL,
+                 size=GATE_SIZE, block=GATE_BLOCK):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.size = size
+        self.block = block
+        self.reference = None
+        self.inferred_at = 0.0
+        self.skipped = 0
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+
+    def _thumbnail(self, frame, roi):
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            frame = frame[y1:y2, x1:x2]
+        # Ambil tiap n piksel dulu (view, tanpa copy) supaya INTER_AREA tidak membaca 4 MP
+        step = max(1, min(frame.shape[1] // (self.size[0] * 4), frame.shape[0] // (self.size[1] * 4)))
+        cv2.resize(frame[::step, ::step], self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._gray
+
+    def motion(self, gray):
+        """Selisih rata-rata blok terbesar terhadap referensi"""
+        diff = cv2.absdiff(gray, self.reference).astype(np.float32)
+        b = self.block
+        h, w = (diff.shape[0] // b) * b, (diff.shape[1] // b) * b
+        blocks = diff[:h, :w].reshape(h // b, b, w // b, b).mean(axis=(1, 3))
+        return float(blocks.max())
+
+    def should_infer(self, frame, roi=None, now=None):
+        """True jika frame ini perlu YOLO (dan jadi referensi baru)"""
+        now = time.monotonic() if now is None else now
+        gray = self._thumbnail(frame, roi)
+        if (self.reference is not None and now - self.inferred_at < self.max_skip
+                and self.motion(gray) < self.threshold):
+            self.skipped += 1
+            return False
+        if self.reference is None:
+            self.reference = gray.copy()
+        else:
+            np.copyto(self.reference, gray)
+        self.inferred_at = now
+        return True
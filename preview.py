@@ -0,0 +1,173 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+# ==========================
+# CONFIG
+# ==========================
+PREVIEW_WIDTH = 960     # px, lebar buffer preview (tinggi mengikuti rasio kamera)
+PREVIEW_FPS = 10        # batas refresh jendela preview
+FACE_PIP_SIZE = (160, 130)  # ukuran PiP wajah di preview
+FACE_PIP_MARGIN = 10
+FPS_BOX = (10, 28, 150, 32)  # x, tinggi dari bawah, lebar, tinggi area teks FPS
+
+_PALETTE = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+            (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+            (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0)]
+
+
+def preview_size(resolution, width=PREVIEW_WIDTH):
+    """(w, h) preview untuk resolusi kamera, tidak pernah memperbesar"""
+    w, h = resolution
+    if w <= width:
+        return int(w), int(h)
+    return int(width), int(round(h * width / w / 2) * 2)
+
+
+def snapshot_result(frame, seq, result):
+    """Ambil box dari Results sekali di thread inference -> tuple ringan untuk preview"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return frame, seq, np.zeros((0, 4), dtype=np.float32), [], []
+    xyxy = boxes.xyxy.cpu().numpy()
+    classes = boxes.cls.int().tolist()
+    ids = boxes.id.int().tolist() if boxes.id is not None else [None] * len(classes)
+    return frame, seq, xyxy, classes, ids
+
+
+# ==========================
+# RENDERER
+# ==========================
+class PreviewRenderer:
+    """Gambar hasil deteksi ke buffer preview kecil yang dipakai ulang.
+
+    Frame kamera di-resize langsung ke buffer (dst=), box digambar di
+    koordinat preview dengan cv2 biasa (bukan results.plot di resolusi
+    penuh). Jika frame/box sama dengan render sebelumnya, hanya PiP dan
+    teks FPS yang digambar ulang; jika tidak ada yang berubah sama sekali
+    render() mengembalikan None dan tidak perlu imshow.
+    """
+
+    def __init__(self, names=None, width=PREVIEW_WIDTH):
+        self.names = names or {}
+        self.width = width
+        self.canvas = None
+        self._frame_key = None
+        self._pip_key = None
+        self._fps_key = None
+
+    def _ensure_canvas(self, frame):
+        h, w = frame.shape[:2]
+        pw, ph = preview_size((w, h), self.width)
+        if self.canvas is None or self.canvas.shape[:2] != (ph, pw):
+            self.canvas = np.empty((ph, pw, 3), dtype=np.uint8)
+            self._frame_key = self._pip_key = self._fps_key = None
+        return pw / w
+
+    def render(self, snapshot, face_small=None, pip_seq=None, fps=None):
+        """snapshot dari snapshot_result(). Return canvas (dipakai ulang!) atau None jika tidak berubah"""
+        frame, seq, xyxy, classes, ids = snapshot
+        scale = self._ensure_canvas(frame)
+        fps_key = None if fps is None else round(fps, 1)
+        changed = False
+
+        if seq != self._frame_key:
+            h, w = self.canvas.shape[:2]
+            cv2.resize(frame, (w, h), dst=self.canvas, interpolation=cv2.INTER_LINEAR)
+            self._draw_boxes(xyxy * scale, classes, ids)
+            self._frame_key = seq
+            self._pip_key = self._fps_key = None  # tertimpa resize, gambar ulang
+            changed = True
+
+        if face_small is not None and pip_seq != self._pip_key:
+            ph, pw = face_small.shape[:2]
+            y, x = FACE_PIP_MARGIN, FACE_PIP_MARGIN
+            self.canvas[y:y + ph, x:x + pw] = face_small
+            self._pip_key = pip_seq
+            changed = True
+
+        if fps_key is not None and fps_key != self._fps_key:
+            x, from_bottom, bw, bh = FPS_BOX
+            y = self.canvas.shape[0] - from_bottom
+            cv2.rectangle(self.canvas, (x - 2, y - bh + 8), (x + bw, y + 8), (0, 0, 0), -1)
+            cv2.putText(self.canvas, f"FPS: {fps_key:.1f}", (x, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            self._fps_key = fps_key
+            changed = True
+
+        return self.canvas if changed else None
+
+    def _draw_boxes(self, xyxy, classes, ids):
+        for (x1, y1, x2, y2), cls, tid in zip(xyxy.astype(int), classes, ids):
+            color = _PALETTE[cls % len(_PALETTE)]
+            cv2.rectangle(self.canvas, (x1, y1), (x2, y2), color, 2)
+            label = str(self.names.get(cls, cls))
+            if tid is not None:
+                label = f"{tid} {label}"
+            cv2.putText(self.canvas, label, (x1, max(12, y1 - 5)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+
+# ==========================
+# DISPLAY THREAD
+# ==========================
+class PreviewLoop:
+    """Thread display terpisah dari inference, refresh dibatasi PREVIEW_FPS.
+
+    imshow dan waitKey harus di thread yang sama, jadi tombol q juga
+    dibaca di sini dan diteruskan lewat on_quit.
+    """
+
+    def __init__(self, lanes, fps=PREVIEW_FPS, fps_fn=None, on_quit=None):
+        self.lanes = [lane for lane in lanes if lane.renderer is not None]
+        self.interval = 1.0 / fps
+        self.fps_fn = fps_fn
+        self.on_quit = on_quit
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.lanes:
+            self._thread = threading.Thread(target=self._run, name="preview", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        gui = any(lane.on_preview is None for lane in self.lanes)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            fps = self.fps_fn() if self.fps_fn else None
+            for lane in self.lanes:
+                self.show(lane, fps)
+            if gui and cv2.waitKey(1) & 0xFF == ord("q"):
+                if self.on_quit:
+                    self.on_quit()
+                break
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        if gui:
+            cv2.destroyAllWindows()
+
+    @staticmethod
+    def show(lane, fps=None):
+        snapshot = lane.last
+        if snapshot is None:
+            return False
+        with metrics.timed("plot", lane=lane.name):
+            canvas = lane.renderer.render(snapshot, lane.face_small, lane.pip_seq, fps)
+        if canvas is None:
+            return False
+        with metrics.timed("imshow", lane=lane.name):
+            if lane.on_preview:
+                lane.on_preview(canvas)
+            else:
+                cv2.imshow(lane.window_name, canvas)
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import yaml
+
+from capture import open_source
+
+# ==========================
+# CONFIG
+# ==========================
+DATASET_YAML = "data jajan.yaml"
+
+
+def dataset_split(yaml_path=DATASET_YAML, split="val"):
+    """Path folder gambar split dataset (relatif terhadap lokasi file yaml)"""
+    with open(yaml_path, encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    path = data[split]
+    base = data.get("path") or os.path.dirname(os.path.abspath(yaml_path))
+    return os.path.normpath(os.path.join(base, path))
+
+
+def peak_memory_mb():
+    """Peak RSS proses ini (MB), plus peak memori CUDA jika dipakai"""
+    result = {}
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: KB, macOS: byte
+        result["peak_rss_mb"] = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    except ImportError:
+        try:
+            import psutil
+            result["peak_rss_mb"] = psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            result["peak_rss_mb"] = None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            result["peak_cuda_mb"] = torch.cuda.max_memory_allocated() / (1024 * 1024)
+    except ImportError:
+        pass
+    return result
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    arr = np.asarray(samples) * 1000.0
+    return {
+        "count": len(samples),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+# ==========================
+# REPLAY
+# ==========================
+class ReplayRunner:
+    """Memutar video / folder gambar lewat kode face + YOLO + counting yang sama
+    dengan kasir_vision.py, tanpa jendela cv2/Qt, setiap frame diproses (tidak di-drop).
+    """
+
+    def __init__(self, product_source, face_source=None, device="cpu", weights=None,
+                 imgsz=None, conf=None, backend="torch", int8=False, threads=None,
+                 face_resolution=(352, 288), face_mode="largest", plot=False, warmup=5,
+                 tray_roi=None, tray_tiles=(1, 1), motion_gate=True):
+        from face_gallery import load_gallery, FACE_DIR, FACE_THRESH
+        from vision_pipeline import VisionModels, LaneServer, YOLO_WEIGHTS, YOLO_CONF, YOLO_IMGSZ
+
+        self.models = VisionModels(
+            yolo_weights=weights or YOLO_WEIGHTS,
+            face_resolution=face_resolution,
+            device=device,
+            backend=backend,
+            int8=int8,
+            threads=threads,
+            conf=YOLO_CONF if conf is None else conf,
+            imgsz=YOLO_IMGSZ if imgsz is None else imgsz
+        )
+        gallery = load_gallery(FACE_DIR, FACE_THRESH, watch=False)
+        # show=plot: lane punya PreviewRenderer, tapi run() (dan jendelanya) tidak dipakai
+        self.server = LaneServer(self.models, gallery, show=plot)
+        self.lane = self.server.add_lane("replay", None, None, face_mode=face_mode,
+                                         tray_roi=tray_roi, tray_tiles=tray_tiles,
+                                         motion_gate=motion_gate)
+
+        self.product = open_source(product_source, loop=False, realtime=False)
+        self.face = open_source(face_source, loop=True, realtime=False) if face_source else None
+        self.plot = plot
+        self.warmup = warmup
+        # "gated" = frame yang YOLO-nya dilewati motion gate
+        self.timings = {"face": [], "yolo": [], "gated": [], "frame": []}
+        if plot:
+            self.timings["plot"] = []
+        self.frames = 0
+
+    def run(self, max_frames=None, on_frame=None):
+        self.product.open()
+        if self.face:
+            self.face.open()
+
+        # Motion gate memakai waktu video, bukan jam dinding (replay tidak real-time)
+        fps = getattr(self.product, "fps", None) or 30.0
+
+        # warmup 0: frame pertama sudah diukur, jadi jam mulai sebelum loop
+        start = time.perf_counter() if self.warmup <= 0 else None
+        try:
+            while max_frames is None or self.frames < max_frames + self.warmup:
+                ok, frame_barang = self.product.read()
+                if not ok:
+                    break
+                t0 = time.perf_counter()
+                sample = {}
+
+                if self.face:
+                    ok, frame_face = self.face.read()
+                    if ok:
+                        self.server.face_stage([(self.lane, frame_face)])
+                        sample["face"] = time.perf_counter() - t0
+
+                t1 = time.perf_counter()
+                inferred = self.server.product_stage([(self.lane, frame_barang)], now=self.frames / fps)
+                sample["yolo" if inferred else "gated"] = time.perf_counter() - t1
+
+                if self.plot:
+                    t2 = time.perf_counter()
+                    self.lane.renderer.render(self.lane.last, self.lane.face_small, self.lane.pip_seq)
+                    sample["plot"] = time.perf_counter() - t2
+                sample["frame"] = time.perf_counter() - t0
+
+                self.frames += 1
+                # Beberapa frame pertama = warm-up (CUDA/ONNX graph), tidak dihitung
+                if self.frames == self.warmup:
+                    start = time.perf_counter()
+                elif self.frames > self.warmup:
+                    for name, seconds in sample.items():
+                        self.timings[name].append(seconds)
+                if on_frame:
+                    on_frame(self.frames, self.lane.counts)
+        finally:
+            self.product.release()
+            if self.face:
+                self.face.release()
+
+        measured = max(0, self.frames - self.warmup)
+        elapsed = time.perf_counter() - start if start is not None and measured else 0.0
+        return self.report(measured, elapsed)
+
+    def report(self, measured, elapsed):
+        gated = len(self.timings["gated"])
+        return {
+            "frames": measured,
+            "warmup_frames": min(self.frames, self.warmup),
+            "elapsed_s": elapsed,
+            "fps": measured / elapsed if elapsed else 0.0,
+            "gate": {
+                "enabled": self.lane.gate is not None,
+                "gated_frames": gated,
+                "gated_ratio": gated / measured if measured else 0.0,
+            },
+            "settings": {
+                "device": str(self.models.device),
+                "backend": self.models.backend,
+                "int8": self.models.int8,
+                "imgsz": self.models.imgsz,
+                "conf": self.models.conf,
+                "tray_roi": self.lane.tray.roi,
+                "tray_tiles": self.lane.tray.tiles,
+            },
+            "stages": {name: percentiles(samples) for name, samples in self.timings.items()},
+            "memory": peak_memory_mb(),
+        }
+
+
+# ==========================
+# MAIN
+# ==========================
+def build_parser():
+    parser = argparse.ArgumentParser(description="Replay headless video/gambar lewat pipeline kasir")
+    parser.add_argument("--product", help="Video / folder gambar kamera barang")
+    parser.add_argument("--face", default=None, help="Video / folder gambar kamera wajah (opsional)")
+    parser.add_argument("--dataset", default=None, help=f"Pakai split dari yaml dataset (mis. '{DATASET_YAML}')")
+    parser.add_argument("--split", default="val")
+    parser.add_argument("--device", default="cpu", help="'cpu' atau index GPU")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--conf", type=float, default=None)
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--roi", nargs=4, type=int, default=None, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="ROI tray di piksel frame barang")
+    parser.add_argument("--tiles", nargs=2, type=int, default=(1, 1), metavar=("KOLOM", "BARIS"))
+    parser.add_argument("--face-mode", default="largest")
+    parser.add_argument("--plot", action="store_true", help="Ikut ukur biaya render preview")
+    parser.add_argument("--no-gate", action="store_true", help="Matikan motion gate (YOLO tiap frame)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--counts-out", default=None, help="Tulis counts per frame (JSONL)")
+    parser.add_argument("--json", default=None, help="Tulis report JSON ke file ('-' = stdout)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    product = args.product or (dataset_split(args.dataset, args.split) if args.dataset else None)
+    if not product:
+        build_parser().error("Isi --product atau --dataset")
+
+    device = int(args.device) if str(args.device).isdigit() else args.device
+    runner = ReplayRunner(
+        product, args.face, device=device, weights=args.weights, imgsz=args.imgsz,
+        conf=args.conf, backend=args.backend, int8=args.int8, threads=args.threads,
+        face_mode=args.face_mode, plot=args.plot, warmup=args.warmup,
+        tray_roi=args.roi, tray_tiles=args.tiles, motion_gate=not args.no_gate
+    )
+
+    counts_file = open(args.counts_out, "w", encoding="utf-8") if args.counts_out else None
+
+    def write_counts(index, counts):
+        counts_file.write(json.dumps({"frame": index, "counts": counts}) + "\n")
+
+    try:
+        report = runner.run(args.max_frames, write_counts if counts_file else None)
+    finally:
+        if counts_file:
+            counts_file.close()
+
+    report["source"] = product
+    text = json.dumps(report, indent=2)
+    if args.json == "-":
+        print(text)
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"[OK] Report ditulis ke {args.json}")
+    elif report["frames"]:
+        yolo = report["stages"]["yolo"]
+        print(f"[OK] {report['frames']} frame, {report['fps']:.1f} FPS, "
+              f"yolo p95 {yolo['p95_ms'] if yolo else 0.0:.1f} ms, "
+              f"{report['gate']['gated_frames']} frame di-gate")
+    else:
+        print("[WARN] Tidak ada frame yang diukur")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
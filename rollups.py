@@ -0,0 +1,222 @@
+import argparse
+
+# ==========================
+# ROLLUP TABLES
+# ==========================
+# Ringkasan penjualan per hari, di-update trigger di transaksi yang sama
+# dengan INSERT transaksi/item, jadi statistik dashboard cukup membaca
+# beberapa baris per hari, tidak pernah scan tabel transaksi.
+# sales_daily per (toko, hari): transaksi lokal store = '', transaksi hasil
+# import gabungan toko (kasir_io.py) membawa nama tokonya.
+# Hari = tanggal lokal dari created_at (fallback transaction_date).
+
+_DAY_SQL = "COALESCE(date({ts}, 'unixepoch', 'localtime'), date({text}))"
+
+TABLES = (
+    '''
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        store TEXT NOT NULL DEFAULT '',
+        day TEXT NOT NULL,
+        tx_count INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0,
+        items INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (store, day)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sales_product_daily (
+        class_name TEXT NOT NULL,
+        day TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (class_name, day)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sales_customer_daily (
+        customer_name TEXT NOT NULL,
+        day TEXT NOT NULL,
+        tx_count INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (customer_name, day)
+    )
+    ''',
+)
+
+TRIGGERS = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_transaction
+    AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO sales_daily (store, day, tx_count, revenue)
+        VALUES (NEW.store,
+                {_DAY_SQL.format(ts="NEW.created_at", text="NEW.transaction_date")}, 1, NEW.total)
+        ON CONFLICT(store, day) DO UPDATE SET
+            tx_count = tx_count + 1,
+            revenue = revenue + excluded.revenue;
+
+        INSERT INTO sales_customer_daily (customer_name, day, tx_count, revenue)
+        VALUES (NEW.customer_name,
+                {_DAY_SQL.format(ts="NEW.created_at", text="NEW.transaction_date")}, 1, NEW.total)
+        ON CONFLICT(customer_name, day) DO UPDATE SET
+            tx_count = tx_count + 1,
+            revenue = revenue + excluded.revenue;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_item
+    AFTER INSERT ON transaction_items
+    BEGIN
+        INSERT INTO sales_product_daily (class_name, day, quantity, revenue)
+        SELECT NEW.class_name, {_DAY_SQL.format(ts="t.created_at", text="t.transaction_date")},
+               NEW.quantity, NEW.quantity * NEW.price
+        FROM transactions t WHERE t.id = NEW.transaction_id
+        ON CONFLICT(class_name, day) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            revenue = revenue + excluded.revenue;
+
+        UPDATE sales_daily SET items = items + NEW.quantity
+        WHERE (store, day) = (
+            SELECT t.store, {_DAY_SQL.format(ts="t.created_at", text="t.transaction_date")}
+            FROM transactions t WHERE t.id = NEW.transaction_id
+        );
+    END
+    ''',
+)
+
+
+def install(conn):
+    """Buat tabel rollup + trigger (dipanggil dari migrasi)"""
+    for sql in TABLES + TRIGGERS:
+        conn.execute(sql)
+
+
+def rebuild(conn):
+    """Hitung ulang semua rollup dari transaksi yang ada (panggil di dalam transaksi)"""
+    day_t = _DAY_SQL.format(ts="t.created_at", text="t.transaction_date")
+    conn.execute("DELETE FROM sales_daily")
+    conn.execute("DELETE FROM sales_product_daily")
+    conn.execute("DELETE FROM sales_customer_daily")
+    conn.execute(f'''
+        INSERT INTO sales_daily (store, day, tx_count, revenue, items)
+        SELECT t.store, {day_t}, COUNT(*), SUM(t.total), COALESCE(SUM(
+            (SELECT SUM(i.quantity) FROM transaction_items i WHERE i.transaction_id = t.id)
+        ), 0)
+        FROM transactions t GROUP BY 1, 2
+    ''')
+    conn.execute(f'''
+        INSERT INTO sales_product_daily (class_name, day, quantity, revenue)
+        SELECT i.class_name, {day_t}, SUM(i.quantity), SUM(i.quantity * i.price)
+        FROM transactions t JOIN transaction_items i ON i.transaction_id = t.id
+        GROUP BY 1, 2
+    ''')
+    conn.execute(f'''
+        INSERT INTO sales_customer_daily (customer_name, day, tx_count, revenue)
+        SELECT t.customer_name, {day_t}, COUNT(*), SUM(t.total)
+        FROM transactions t GROUP BY 1, 2
+    ''')
+
+
+# ==========================
+# QUERIES
+# ==========================
+def totals(conn, customer=None, start_day=None, end_day=None, store=None):
+    """(jumlah transaksi, pendapatan) dari rollup; day format 'YYYY-MM-DD', inklusif.
+
+    store hanya berlaku untuk total toko (tanpa customer); None = semua toko.
+    """
+    table = "sales_daily" if customer is None else "sales_customer_daily"
+    where, params = [], []
+    if customer is not None:
+        where.append("customer_name = ?")
+        params.append(customer)
+    elif store is not None:
+        where.append("store = ?")
+        params.append(store)
+    if start_day is not None:
+        where.append("day >= ?")
+        params.append(start_day)
+    if end_day is not None:
+        where.append("day <= ?")
+        params.append(end_day)
+    sql = f"SELECT COALESCE(SUM(tx_count), 0), COALESCE(SUM(revenue), 0) FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return conn.execute(sql, params).fetchone()
+
+
+def stores(conn, start_day=None, end_day=None):
+    """[(store, jumlah transaksi, pendapatan)] per toko; '' = transaksi lokal"""
+    where, params = [], []
+    if start_day is not None:
+        where.append("day >= ?")
+        params.append(start_day)
+    if end_day is not None:
+        where.append("day <= ?")
+        params.append(end_day)
+    sql = "SELECT store, SUM(tx_count), SUM(revenue) FROM sales_daily"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY store ORDER BY store"
+    return conn.execute(sql, params).fetchall()
+
+
+def customers(conn):
+    """Semua nama customer yang pernah transaksi, urut nama"""
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT customer_name FROM sales_customer_daily ORDER BY customer_name"
+    )]
+
+
+def top_products(conn, start_day=None, end_day=None, limit=10):
+    """[(class_name, quantity, revenue)] terlaris di rentang hari"""
+    where, params = [], []
+    if start_day is not None:
+        where.append("day >= ?")
+        params.append(start_day)
+    if end_day is not None:
+        where.append("day <= ?")
+        params.append(end_day)
+    sql = "SELECT class_name, SUM(quantity), SUM(revenue) FROM sales_product_daily"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY class_name ORDER BY 3 DESC LIMIT ?"
+    return conn.execute(sql, params + [limit]).fetchall()
+
+
+# ==========================
+# MAIN
+# ==========================
+def main(argv=None):
+    import kasir_db
+    import migrations
+
+    parser = argparse.ArgumentParser(description="Rollup penjualan harian")
+    parser.add_argument("command", choices=["rebuild", "show"])
+    parser.add_argument("--db", default=kasir_db.DB_PATH)
+    args = parser.parse_args(argv)
+
+    conn = kasir_db.connect(args.db)
+    migrations.migrate(conn)
+    if args.command == "rebuild":
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rebuild(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        print("[OK] Rollup dihitung ulang")
+
+    count, revenue = totals(conn)
+    print(f"Total Transaksi: {count:,} | Total Pendapatan: Rp {revenue:,}")
+    per_store = stores(conn)
+    if len(per_store) > 1:
+        for store, count, revenue in per_store:
+            print(f"  [{store or 'lokal'}] {count:,} transaksi, Rp {revenue:,}")
+    for class_name, qty, revenue in top_products(conn):
+        print(f"  {class_name:<20}{qty:>8,}  Rp {revenue:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import time
+
+# ==========================
+# CONFIG
+# ==========================
+TARGET_LATENCY = 0.1      # detik, budget end-to-end satu tick
+EWMA_ALPHA = 0.2          # bobot sampel baru untuk estimasi biaya stage
+MAX_STALE = 1.0           # detik, stage dipaksa jalan walau over budget
+MIN_RATE_SCALE = 0.1      # rate tidak diturunkan di bawah 10% target
+DEFER_BACKOFF = 0.01      # detik, stage tanpa input baru dicoba lagi setelah ini
+
+
+class Stage:
+    def __init__(self, name, rate, priority=0):
+        self.name = name
+        self.rate = float(rate)       # Hz target
+        self.priority = priority      # kecil = lebih penting
+        self.cost = 0.0               # detik, EWMA durasi
+        self.last_run = None
+        self.last_result = None
+        self.runs = 0
+        self.skipped = 0              # di-skip karena budget latency
+        self.idle = 0                 # due tapi tidak ada input baru
+        self.retry_at = None          # defer(): jangan due sebelum waktu ini
+        self.interval_ewma = None     # detik, jarak aktual antar run
+
+    def period(self, scale):
+        return 1.0 / max(self.rate * scale, 1e-6)
+
+    def due_in(self, now, scale):
+        due = 0.0 if self.last_run is None else self.last_run + self.period(scale) - now
+        if self.retry_at is not None:
+            due = max(due, self.retry_at - now)
+        return due
+
+    @property
+    def actual_rate(self):
+        if not self.interval_ewma:
+            return 0.0
+        return 1.0 / self.interval_ewma
+
+
+# ==========================
+# SCHEDULER
+# ==========================
+class StageScheduler:
+    """Menentukan stage mana yang jalan di tiap tick berdasarkan rate + budget latency.
+
+    Biaya tiap stage diukur (EWMA). Stage yang sudah waktunya tapi akan
+    melewati budget di-skip dan hasil terakhirnya dipakai ulang. Jika beban
+    (biaya x rate) melebihi satu core (till CPU-only / mesin sibuk), semua
+    rate diturunkan bersama lewat rate_scale, lalu naik lagi pelan-pelan.
+    """
+
+    def __init__(self, target_latency=TARGET_LATENCY, max_stale=MAX_STALE,
+                 alpha=EWMA_ALPHA, clock=time.monotonic):
+        self.target_latency = target_latency
+        self.max_stale = max_stale
+        self.alpha = alpha
+        self.clock = clock
+        self.stages = {}
+        self.rate_scale = 1.0
+
+    def add_stage(self, name, rate, priority=0):
+        self.stages[name] = Stage(name, rate, priority)
+        return self.stages[name]
+
+    # ==========================
+    # PLANNING
+    # ==========================
+    def plan(self, now=None):
+        """Daftar nama stage yang dijalankan di tick ini (urut prioritas)"""
+        now = self.clock() if now is None else now
+        due = [
+            s for s in self.stages.values()
+            if s.due_in(now, self.rate_scale) <= 0
+        ]
+        due.sort(key=lambda s: (s.priority, s.due_in(now, self.rate_scale)))
+
+        planned, budget = [], self.target_latency
+        for stage in due:
+            starving = stage.last_run is not None and now - stage.last_run >= self.max_stale
+            if stage.cost <= budget or not planned or starving:
+                planned.append(stage.name)
+                budget -= stage.cost
+            else:
+                stage.skipped += 1
+        return planned
+
+    def run(self, name, fn, *args, **kwargs):
+        """Jalankan stage sambil mengukur biayanya, simpan hasilnya"""
+        stage = self.stages[name]
+        start = self.clock()
+        result = fn(*args, **kwargs)
+        end = self.clock()
+
+        cost = end - start
+        stage.cost = cost if stage.runs == 0 else (1 - self.alpha) * stage.cost + self.alpha * cost
+        if stage.last_run is not None:
+            interval = start - stage.last_run
+            stage.interval_ewma = interval if stage.interval_ewma is None else \
+                (1 - self.alpha) * stage.interval_ewma + self.alpha * interval
+        stage.last_run = start
+        stage.retry_at = None
+        stage.last_result = result
+        stage.runs += 1
+        return result
+
+    def defer(self, name, now=None):
+        """Stage sudah di-plan tapi tidak ada input baru -> coba lagi setelah DEFER_BACKOFF.
+
+        Tanpa backoff stage tetap due dan end_tick() mengembalikan 0, jadi
+        loop berputar terus (100% satu core) sambil menunggu frame kamera.
+        """
+        stage = self.stages[name]
+        now = self.clock() if now is None else now
+        stage.idle += 1
+        stage.retry_at = now + min(DEFER_BACKOFF, stage.period(self.rate_scale))
+
+    def result(self, name):
+        """Hasil terakhir stage (dipakai ulang saat stage di-skip)"""
+        return self.stages[name].last_result
+
+    # ==========================
+    # ADAPTATION
+    # ==========================
+    def load(self):
+        """Total biaya stage per detik pada rate sekarang (>1 berarti tidak mungkin terkejar)"""
+        return sum(s.cost * s.rate * self.rate_scale for s in self.stages.values())
+
+    def end_tick(self):
+        """Sesuaikan rate_scale dari beban terukur, return detik sampai stage berikutnya due.
+
+        Durasi tick sengaja tidak dipakai: satu stage yang lebih mahal dari
+        target_latency (YOLO di CPU) membuat tiap tick lewat target walau
+        mesin masih banyak waktu luang.
+        """
+        now = self.clock()
+        load = self.load()
+        if load > 1.0:
+            self.rate_scale = max(MIN_RATE_SCALE, self.rate_scale * 0.9)
+        elif load < 0.7:
+            self.rate_scale = min(1.0, self.rate_scale * 1.02)
+
+        if not self.stages:
+            return 0.0
+        return max(0.0, min(s.due_in(now, self.rate_scale) for s in self.stages.values()))
+
+    def stats(self):
+        return {
+            name: {
+                "rate": s.rate * self.rate_scale,
+                "actual_rate": s.actual_rate,
+                "cost_ms": s.cost * 1000,
+                "runs": s.runs,
+                "skipped": s.skipped,
+                "idle": s.idle,
+            }
+            for name, s in self.stages.items()
+        }
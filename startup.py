@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+import metrics
+
+# ==========================
+# STARTUP ORCHESTRATOR
+# ==========================
+# UI tampil dulu; import berat (torch/ultralytics/insightface), load model,
+# gallery dan buka kamera jalan di background. Load model dan kamera
+# paralel (kebanyakan menunggu I/O, driver kamera, init CUDA/ONNX), lalu
+# warm-up inference di frame dummy sebelum lane dinyatakan siap.
+
+
+class StartupReport:
+    """Durasi tiap fase startup: dicetak, di-export gauge startup_seconds{phase}"""
+
+    def __init__(self, on_status=None):
+        self.on_status = on_status
+        self.started = time.monotonic()
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def status(self, text):
+        if self.on_status:
+            self.on_status(text)
+
+    @contextmanager
+    def phase(self, name):
+        self.status(f"Memuat {name}...")
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.phases[name] = elapsed
+            metrics.set_gauge("startup_seconds", elapsed, phase=name)
+            print(f"[OK] Startup {name}: {elapsed:.2f}s")
+
+    def _timed(self, name, fn):
+        with self.phase(name):
+            return fn()
+
+    def parallel(self, tasks):
+        """{fase: fn} dijalankan paralel, masing-masing dicatat sebagai fase. Return {fase: hasil}"""
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(self._timed, name, fn) for name, fn in tasks.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def done(self):
+        total = time.monotonic() - self.started
+        metrics.set_gauge("startup_seconds", total, phase="total")
+        print(f"[OK] Startup selesai dalam {total:.2f}s")
+        self.status(f"Siap (startup {total:.1f}s)")
+        return total
+
+
+def _open_camera(cfg, camera):
+    from capture import FrameGrabber, open_source
+
+    key = "product" if camera == "barang" else "face"
+    source = open_source(cfg[f"{key}_source"], cfg[f"{key}_resolution"], cfg[f"{key}_fps"])
+    return FrameGrabber(source, f"{cfg['name']}-{camera}").start()
+
+
+def load_vision(lanes, report):
+    """Import + load gallery, model dan kamera semua lane secara paralel.
+
+    Setting model (device/backend/int8/threads/face_search_mode) diambil
+    dari lane pertama: model dimuat sekali untuk semua lane.
+    Return (models, gallery, {nama lane: (grabber barang, grabber wajah)}).
+    """
+    cfg = lanes[0]
+    with report.phase("import"):
+        import backends
+        from face_gallery import load_gallery, FACE_DIR, FACE_THRESH
+        from vision_pipeline import VisionModels
+
+        backends.preload(cfg.get("backend", backends.BACKEND))
+
+    tasks = {
+        "gallery": partial(load_gallery, FACE_DIR, FACE_THRESH, mode=cfg.get("face_search_mode", "ann")),
+        "models": partial(
+            VisionModels,
+            face_resolution=max(tuple(lane["face_resolution"]) for lane in lanes),
+            device=cfg.get("device", backends.DEVICE),
+            backend=cfg.get("backend", backends.BACKEND),
+            int8=cfg.get("int8", False),
+            threads=cfg.get("threads")
+        ),
+    }
+    for lane in lanes:
+        for camera in ("barang", "face"):
+            tasks[f"{lane['name']}-{camera}"] = partial(_open_camera, lane, camera)
+    loaded = report.parallel(tasks)
+    grabbers = {
+        lane["name"]: (loaded[f"{lane['name']}-barang"], loaded[f"{lane['name']}-face"])
+        for lane in lanes
+    }
+    return loaded["models"], loaded["gallery"], grabbers
+
+
+def add_lane(server, cfg, product, face, **callbacks):
+    """LaneServer.add_lane dengan setting lane dari config (format lanes.yaml)"""
+    return server.add_lane(
+        cfg["name"],
+        product,
+        face,
+        face_mode=cfg["face_mode"],
+        reverify_interval=cfg["face_reverify_interval"],
+        preview=cfg.get("preview", True),
+        tray_roi=cfg.get("tray_roi"),
+        infer_size=cfg.get("infer_size"),
+        tray_tiles=cfg.get("tray_tiles", (1, 1)),
+        motion_gate=cfg.get("motion_gate", True),
+        **callbacks
+    )
@@ -0,0 +1,43 @@
+import kasir_db
+import migrations
+from catalog import Catalog
+
+
+def make_db(tmp_path):
+    path = str(tmp_path / "kasir.db")
+    conn = kasir_db.connect(path)
+    migrations.migrate(conn, verbose=False)
+    conn.execute("INSERT INTO products (class_name, product_name, price) VALUES ('Pocky', 'Pocky', 8000)")
+    return path, conn
+
+
+def product_reads(catalog):
+    """Hitung SELECT ke products di koneksi catalog"""
+    reads = []
+    catalog._conn.set_trace_callback(lambda sql: reads.append(sql) if "FROM products" in sql else None)
+    return reads
+
+
+def test_payment_commits_do_not_reload_products(tmp_path):
+    path, conn = make_db(tmp_path)
+    catalog = Catalog(path, watch=False)
+    reads = product_reads(catalog)
+    for _ in range(5):
+        conn.execute("INSERT INTO transactions (customer_name, total, transaction_date) "
+                     "VALUES ('A', 8000, '2026-10-17 09:00:00')")
+        assert catalog.reload() is False
+    assert reads == []
+
+
+def test_product_change_reloads(tmp_path):
+    path, conn = make_db(tmp_path)
+    catalog = Catalog(path, watch=False)
+    reads = product_reads(catalog)
+    conn.execute("UPDATE products SET price = 9000 WHERE class_name = 'Pocky'")
+    assert catalog.reload() is True
+    assert catalog.get("Pocky").price == 9000
+    assert len(reads) == 1
+
+    conn.execute("DELETE FROM products")
+    assert catalog.reload() is True
+    assert len(catalog) == 0
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+import enroll_faces
+from face_gallery import load_gallery, read_gallery
+
+
+def embedding(seed):
+    vec = np.random.default_rng(seed).normal(size=512).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def write_npy(folder, names):
+    os.makedirs(folder, exist_ok=True)
+    for i, name in enumerate(names):
+        np.save(os.path.join(folder, f"{name}.npy"), embedding(i))
+
+
+def test_enroll_merges_with_existing_gallery(tmp_path):
+    faces = tmp_path / "faces"
+    gallery = str(faces / "gallery")
+    write_npy(str(faces), ["alice", "bob"])
+    enroll_faces.enroll(None, gallery)  # gallery pertama: faces/*.npy ikut masuk
+    assert sorted(read_gallery(gallery)) == ["alice", "bob"]
+
+    new = tmp_path / "new"
+    write_npy(str(new), ["carol"])
+    enroll_faces.enroll(None, gallery, include_npy=str(new))
+    assert sorted(read_gallery(gallery)) == ["alice", "bob", "carol"]
+
+
+def test_enroll_replace_drops_and_warns(tmp_path, capsys):
+    faces = tmp_path / "faces"
+    gallery = str(faces / "gallery")
+    write_npy(str(faces), ["alice", "bob"])
+    enroll_faces.enroll(None, gallery)
+
+    new = tmp_path / "new"
+    write_npy(str(new), ["carol"])
+    enroll_faces.enroll(None, gallery, include_npy=str(new), replace=True)
+    assert sorted(read_gallery(gallery)) == ["carol"]
+    assert "alice, bob" in capsys.readouterr().out
+
+    # faces/*.npy yang tidak ada di gallery tidak hilang diam-diam
+    gallery = load_gallery(str(faces), watch=False)
+    assert gallery.names == ["carol"]
+    assert "alice, bob" in capsys.readouterr().out
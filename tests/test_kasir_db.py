@@ -0,0 +1,47 @@
+import json
+import sqlite3
+
+import kasir_db
+
+LINES = [("Pocky", "Pocky", 2, 8000)]
+
+
+def make_writer(tmp_path, **kwargs):
+    return kasir_db.TransactionWriter("test", str(tmp_path / "kasir.db"), str(tmp_path / "journal"), **kwargs)
+
+
+def test_rejected_record_does_not_block_later_payments(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.submit("A", LINES, 16000)
+    writer.submit(None, LINES, 16000)  # NOT NULL customer_name -> IntegrityError
+    writer.submit("B", LINES, 16000)
+    assert writer.flush(timeout=5.0)
+    writer.close()
+
+    conn = sqlite3.connect(tmp_path / "kasir.db")
+    customers = [c for (c,) in conn.execute("SELECT customer_name FROM transactions ORDER BY id")]
+    applied = conn.execute("SELECT seq FROM journal_applied WHERE writer = 'test'").fetchone()[0]
+    conn.close()
+    assert customers == ["A", "B"]
+    assert applied == 3
+    with open(writer.rejected_path, encoding="utf-8") as f:
+        rejected = [json.loads(line) for line in f]
+    assert [r["record"]["seq"] for r in rejected] == [2]
+
+    # Restart: record yang ditolak tidak di-replay lagi
+    writer = make_writer(tmp_path)
+    assert writer.pending == 0
+    writer.close()
+
+
+def test_journal_compacted_only_after_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(kasir_db, "JOURNAL_COMPACT_BYTES", 1)
+    writer = make_writer(tmp_path)
+    writer.submit("A", LINES, 16000)
+    assert writer.flush(timeout=5.0)
+    writer.close()
+    with open(writer.journal_path, "rb") as f:
+        assert f.read() == b""
+    conn = sqlite3.connect(tmp_path / "kasir.db")
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,93 @@
+import io
+
+import pytest
+
+import kasir_db
+import kasir_io
+import migrations
+import rollups
+
+
+def shop_db(tmp_path, name, sales):
+    """DB satu toko dengan transaksi [(customer, total, tanggal)]"""
+    conn = kasir_db.connect(str(tmp_path / f"{name}.db"))
+    migrations.migrate(conn, verbose=False)
+    for customer, total, date in sales:
+        tx = conn.execute(
+            "INSERT INTO transactions (customer_name, total, transaction_date) VALUES (?, ?, ?)",
+            (customer, total, date),
+        ).lastrowid
+        conn.execute(
+            "INSERT INTO transaction_items (transaction_id, class_name, product_name, quantity, price)"
+            " VALUES (?, 'Pocky', 'Pocky', 2, ?)",
+            (tx, total // 2),
+        )
+    return conn
+
+
+def export(conn, fmt, store):
+    out = io.StringIO()
+    kasir_io.export_transactions(conn, out, fmt, store=store)
+    return out.getvalue()
+
+
+def test_two_stores_with_overlapping_ids_merge(tmp_path):
+    # Kedua toko punya transaksi id 1 dan 2 di hari yang sama
+    a = shop_db(tmp_path, "a", [("A1", 10000, "2026-10-17 09:00:00"), ("A2", 20000, "2026-10-17 10:00:00")])
+    b = shop_db(tmp_path, "b", [("B1", 5000, "2026-10-17 09:30:00"), ("B2", 7000, "2026-10-18 08:00:00")])
+    hq = shop_db(tmp_path, "hq", [("HQ", 1000, "2026-10-17 12:00:00")])
+
+    dump_a = export(a, "jsonl", "a")
+    dump_b = export(b, "csv", "b")
+    assert kasir_io.import_transactions(hq, kasir_io._read_transactions(io.StringIO(dump_a), "jsonl")) == (2, 0)
+    assert kasir_io.import_transactions(hq, kasir_io._read_transactions(io.StringIO(dump_b), "csv")) == (2, 0)
+
+    # Import ulang: dilewati, tidak ada item yatim
+    assert kasir_io.import_transactions(hq, kasir_io._read_transactions(io.StringIO(dump_a), "jsonl")) == (0, 2)
+    assert hq.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 5
+    assert hq.execute("SELECT COUNT(*) FROM transaction_items").fetchone()[0] == 5
+    assert hq.execute(
+        "SELECT COUNT(*) FROM transaction_items WHERE transaction_id NOT IN (SELECT id FROM transactions)"
+    ).fetchone()[0] == 0
+
+    assert rollups.stores(hq) == [("", 1, 1000), ("a", 2, 30000), ("b", 2, 12000)]
+    assert rollups.totals(hq, store="b", start_day="2026-10-17", end_day="2026-10-17") == (1, 5000)
+    assert rollups.totals(hq) == (5, 43000)
+
+    # Rollup dari trigger sama dengan rebuild penuh
+    before = hq.execute("SELECT * FROM sales_daily ORDER BY store, day").fetchall()
+    rollups.rebuild(hq)
+    assert hq.execute("SELECT * FROM sales_daily ORDER BY store, day").fetchall() == before
+
+
+def test_store_argument_for_files_without_store_column(tmp_path):
+    a = shop_db(tmp_path, "a", [("A1", 10000, "2026-10-17 09:00:00")])
+    hq = shop_db(tmp_path, "hq", [])
+    dump = export(a, "jsonl", None)
+
+    def load():
+        return kasir_io.import_transactions(hq, kasir_io._read_transactions(io.StringIO(dump), "jsonl"), store="a")
+
+    assert load() == (1, 0)
+    assert load() == (0, 1)
+    assert rollups.stores(hq) == [("a", 1, 10000)]
+
+
+def test_import_without_store_is_rejected(tmp_path):
+    a = shop_db(tmp_path, "a", [("A1", 10000, "2026-10-17 09:00:00")])
+    hq = shop_db(tmp_path, "hq", [])
+    dump = export(a, "jsonl", None)
+    with pytest.raises(ValueError):
+        kasir_io.import_transactions(hq, kasir_io._read_transactions(io.StringIO(dump), "jsonl"))
+    assert hq.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+
+def test_export_pages_by_id_and_filters_rows_without_created_at(tmp_path, monkeypatch):
+    monkeypatch.setattr(kasir_io, "CHUNK", 2)
+    sales = [(f"C{n}", 1000 * n, f"2026-10-{10 + n} 09:00:00") for n in range(1, 6)]
+    a = shop_db(tmp_path, "a", sales)  # created_at NULL semua
+    rows = list(kasir_io.iter_rows(a))
+    assert [r[0] for r in rows] == [1, 2, 3, 4, 5]
+    rows = list(kasir_io.iter_rows(a, start_day="2026-10-12", end_day="2026-10-14"))
+    assert [r[3] for r in rows] == ["C2", "C3", "C4"]
+    assert [r[0] for r in kasir_io.iter_rows(a, after_id=3)] == [4, 5]
@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+
+# vision_pipeline mengimpor torch/ultralytics di level modul
+vision_pipeline = pytest.importorskip("vision_pipeline")
+
+from capture import Frame
+from count_stabilizer import COUNT_ENTER, COUNT_EXIT
+
+CAMERA_FPS = 30
+YOLO_RATE = 15
+TICK = 1.0 / YOLO_RATE
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+class FakeGrabber:
+    def __init__(self, clock):
+        self.clock = clock
+        self.frame = None
+        self.seq = 0
+
+    def push(self, image):
+        self.seq += 1
+        self.frame = Frame(image, self.clock(), self.seq)
+
+    def latest(self):
+        return self.frame
+
+    def stop(self):
+        pass
+
+
+class FakeTracker:
+    def update(self, result):
+        return result
+
+
+class FakeIds(list):
+    def int(self):
+        return self
+
+    def tolist(self):
+        return list(self)
+
+
+class FakeResult:
+    def __init__(self, ids):
+        self.boxes = type("Boxes", (), {"id": FakeIds(ids), "cls": FakeIds([0] * len(ids))})()
+
+
+class FakeTray:
+    size = 640
+    bounds = None
+
+    def prepare(self, frame):
+        return [frame]
+
+    def restore(self, frame, results):
+        return results[0]
+
+
+class FakeModels:
+    names = {0: "Pocky"}
+    imgsz = 640
+
+    def __init__(self):
+        self.ids = []
+        self.calls = 0
+
+    def detect(self, frames, imgsz=None):
+        self.calls += 1
+        return [FakeResult(self.ids) for _ in frames]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(vision_pipeline, "ProductTracker", FakeTracker)
+    clock = FakeClock()
+    server = vision_pipeline.LaneServer(FakeModels(), None, show=False,
+                                        stage_rates={"yolo": (YOLO_RATE, 0), "face": (3, 1)})
+    server.scheduler.clock = clock
+    lane = vision_pipeline.Lane("test", FakeGrabber(clock), None, None, names=FakeModels.names,
+                                preview=False, tray=FakeTray())
+    lane.gate.max_skip = 60.0  # tidak ada inference paksa selama test
+    server.lanes.append(lane)
+    return server
+
+
+def drive(server, frame_fn, seconds):
+    """Loop LaneServer.run() dengan kamera CAMERA_FPS; frame_fn(i) -> gambar frame ke-i.
+
+    Return [(waktu, counts)] tiap kali counts lane berubah.
+    """
+    clock = server.scheduler.clock
+    lane = server.lanes[0]
+    end = clock.t + seconds
+    next_frame = clock.t
+    changes, counts = [], dict(lane.counts)
+    while clock.t < end:
+        if clock.t >= next_frame:
+            lane.product_grabber.push(frame_fn(lane.product_grabber.seq))
+            while next_frame <= clock.t:
+                next_frame += 1.0 / CAMERA_FPS
+        delay = server.step()
+        if lane.counts != counts:
+            counts = dict(lane.counts)
+            changes.append((clock.t, counts))
+        # Bangun saat stage due atau frame kamera berikutnya datang
+        clock.t += max(1e-3, min(delay, next_frame - clock.t))
+    return changes
+
+
+STATIC = np.full((360, 640, 3), 80, dtype=np.uint8)
+
+
+def moving(i):
+    """Setiap frame beda kecerahan (tangan bergerak di atas tray)"""
+    return np.full((360, 640, 3), 40 + (i * 50) % 200, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("frame_fn, inferences", [
+    (lambda i: STATIC, (1, 1)),                       # tray diam: hampir semua di-gate
+    (moving, (YOLO_RATE - 1, YOLO_RATE + 1)),         # tray bergerak: setiap tick yolo
+])
+def test_stabilizer_runs_at_yolo_rate_gated_or_not(server, frame_fn, inferences):
+    server.models.ids = [1, 2]
+    drive(server, frame_fn, 1.0)
+    lane = server.lanes[0]
+    # Kamera 30 FPS, stage yolo 15 Hz: hysteresis dihitung dalam tick yolo
+    assert YOLO_RATE - 1 <= lane.stabilizer.frame <= YOLO_RATE + 1
+    assert inferences[0] <= server.models.calls <= inferences[1]
+    assert server.scheduler.stages["yolo"].idle < YOLO_RATE
+
+
+@pytest.mark.parametrize("gate", [True, False])
+def test_item_added_and_removed_after_same_delay_with_or_without_gate(server, gate):
+    lane = server.lanes[0]
+    if not gate:
+        lane.gate = None
+    start = server.scheduler.clock.t
+    server.models.ids = [1, 2]
+    changes = drive(server, lambda i: STATIC, 1.0)
+    assert changes[-1][1] == {"Pocky": 2}
+    assert changes[0][0] - start == pytest.approx((COUNT_ENTER - 1) * TICK, abs=TICK)
+
+    # Satu item diambil: gerakan -> inference dengan satu track, lalu tray diam lagi
+    taken = STATIC.copy()
+    taken[:, 320:] = 200
+    server.models.ids = [1]
+    start = server.scheduler.clock.t
+    changes = drive(server, lambda i: taken, 1.5)
+    assert changes == [(pytest.approx(start + COUNT_EXIT * TICK, abs=TICK), {"Pocky": 1})]
+    if gate:
+        assert lane.gate.skipped > 0
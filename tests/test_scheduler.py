@@ -0,0 +1,91 @@
+import pytest
+
+from scheduler import DEFER_BACKOFF, StageScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler():
+    clock = FakeClock()
+    scheduler = StageScheduler(clock=clock)
+    scheduler.add_stage("yolo", 15, 0)
+    scheduler.add_stage("face", 3, 1)
+    return scheduler, clock
+
+
+def test_end_tick_waits_when_all_due_stages_deferred():
+    scheduler, _ = make_scheduler()
+    planned = scheduler.plan()
+    assert planned == ["yolo", "face"]
+    for name in planned:
+        scheduler.defer(name)
+    delay = scheduler.end_tick()
+    assert delay > 0
+    assert delay == pytest.approx(DEFER_BACKOFF)
+
+
+def test_deferred_stage_is_idle_not_skipped():
+    scheduler, clock = make_scheduler()
+    for _ in range(5):
+        for name in scheduler.plan():
+            scheduler.defer(name)
+        clock.now += scheduler.end_tick()
+    yolo = scheduler.stages["yolo"]
+    assert yolo.idle == 5
+    assert yolo.skipped == 0
+
+
+def test_deferred_stage_due_again_after_backoff():
+    scheduler, clock = make_scheduler()
+    scheduler.plan()
+    scheduler.defer("yolo")
+    scheduler.run("face", lambda: None)
+    assert "yolo" not in scheduler.plan()
+    clock.now += DEFER_BACKOFF
+    assert "yolo" in scheduler.plan()
+
+
+def test_run_clears_backoff():
+    scheduler, clock = make_scheduler()
+    scheduler.plan()
+    scheduler.defer("yolo")
+    scheduler.run("yolo", lambda: None)
+    assert scheduler.stages["yolo"].retry_at is None
+    clock.now += 1.0 / 15
+    assert "yolo" in scheduler.plan()
+
+
+def run_for(scheduler, clock, seconds, costs):
+    """Loop scheduler dengan biaya stage tetap (detik), jam maju sesuai biaya + delay"""
+    end = clock.now + seconds
+    while clock.now < end:
+        for name in scheduler.plan():
+            def work(cost=costs[name]):
+                clock.now += cost
+            scheduler.run(name, work)
+        clock.now += scheduler.end_tick()
+
+
+def test_stage_slower_than_budget_keeps_full_rate_with_spare_time():
+    # YOLO CPU 150 ms > budget 100 ms, tapi 2 Hz -> beban 0.3: mesin masih longgar
+    clock = FakeClock()
+    scheduler = StageScheduler(target_latency=0.1, clock=clock)
+    scheduler.add_stage("yolo", 2, 0)
+    run_for(scheduler, clock, 10.0, {"yolo": 0.15})
+    assert scheduler.rate_scale == 1.0
+    assert scheduler.stages["yolo"].actual_rate == pytest.approx(2.0, rel=0.05)
+
+
+def test_rate_scale_drops_only_when_load_exceeds_one_core():
+    clock = FakeClock()
+    scheduler = StageScheduler(target_latency=0.1, clock=clock)
+    scheduler.add_stage("yolo", 15, 0)
+    run_for(scheduler, clock, 10.0, {"yolo": 0.15})  # 15 Hz x 150 ms = 2.25 core
+    assert scheduler.load() <= 1.0
+    assert scheduler.rate_scale > 0.3  # bukan terjepit di MIN_RATE_SCALE
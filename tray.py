@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+import torch
+
+# ==========================
+# CONFIG
+# ==========================
+TILE_OVERLAP = 0.15   # fraksi lebar/tinggi tile yang tumpang tindih dengan tetangganya
+TILE_NMS_IOU = 0.5    # IoU untuk menggabung box duplikat di area overlap
+
+
+def parse_roi(roi):
+    """[x1, y1, x2, y2] piksel kamera barang, atau None = seluruh frame"""
+    if roi is None:
+        return None
+    x1, y1, x2, y2 = (int(v) for v in roi)
+    if x2 <= x1 or y2 <= y1:
+        raise ValueError(f"tray_roi tidak valid: {roi}")
+    return x1, y1, x2, y2
+
+
+# ==========================
+# TRAY CROPPER
+# ==========================
+class TrayCropper:
+    """Crop area tray + resize ke resolusi inference, sekali, ke buffer yang dipakai ulang.
+
+    Tanpa ini seluruh frame 2560x1440 di-letterbox di dalam ultralytics
+    padahal yang penting hanya area tray. Di sini ROI di-resize langsung
+    (cv2.resize dst=) ke buffer dengan sisi panjang = size, jadi letterbox
+    ultralytics tinggal padding. Box hasil deteksi dipetakan balik ke
+    koordinat frame kamera, sehingga tracker, stabilizer dan preview tidak
+    perlu tahu soal ROI.
+
+    tiles=(kolom, baris) > 1: ROI dipecah jadi beberapa tile yang saling
+    overlap, tiap tile di-resize ke size sendiri (resolusi efektif lebih
+    tinggi untuk item kecil), lalu box digabung dengan NMS per kelas.
+    """
+
+    def __init__(self, roi=None, size=640, tiles=(1, 1), overlap=TILE_OVERLAP, nms_iou=TILE_NMS_IOU):
+        self.roi = parse_roi(roi)
+        self.size = int(size)
+        self.tiles = (int(tiles[0]), int(tiles[1]))
+        self.overlap = overlap
+        self.nms_iou = nms_iou
+        self.windows = []   # (x1, y1, x2, y2, sx, sy) per tile, koordinat frame
+        self.buffers = []   # buffer inference per tile; None = crop dipakai langsung
+        self.bounds = None  # ROI yang sudah di-clip ke frame, tersedia setelah prepare() pertama
+        self._shape = None
+
+    @property
+    def count(self):
+        return self.tiles[0] * self.tiles[1]
+
+    def _allocate(self, h, w):
+        if self.roi is None:
+            x1, y1, x2, y2 = 0, 0, w, h
+        else:
+            x1, y1, x2, y2 = self.roi
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+            if x2 <= x1 or y2 <= y1:
+                raise ValueError(f"tray_roi {self.roi} di luar frame {w}x{h}")
+
+        self.bounds = (x1, y1, x2, y2)
+        cols, rows = self.tiles
+        tw, th = (x2 - x1) / cols, (y2 - y1) / rows
+        ox, oy = tw * self.overlap / 2, th * self.overlap / 2
+        self.windows, self.buffers = [], []
+        for r in range(rows):
+            for c in range(cols):
+                wx1 = max(x1, int(x1 + c * tw - ox))
+                wx2 = min(x2, int(round(x1 + (c + 1) * tw + ox)))
+                wy1 = max(y1, int(y1 + r * th - oy))
+                wy2 = min(y2, int(round(y1 + (r + 1) * th + oy)))
+                cw, ch = wx2 - wx1, wy2 - wy1
+                scale = self.size / max(cw, ch)
+                if scale >= 1.0:
+                    # Sudah cukup kecil: crop (view) langsung, tidak pernah memperbesar
+                    self.windows.append((wx1, wy1, wx2, wy2, 1.0, 1.0))
+                    self.buffers.append(None)
+                    continue
+                bw, bh = max(1, round(cw * scale)), max(1, round(ch * scale))
+                self.windows.append((wx1, wy1, wx2, wy2, bw / cw, bh / ch))
+                self.buffers.append(np.empty((bh, bw, 3), dtype=np.uint8))
+        self._shape = (h, w)
+
+    def prepare(self, frame):
+        """List input detector (satu per tile) dari frame kamera. Buffer dipakai ulang"""
+        h, w = frame.shape[:2]
+        if self._shape != (h, w):
+            self._allocate(h, w)
+        inputs = []
+        for (x1, y1, x2, y2, _, _), buf in zip(self.windows, self.buffers):
+            crop = frame[y1:y2, x1:x2]
+            if buf is None:
+                inputs.append(crop)
+            else:
+                cv2.resize(crop, (buf.shape[1], buf.shape[0]), dst=buf, interpolation=cv2.INTER_LINEAR)
+                inputs.append(buf)
+        return inputs
+
+    def restore(self, frame, results):
+        """Results per tile -> satu Results dengan box di koordinat frame kamera"""
+        data = [self._to_frame(result.boxes.data, window) for result, window in zip(results, self.windows)]
+        result = results[0]
+        # orig_img ikut diganti: buffer tile ditimpa di frame berikutnya
+        result.orig_img = frame
+        result.orig_shape = frame.shape[:2]
+        if len(data) == 1:
+            result.update(boxes=data[0])
+            return result
+
+        from torchvision.ops import batched_nms
+
+        merged = torch.cat(data)
+        if len(merged):
+            keep = batched_nms(merged[:, :4], merged[:, 4], merged[:, 5].int(), self.nms_iou)
+            merged = merged[keep]
+        result.update(boxes=merged)
+        return result
+
+    @staticmethod
+    def _to_frame(data, window):
+        x1, y1, _, _, sx, sy = window
+        if (x1, y1, sx, sy) == (0, 0, 1.0, 1.0):
+            return data
+        data = data.clone()
+        data[:, [0, 2]] = data[:, [0, 2]] / sx + x1
+        data[:, [1, 3]] = data[:, [1, 3]] / sy + y1
+        return data
@@ -0,0 +1,459 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import torch
+
+import backends
+import metrics
+from count_stabilizer import CountStabilizer
+from face_tracker import FaceTracker, embed_crops
+from motion_gate import MotionGate
+from preview import FACE_PIP_SIZE, PreviewLoop, PreviewRenderer, snapshot_result
+from scheduler import StageScheduler
+from tray import TrayCropper
+
+# ==========================
+# CONFIG
+# ==========================
+YOLO_WEIGHTS = "best.pt"
+YOLO_CONF = 0.5
+YOLO_IMGSZ = 640
+# Device / backend / INT8 / thread dipilih di backends.py (CPU fallback otomatis)
+YOLO_DEVICE = backends.DEVICE
+TRACKER_CFG = "bytetrack.yaml"
+TRACKER_FRAME_RATE = 30
+
+# Overlay FPS di jendela preview (metrics lengkap ada di metrics.py).
+# Preview sendiri (ukuran, batas refresh) dikonfigurasi di preview.py
+SHOW_FPS_OVERLAY = True
+
+# Budget latency per tick dan rate tiap stage: nama -> (Hz, prioritas)
+TARGET_LATENCY = 0.1
+STAGE_RATES = {
+    "yolo": (15, 0),
+    "face": (3, 1),
+}
+
+# Inference dummy sebelum lane siap (setup graph CUDA/ONNX, alokasi buffer)
+WARMUP_RUNS = 3
+WARMUP_FRAME_TIMEOUT = 2.0  # detik menunggu frame kamera pertama untuk warm-up
+
+
+# ==========================
+# MODELS (sekali per proses)
+# ==========================
+class VisionModels:
+    """YOLO + FaceAnalysis yang dipakai bersama oleh semua lane"""
+
+    def __init__(self, yolo_weights=YOLO_WEIGHTS, face_resolution=(352, 288),
+                 device=YOLO_DEVICE, backend=backends.BACKEND, int8=False,
+                 threads=backends.THREADS, conf=YOLO_CONF, imgsz=YOLO_IMGSZ):
+        backends.set_threads(threads)
+        device = backends.resolve_device(device)
+        self.backend = backend
+        self.int8 = int8
+        self.device = backends.yolo_device(device, backend)
+        self.conf = conf
+        self.imgsz = imgsz
+
+        self.face_resolution = tuple(face_resolution)
+
+        # Model wajah dan YOLO dimuat paralel (I/O + init runtime)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="load-model") as pool:
+            face_app = pool.submit(backends.load_face_app, face_resolution, device, backend, int8, threads)
+            yolo = pool.submit(backends.load_yolo, yolo_weights, backend, imgsz, int8)
+            self.face_app = face_app.result()
+            self.yolo = yolo.result()
+
+    @property
+    def names(self):
+        return self.yolo.names
+
+    def detect(self, frames, imgsz=None):
+        """Satu panggilan YOLO untuk frame dari semua lane -> list Results"""
+        if not frames:
+            return []
+        return self.yolo.predict(
+            frames,
+            conf=self.conf,
+            imgsz=imgsz or self.imgsz,
+            device=self.device,
+            verbose=False
+        )
+
+
+# ==========================
+# PER-LANE BYTE TRACK
+# ==========================
+class ProductTracker:
+    """State ByteTrack milik satu lane.
+
+    yolo.track(persist=True) menyimpan tracker di predictor, jadi kalau
+    frame banyak lane di-batch track-nya tercampur. Di sini deteksi batch
+    dari VisionModels.detect() di-update ke tracker masing-masing lane,
+    sama seperti callback tracking bawaan ultralytics.
+    """
+
+    def __init__(self, tracker_cfg=TRACKER_CFG, frame_rate=TRACKER_FRAME_RATE):
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_cfg)))
+        self.tracker = BYTETracker(args=cfg, frame_rate=frame_rate)
+
+    def update(self, result):
+        det = result.boxes.cpu().numpy()
+        tracks = self.tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return result
+
+
+def count_labels(result, names):
+    """Hitung jumlah objek per label dari satu Results (mentah, tanpa stabilisasi)"""
+    counts = {}
+    boxes = result.boxes
+    if boxes is not None and boxes.cls is not None:
+        for cls in boxes.cls:
+            label = names[int(cls)]
+            counts[label] = counts.get(label, 0) + 1
+    return counts
+
+
+def tracked_classes(result):
+    """(track_ids, class_ids) dari Results hasil ByteTrack. Deteksi tanpa id diabaikan"""
+    boxes = result.boxes
+    if boxes is None or boxes.id is None:
+        return [], []
+    return boxes.id.int().tolist(), boxes.cls.int().tolist()
+
+
+# ==========================
+# LANE
+# ==========================
+class Lane:
+    """Satu checkout lane: kamera barang + kamera wajah + state tracking + callback UI"""
+
+    def __init__(self, name, product_grabber, face_grabber, face_tracker,
+                 on_counts=None, on_customer=None, on_preview=None, window_name=None,
+                 catalog=None, names=None, preview=True, tray=None, motion_gate=True):
+        self.name = name
+        self.product_grabber = product_grabber
+        self.face_grabber = face_grabber
+        self.face_tracker = face_tracker
+        self.product_tracker = ProductTracker()
+        self.stabilizer = CountStabilizer()
+        # ROI tray + resolusi inference (crop/resize sebelum detector)
+        self.tray = tray or TrayCropper()
+        # Tray diam -> YOLO dilewati, hasil terakhir dipakai ulang
+        self.gate = MotionGate() if motion_gate else None
+        self.on_counts = on_counts
+        self.on_customer = on_customer
+        # on_preview(frame) menggantikan cv2.imshow (mis. ke shared memory)
+        self.on_preview = on_preview
+        self.window_name = window_name or f"KASIRLESS - {name}"
+        # preview=False -> lane headless, tidak ada resize/gambar sama sekali
+        self.renderer = PreviewRenderer(names) if preview else None
+        self.names = names
+        # catalog.Catalog (di memori) untuk nilai cart per class id, tanpa query DB
+        self.catalog = catalog
+
+        self.product_seq = 0
+        self.face_seq = 0
+        self.face_small = None
+        self.pip_seq = 0
+        self.counts = {}
+        self.cart_value = 0
+        self.last = None  # snapshot_result(): (frame_barang, seq, xyxy, classes, ids)
+        self.last_tracks = ([], [])  # (track_ids, class_ids) inference terakhir
+
+    # ========== FACE ==========
+    def take_face_frame(self):
+        """Frame wajah baru (salinan jika digambari untuk preview) atau None"""
+        if self.face_grabber is None:
+            return None
+        frame = self.face_grabber.latest()
+        if frame is None or frame.seq == self.face_seq:
+            return None
+        self.face_seq = frame.seq
+        # Umur frame sejak di-capture = waktu tunggu di slot kamera
+        metrics.observe("capture_wait", time.monotonic() - frame.timestamp, lane=self.name, camera="face")
+        return frame.image.copy() if self.renderer is not None else frame.image
+
+    def finish_face(self, frame_face, active):
+        customer = self.face_tracker.customer_changed(active)
+        if customer is not None and self.on_customer:
+            with metrics.timed("emit", lane=self.name, signal="customer"):
+                self.on_customer(customer)
+
+        # ========== FACE → PIP (hanya untuk preview) ==========
+        if self.renderer is None:
+            return
+        for track in active:
+            x1, y1, x2, y2 = map(int, track.bbox)
+            cv2.rectangle(frame_face, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(
+                frame_face,
+                track.name,
+                (x1, y1 - 8),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (0, 255, 0),
+                2
+            )
+        self.face_small = cv2.resize(frame_face, FACE_PIP_SIZE)
+        self.pip_seq += 1
+
+    # ========== PRODUCT ==========
+    def take_product_frame(self):
+        """Frame barang baru atau None"""
+        frame = self.product_grabber.latest()
+        if frame is None or frame.seq == self.product_seq:
+            return None
+        self.product_seq = frame.seq
+        metrics.observe("capture_wait", time.monotonic() - frame.timestamp, lane=self.name, camera="barang")
+        return frame.image
+
+    def needs_inference(self, frame_barang, now=None):
+        """False jika tray tidak berubah sejak inference terakhir (YOLO dilewati)"""
+        if self.gate is None:
+            return True
+        with metrics.timed("motion_gate", lane=self.name):
+            return self.gate.should_infer(frame_barang, self.tray.bounds, now)
+
+    def reuse_product(self, frame_barang):
+        """Tray tidak berubah: tanpa YOLO/tracker, box + track terakhir tetap berlaku"""
+        if self.last is not None:
+            self.last = (frame_barang, self.product_seq) + self.last[2:]
+        # Dipanggil dari stage yolo (rate sama dengan inference), jadi
+        # hysteresis masuk/keluar stabilizer tetap dalam frame yolo
+        self._emit_counts(self.stabilizer.update(*self.last_tracks))
+
+    def finish_product(self, frame_barang, result):
+        with metrics.timed("track", lane=self.name):
+            result = self.product_tracker.update(result)
+        if self.renderer is not None:
+            self.last = snapshot_result(frame_barang, self.product_seq, result)
+
+        # Cart hanya dikirim ke UI saat isi stabilnya berubah
+        self.last_tracks = tracked_classes(result)
+        self._emit_counts(self.stabilizer.update(*self.last_tracks))
+
+    def _emit_counts(self, changed):
+        if changed is None:
+            return
+        counts = {self.names[cls]: qty for cls, qty in changed.items()}
+        self.counts = counts
+        if self.catalog is not None:
+            self.cart_value = self.catalog.total(changed)
+            metrics.set_gauge("cart_value", self.cart_value, lane=self.name)
+        if self.on_counts:
+            with metrics.timed("emit", lane=self.name, signal="counts"):
+                self.on_counts(counts)
+        metrics.inc("cart_updates", lane=self.name)
+
+    def resync(self):
+        """Cart/customer di UI di-reset -> kirim ulang state vision berikutnya"""
+        self.face_tracker.forget_customer()
+        self.stabilizer.resync()
+
+    def stop(self):
+        for grabber in (self.product_grabber, self.face_grabber):
+            if grabber is not None:
+                grabber.stop()
+
+
+# ==========================
+# LANE SERVER
+# ==========================
+class LaneServer:
+    """Satu proses, model dimuat sekali, banyak lane.
+
+    Tiap tick scheduler: frame terbaru semua lane dikumpulkan jadi satu
+    batch YOLO dan satu batch ArcFace, lalu hasilnya dikembalikan ke
+    state + UI masing-masing lane.
+    """
+
+    def __init__(self, models, gallery, target_latency=TARGET_LATENCY,
+                 stage_rates=STAGE_RATES, show=True, fps_overlay=SHOW_FPS_OVERLAY,
+                 catalog=None, on_tick=None):
+        self.models = models
+        self.gallery = gallery
+        self.catalog = catalog.bind(models.names) if catalog is not None else None
+        self.show = show
+        self.fps_overlay = fps_overlay
+        self.lanes = []
+        self.scheduler = StageScheduler(target_latency)
+        for stage_name, (rate, priority) in stage_rates.items():
+            self.scheduler.add_stage(stage_name, rate, priority)
+        self.preview = None
+        # on_tick() dipanggil tiap selesai tick loop (mis. heartbeat: bukti loop tidak hang)
+        self.on_tick = on_tick
+        self._running = False
+        metrics.register_collector(self.collect_metrics)
+
+    def collect_metrics(self):
+        """Counter/gauge yang dibaca saat export: frame dropped, stage di-skip/idle, rate"""
+        for lane in self.lanes:
+            for camera, grabber in (("barang", lane.product_grabber), ("face", lane.face_grabber)):
+                if grabber is not None:
+                    yield "counter", "frames_dropped", {"lane": lane.name, "camera": camera}, grabber.dropped
+                    yield "counter", "frames_captured", {"lane": lane.name, "camera": camera}, grabber.captured
+            if lane.gate is not None:
+                yield "counter", "yolo_gated", {"lane": lane.name}, lane.gate.skipped
+        for name, stage in self.scheduler.stages.items():
+            yield "counter", "stage_skipped", {"stage": name}, stage.skipped
+            yield "counter", "stage_idle", {"stage": name}, stage.idle
+            yield "counter", "stage_runs", {"stage": name}, stage.runs
+            yield "gauge", "stage_rate_hz", {"stage": name}, stage.actual_rate
+        yield "gauge", "rate_scale", {}, self.scheduler.rate_scale
+
+    def add_lane(self, name, product_grabber, face_grabber, face_mode="all",
+                 reverify_interval=None, on_counts=None, on_customer=None,
+                 on_preview=None, window_name=None, preview=True,
+                 tray_roi=None, infer_size=None, tray_tiles=(1, 1), motion_gate=True):
+        kwargs = {} if reverify_interval is None else {"reverify_interval": reverify_interval}
+        tray = TrayCropper(tray_roi, infer_size or self.models.imgsz, tray_tiles)
+        tracker = FaceTracker(self.models.face_app, self.gallery, mode=face_mode, **kwargs)
+        lane = Lane(name, product_grabber, face_grabber, tracker,
+                    on_counts=on_counts, on_customer=on_customer,
+                    on_preview=on_preview, window_name=window_name,
+                    catalog=self.catalog, names=self.models.names,
+                    preview=preview and self.show, tray=tray, motion_gate=motion_gate)
+        self.lanes.append(lane)
+        return lane
+
+    # ==========================
+    # BATCHED STAGES
+    # ==========================
+    def face_stage(self, work):
+        now = time.monotonic()
+        pending_all, crops = [], []
+        observed = []
+        for lane, frame_face in work:
+            with metrics.timed("face_detect", lane=lane.name):
+                active, pending = lane.face_tracker.observe(frame_face, now)
+            observed.append((lane, frame_face, active))
+            if pending:
+                pending_all.append((lane, pending))
+                crops.extend(lane.face_tracker.crops(frame_face, pending))
+
+        if crops:
+            with metrics.timed("face_embed"):
+                embeddings = embed_crops(self.models.face_app, crops)
+            with metrics.timed("face_match"):
+                names = self.gallery.identify(embeddings)
+            pos = 0
+            for lane, pending in pending_all:
+                lane.face_tracker.assign(pending, names[pos:pos + len(pending)], now)
+                pos += len(pending)
+
+        for lane, frame_face, active in observed:
+            lane.finish_face(frame_face, active)
+
+    def product_stage(self, work, now=None):
+        """Motion gate lalu YOLO per batch. Return jumlah frame yang masuk YOLO.
+
+        now: waktu frame untuk MotionGate (replay memakai waktu video)
+        """
+        # Lane dengan resolusi inference sama -> satu batch YOLO
+        batches = {}
+        inferred = 0
+        for lane, frame_barang in work:
+            if not lane.needs_inference(frame_barang, now):
+                lane.reuse_product(frame_barang)
+                continue
+            inferred += 1
+            with metrics.timed("preprocess", lane=lane.name):
+                inputs = lane.tray.prepare(frame_barang)
+            batches.setdefault(lane.tray.size, []).append((lane, frame_barang, inputs))
+
+        for size, items in batches.items():
+            with metrics.timed("yolo"):
+                results = self.models.detect([x for _, _, inputs in items for x in inputs], imgsz=size)
+            pos = 0
+            for lane, frame_barang, inputs in items:
+                result = lane.tray.restore(frame_barang, results[pos:pos + len(inputs)])
+                pos += len(inputs)
+                lane.finish_product(frame_barang, result)
+        return inferred
+
+    def warm_up(self, runs=WARMUP_RUNS):
+        """Inference dummy dengan shape batch yang sama seperti saat jalan.
+
+        Tanpa ini customer pertama yang membayar setup graph CUDA/ONNX.
+        Hanya model yang dipanggil; tracker/stabilizer lane tidak disentuh.
+        """
+        batches = {}
+        for lane in self.lanes:
+            # Frame kamera asli (tunggu sebentar) supaya shape input = shape saat jalan
+            frame = None
+            if lane.product_grabber is not None:
+                frame = lane.product_grabber.wait_newer(0, timeout=WARMUP_FRAME_TIMEOUT)
+            if frame is not None:
+                image = frame.image
+            else:
+                image = np.zeros((self.models.imgsz, self.models.imgsz, 3), dtype=np.uint8)
+            batches.setdefault(lane.tray.size, []).extend(lane.tray.prepare(image))
+        w, h = self.models.face_resolution
+        face_frame = np.zeros((h, w, 3), dtype=np.uint8)
+        crop = np.zeros((112, 112, 3), dtype=np.uint8)
+        for _ in range(runs):
+            for size, inputs in batches.items():
+                self.models.detect(inputs, imgsz=size)
+            self.models.face_app.get(face_frame)
+            embed_crops(self.models.face_app, [crop] * len(self.lanes))
+
+    # ==========================
+    # LOOP
+    # ==========================
+    def step(self):
+        """Satu tick scheduler untuk semua lane"""
+        for stage_name in self.scheduler.plan():
+            if stage_name == "face":
+                work = [(lane, lane.take_face_frame()) for lane in self.lanes]
+                work = [(lane, f) for lane, f in work if f is not None]
+                if not work:
+                    self.scheduler.defer("face")
+                    continue
+                self.scheduler.run("face", self.face_stage, work)
+
+            elif stage_name == "yolo":
+                work = [(lane, lane.take_product_frame()) for lane in self.lanes]
+                work = [(lane, f) for lane, f in work if f is not None]
+                if not work:
+                    self.scheduler.defer("yolo")
+                    continue
+                # Frame yang di-gate juga lewat sini: stabilizer di-update
+                # pada rate stage yolo, bukan setiap frame kamera
+                self.scheduler.run("yolo", self.product_stage, work)
+        return self.scheduler.end_tick()
+
+    def run(self):
+        """Loop sampai stop() atau tombol q di jendela preview"""
+        self._running = True
+        if self.show:
+            # Preview di thread sendiri: resize/gambar/imshow tidak menahan inference
+            yolo = self.scheduler.stages["yolo"]
+            fps_fn = (lambda: yolo.actual_rate) if self.fps_overlay else None
+            self.preview = PreviewLoop(self.lanes, fps_fn=fps_fn, on_quit=self.stop).start()
+        while self._running:
+            delay = self.step()
+            if self.on_tick:
+                self.on_tick()
+            # Tidur sampai stage berikutnya due (rate menyesuaikan beban mesin)
+            time.sleep(delay)
+        self._running = False
+        if self.preview is not None:
+            self.preview.stop()
+        for lane in self.lanes:
+            lane.stop()
+
+    def stop(self):
+        self._running = False
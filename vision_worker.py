@@ -0,0 +1,296 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from preview import preview_size
+
+# ==========================
+# CONFIG
+# ==========================
+PREVIEW_SLOTS = 3
+HEARTBEAT_INTERVAL = 1.0   # detik
+HEARTBEAT_TIMEOUT = 10.0   # detik tanpa heartbeat -> worker dianggap hang
+STARTUP_TIMEOUT = 120.0    # load model + buka kamera boleh lama
+RESTART_BACKOFF = (1.0, 30.0)  # detik, awal dan maksimum jeda restart
+
+
+# ==========================
+# SHARED FRAME RING
+# ==========================
+class SharedFrameRing:
+    """Ring buffer frame uint8 di multiprocessing.shared_memory.
+
+    Header per slot berisi seq (int64) dan timestamp (float64). Writer
+    menandai slot dengan seq -1 selama menyalin, reader mengecek ulang
+    seq setelah menyalin sehingga frame yang sobek dibuang.
+    """
+
+    def __init__(self, shm, shape, slots, owner):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = owner
+        header = slots * 8
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self.stamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=header)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=shm.buf, offset=2 * header)
+        self._seq = 0
+
+    @staticmethod
+    def _size(shape, slots):
+        return 2 * slots * 8 + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape, slots=PREVIEW_SLOTS):
+        shm = shared_memory.SharedMemory(create=True, size=cls._size(shape, slots))
+        ring = cls(shm, shape, slots, owner=True)
+        ring.seqs[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape, slots=PREVIEW_SLOTS):
+        ring = cls(shared_memory.SharedMemory(name=name), shape, slots, owner=False)
+        # Lanjutkan seq dari writer sebelumnya (worker yang di-restart)
+        ring._seq = int(ring.seqs.max())
+        return ring
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, image, timestamp=None):
+        """Salin frame ke slot berikutnya (di-resize jika ukurannya beda)"""
+        self._seq += 1
+        slot = self._seq % self.slots
+        self.seqs[slot] = -1
+        if image.shape == self.shape:
+            np.copyto(self.frames[slot], image)
+        else:
+            h, w = self.shape[:2]
+            cv2.resize(image, (w, h), dst=self.frames[slot])
+        self.stamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self.seqs[slot] = self._seq
+
+    def read_latest(self, after=0):
+        """(seq, timestamp, frame) terbaru dengan seq > after, atau None"""
+        slot = int(np.argmax(self.seqs))
+        seq = int(self.seqs[slot])
+        if seq <= after:
+            return None
+        frame = self.frames[slot].copy()
+        stamp = float(self.stamps[slot])
+        if int(self.seqs[slot]) != seq:
+            return None  # tertimpa saat disalin
+        return seq, stamp, frame
+
+    def close(self):
+        # View numpy harus dilepas dulu sebelum shm ditutup
+        self.seqs = self.stamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ==========================
+# WORKER PROCESS
+# ==========================
+def worker_main(config, preview_name, preview_shape, msg_queue, ctrl_queue):
+    """Entry point proses worker: capture + inference, kirim pesan kecil ke UI"""
+    # Import berat di sini supaya proses UI tidak pernah memuat torch/CUDA
+    import metrics
+    from startup import StartupReport, add_lane, load_vision
+
+    ring = SharedFrameRing.attach(preview_name, preview_shape)
+
+    # Exporter worker di port+1 / file .worker supaya tidak bentrok dengan proses UI
+    port = config.get("metrics_port")
+    path = config.get("metrics_file")
+    metrics.start_exporters(port + 1 if port else None, f"{path}.worker" if path else None)
+
+    # Progres startup ikut ke status bar UI (sekaligus jadi tanda worker masih hidup)
+    report = StartupReport(on_status=lambda text: msg_queue.put(("status", text)))
+    models, gallery, grabbers = load_vision([config], report)
+    from vision_pipeline import LaneServer
+    from catalog import Catalog
+
+    # Heartbeat dari dalam loop LaneServer (bukan thread terpisah): inference
+    # yang hang menghentikan heartbeat, jadi supervisor bisa me-restart
+    last_beat = [0.0]
+
+    def heartbeat():
+        now = time.monotonic()
+        if now - last_beat[0] >= HEARTBEAT_INTERVAL:
+            last_beat[0] = now
+            msg_queue.put(("heartbeat", now))
+
+    server = LaneServer(models, gallery, fps_overlay=config.get("fps_overlay", True),
+                        catalog=Catalog(), on_tick=heartbeat)
+    lane = add_lane(
+        server, config, *grabbers[config["name"]],
+        on_counts=lambda counts: msg_queue.put(("counts", counts)),
+        on_customer=lambda name: msg_queue.put(("customer", name)),
+        on_preview=ring.write
+    )
+    with report.phase("warmup"):
+        server.warm_up()
+    report.done()
+
+    def control_loop():
+        while True:
+            msg = ctrl_queue.get()
+            if msg[0] == "resync":
+                lane.resync()
+            elif msg[0] == "stop":
+                server.stop()
+                return
+
+    threading.Thread(target=control_loop, daemon=True).start()
+    msg_queue.put(("ready",))
+    try:
+        server.run()
+    finally:
+        ring.close()
+
+
+# ==========================
+# SUPERVISOR (proses UI)
+# ==========================
+class VisionSupervisor:
+    """Menjalankan worker_main di proses terpisah dan me-restart jika crash/hang.
+
+    Frame preview lewat SharedFrameRing (tidak di-pickle); yang lewat
+    Queue hanya pesan kecil: counts, customer, status startup, heartbeat.
+    """
+
+    def __init__(self, config, on_counts=None, on_customer=None, on_quit=None, show_preview=True,
+                 on_status=None):
+        self.config = config
+        self.on_counts = on_counts
+        self.on_customer = on_customer
+        self.on_status = on_status
+        self.on_quit = on_quit
+        self.show_preview = show_preview
+
+        # Ring seukuran buffer preview (sudah di-downscale di worker), bukan resolusi kamera
+        w, h = preview_size(config["product_resolution"])
+        self.preview_shape = (h, w, 3)
+        self.ring = SharedFrameRing.create(self.preview_shape)
+        self.restarts = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._proc = None
+        self._ctrl_queue = None
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._supervise, daemon=True)]
+        if self.show_preview:
+            self._threads.append(threading.Thread(target=self._preview_loop, daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    # ==========================
+    # PROCESS LIFECYCLE
+    # ==========================
+    def _spawn(self):
+        # Queue baru tiap spawn: queue lama bisa rusak jika worker mati saat menulis
+        msg_queue = self._ctx.Queue()
+        self._ctrl_queue = self._ctx.Queue()
+        self._proc = self._ctx.Process(
+            target=worker_main,
+            args=(self.config, self.ring.name, self.preview_shape, msg_queue, self._ctrl_queue),
+            name="vision-worker",
+            daemon=True
+        )
+        self._proc.start()
+        print(f"[OK] Vision worker pid {self._proc.pid} dijalankan")
+        return msg_queue
+
+    def _supervise(self):
+        backoff = RESTART_BACKOFF[0]
+        while not self._stopping.is_set():
+            msg_queue = self._spawn()
+            started = time.monotonic()
+            ready = self._pump(msg_queue)
+            if self._stopping.is_set():
+                break
+
+            if self._proc.is_alive():
+                print("[WARN] Vision worker tidak merespon, di-terminate")
+                self._proc.terminate()
+            self._proc.join(timeout=5.0)
+            self.restarts += 1
+            print(f"[WARN] Vision worker berhenti (exit {self._proc.exitcode}), "
+                  f"restart #{self.restarts} dalam {backoff:.1f}s")
+
+            # Worker yang sempat jalan lama dianggap sehat -> backoff di-reset
+            if ready and time.monotonic() - started > RESTART_BACKOFF[1]:
+                backoff = RESTART_BACKOFF[0]
+            if self._stopping.wait(backoff):
+                break
+            backoff = min(backoff * 2, RESTART_BACKOFF[1])
+
+    def _pump(self, msg_queue):
+        """Teruskan pesan worker ke callback sampai worker mati/hang. Return True jika sempat ready"""
+        ready = False
+        last_beat = time.monotonic()
+        while not self._stopping.is_set():
+            timeout = HEARTBEAT_TIMEOUT if ready else STARTUP_TIMEOUT
+            try:
+                msg = msg_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not self._proc.is_alive() or time.monotonic() - last_beat > timeout:
+                    return ready
+                continue
+
+            last_beat = time.monotonic()
+            kind = msg[0]
+            if kind == "counts" and self.on_counts:
+                self.on_counts(msg[1])
+            elif kind == "customer" and self.on_customer:
+                self.on_customer(msg[1])
+            elif kind == "status" and self.on_status:
+                self.on_status(msg[1])
+            elif kind == "ready":
+                ready = True
+        return ready
+
+    def resync(self):
+        if self._ctrl_queue is not None:
+            self._ctrl_queue.put(("resync",))
+
+    def stop(self):
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        if self._proc is not None and self._proc.is_alive():
+            self._ctrl_queue.put(("stop",))
+            self._proc.join(timeout=5.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self.ring.close()
+
+    # ==========================
+    # PREVIEW (proses UI)
+    # ==========================
+    def _preview_loop(self):
+        seq = 0
+        while not self._stopping.is_set():
+            latest = self.ring.read_latest(seq)
+            if latest is not None:
+                seq, _, frame = latest
+                cv2.imshow("KASIRLESS", frame)
+            if cv2.waitKey(30) & 0xFF == ord("q"):
+                if self.on_quit:
+                    self.on_quit()
+                break
+        cv2.destroyAllWindows()